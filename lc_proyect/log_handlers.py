@@ -0,0 +1,172 @@
+"""
+Handlers de logging no bloqueantes
+
+QueuedFileHandler sustituye a logging.FileHandler: el hilo de la petición solo encola el
+registro y un hilo de fondo los formatea y escribe en bloques. Memoria acotada por la
+cola (max_queue) con una política explícita cuando se llena:
+
+- 'drop_new':    se descarta el registro nuevo (la petición nunca espera)
+- 'drop_oldest': se descarta el registro más antiguo de la cola
+- 'block':       la petición espera hasta block_timeout segundos y después descarta
+
+Los descartes se cuentan y se escriben como una línea de aviso en el siguiente bloque.
+Cada bloque se escribe con una sola llamada write() sobre un descriptor abierto en modo
+O_APPEND, así varios workers de gunicorn/uwsgi pueden compartir archivo sin mezclar líneas.
+La cola se vacía en close(), que logging llama al terminar el proceso (atexit).
+
+Con uwsgi hay que arrancar con --enable-threads (o con threads > 1): sin esa opción uwsgi no
+ejecuta hilos de Python, el hilo escritor nunca corre y la cola no se vacía (se llena y a
+partir de ahí se descarta todo según la política).
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+OVERFLOW_POLICIES = ('drop_new', 'drop_oldest', 'block')
+
+# Marca para pedir al hilo escritor que termine
+_STOP = object()
+
+
+class QueuedFileHandler(logging.Handler):
+    """
+    Handler de archivo con cola acotada y escritura en bloques desde un hilo de fondo
+    """
+
+    def __init__(self, filename, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 overflow='drop_new', block_timeout=0.05, encoding='utf-8'):
+        super().__init__()
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desbordamiento '{overflow}' no válida. Use: {', '.join(OVERFLOW_POLICIES)}")
+        self.filename = os.path.abspath(os.fspath(filename))
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.encoding = encoding
+        self.dropped = 0
+        # emit() corre en los hilos de las peticiones y _write_batch() en el hilo escritor
+        self._dropped_lock = threading.Lock()
+        self._fd = None
+        self._start()
+        # Tras un fork (gunicorn --preload) el hilo escritor no existe en el hijo: se recrea
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # El lock pudo quedar tomado por un hilo del padre que no existe en el hijo
+        self._dropped_lock = threading.Lock()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._start()
+
+    def _start(self):
+        self._queue = queue.Queue(self.max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer, name=f'log-writer:{os.path.basename(self.filename)}', daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.overflow == 'drop_oldest':
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._count_dropped()
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self._count_dropped()
+        elif self.overflow == 'block':
+            try:
+                self._queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self._count_dropped()
+        else:
+            self._count_dropped()
+
+    def _count_dropped(self):
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def _writer(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        lines = []
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            lines.append(
+                f"WARNING {time.strftime('%Y-%m-%d %H:%M:%S')} [LOGGING] "
+                f"{dropped} registros descartados por cola llena ({self.overflow})"
+            )
+        for record in batch:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        data = ('\n'.join(lines) + '\n').encode(self.encoding, 'backslashreplace')
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            view = memoryview(data)
+            while view:
+                written = os.write(self._fd, view)
+                view = view[written:]
+        except OSError:
+            if batch:
+                self.handleError(batch[-1])
+
+    def flush(self):
+        """Espera a que la cola actual se haya escrito (como mucho flush_interval * 2)"""
+        deadline = time.monotonic() + self.flush_interval * 2
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            if self._thread.is_alive():
+                try:
+                    self._queue.put(_STOP, timeout=self.flush_interval)
+                except queue.Full:
+                    pass
+                self._thread.join(self.flush_interval * 5)
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        super().close()
@@ -43,10 +43,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "notes_home.admission_control.AdmissionControlMiddleware",
+    "notes_home.query_profiler.QueryProfilerMiddleware",
+    "notes_home.sql_logging.SqlLoggingMiddleware",
+    "notes_home.db_router.ReplicaStickinessMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "notes_home.login_throttle.LoginThrottleMiddleware",
+    "notes_home.auth_cache.CachedAuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -70,6 +75,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "lc_proyect.wsgi.application"
+ASGI_APPLICATION = "lc_proyect.asgi.application"
+
+# Vistas asíncronas de registro/home/logout (notes_home.views.aregister, ahome, alogout_view)
+# Activar solo al servir con ASGI (p. ej. uvicorn lc_proyect.asgi:application)
+ASYNC_AUTH_VIEWS = os.environ.get("ASYNC_AUTH_VIEWS", "false").lower() == "true"
 
 
 # Database
@@ -81,6 +91,22 @@ WSGI_APPLICATION = "lc_proyect.wsgi.application"
 # Opciones: 'sqlite3', 'mysql', 'postgresql'
 DB_ENGINE = 'sqlite3'  # Cambiar aquí para usar otra BD
 
+# Conexiones para MySQL/PostgreSQL: abrir una conexión por petición añade la latencia del
+# handshake (TCP, TLS, autenticación) a cada petición.
+# - PostgreSQL con psycopg 3 y DB_POOL=true: pool de conexiones de psycopg_pool (Django >= 5.1)
+#   con tamaño mínimo/máximo, vida máxima de cada conexión y comprobación al reutilizarla
+# - Resto (MySQL, o PostgreSQL sin pool): conexiones persistentes por hilo con CONN_MAX_AGE
+#   y CONN_HEALTH_CHECKS (comprobación antes de reutilizar una conexión en una petición nueva)
+DB_POOL = {
+    "ENABLED": os.environ.get("DB_POOL", "true").lower() == "true",
+    "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+    "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+    "MAX_LIFETIME": float(os.environ.get("DB_POOL_MAX_LIFETIME", "1800")),  # segundos
+    "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", "10")),  # espera máxima por una conexión libre
+    "HEALTH_CHECKS": os.environ.get("DB_POOL_HEALTH_CHECKS", "true").lower() == "true",
+}
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "60"))  # segundos; 0 = una conexión por petición
+
 if DB_ENGINE == 'sqlite3':
     DATABASES = {
         "default": {
@@ -100,6 +126,9 @@ elif DB_ENGINE == 'mysql':
             "OPTIONS": {
                 "charset": "utf8mb4",
             },
+            # MySQL no tiene pool en Django: conexión persistente por hilo de worker
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE if DB_POOL["ENABLED"] else 0,
+            "CONN_HEALTH_CHECKS": DB_POOL["HEALTH_CHECKS"],
         }
     }
 elif DB_ENGINE == 'postgresql':
@@ -111,11 +140,195 @@ elif DB_ENGINE == 'postgresql':
             "PASSWORD": os.environ.get("DB_PASSWORD", ""),
             "HOST": os.environ.get("DB_HOST", "localhost"),
             "PORT": os.environ.get("DB_PORT", "5432"),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE if DB_POOL["ENABLED"] else 0,
+            "CONN_HEALTH_CHECKS": DB_POOL["HEALTH_CHECKS"],
         }
     }
+    if DB_POOL["ENABLED"]:
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            # Sin psycopg 3 / psycopg_pool se quedan las conexiones persistentes
+            ConnectionPool = None
+        if ConnectionPool is not None:
+            pool_options = {
+                "min_size": DB_POOL["MIN_SIZE"],
+                "max_size": DB_POOL["MAX_SIZE"],
+                "max_lifetime": DB_POOL["MAX_LIFETIME"],
+                "timeout": DB_POOL["TIMEOUT"],
+            }
+            # Sin "check": Django pasa check=ConnectionPool.check_connection al pool según
+            # CONN_HEALTH_CHECKS (DB_POOL["HEALTH_CHECKS"]); repetirlo aquí es un TypeError
+            DATABASES["default"]["OPTIONS"] = {"pool": pool_options}
+            # El pool gestiona la vida de las conexiones: Django exige CONN_MAX_AGE = 0
+            DATABASES["default"]["CONN_MAX_AGE"] = 0
 else:
     raise ValueError(f"DB_ENGINE '{DB_ENGINE}' no es válido. Use: 'sqlite3', 'mysql', o 'postgresql'")
 
+# Réplica de lectura (notes_home/db_router.py)
+# Las lecturas de usuarios van a 'replica' y las escrituras a 'default'; tras una escritura las
+# lecturas vuelven a la primaria durante DB_REPLICA_STICKY_SECONDS (misma petición y siguientes).
+# - SQLite (pruebas locales): DB_REPLICA_NAME=ruta/al/otro.sqlite3 (p. ej. una copia de db.sqlite3)
+# - MySQL/PostgreSQL: DB_REPLICA_HOST (y opcionalmente DB_REPLICA_PORT, DB_REPLICA_USER, DB_REPLICA_PASSWORD)
+if DB_ENGINE == 'sqlite3' and os.environ.get("DB_REPLICA_NAME"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.environ["DB_REPLICA_NAME"],
+        "TEST": {"MIRROR": "default"},
+    }
+elif DB_ENGINE != 'sqlite3' and os.environ.get("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DB_REPLICA_HOST"],
+        "PORT": os.environ.get("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "USER": os.environ.get("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": os.environ.get("DB_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["notes_home.db_router.PrimaryReplicaRouter"] if "replica" in DATABASES else []
+DATABASE_ROUTING = {
+    "STICKY_SECONDS": float(os.environ.get("DB_REPLICA_STICKY_SECONDS", "5")),
+    "COOKIE_NAME": "db_primary_until",
+    "REPLICA_MODELS": ["auth.user", "notes_home.userstats", "notes_home.usersignupdaily"],
+}
+
+# Perfil de rendimiento de SQLite (notes_home/sqlite_tuning.py), aplicado en cada conexión nueva
+# Comparar con y sin el perfil: python manage.py medir_sqlite
+SQLITE_TUNING = {
+    "ENABLED": DB_ENGINE == 'sqlite3' and os.environ.get("SQLITE_TUNING_ENABLED", "true").lower() == "true",
+    "JOURNAL_MODE": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "SYNCHRONOUS": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "MMAP_SIZE": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "CACHE_SIZE": int(os.environ.get("SQLITE_CACHE_SIZE", "-64000")),  # negativo = KiB
+    "BUSY_TIMEOUT": int(os.environ.get("SQLITE_BUSY_TIMEOUT", "5000")),  # ms
+    "TEMP_STORE": "MEMORY",
+}
+
+
+# Caché
+# El backend por defecto es memoria local; para varios procesos se puede usar
+# 'django.core.cache.backends.filebased.FileBasedCache' o 'django.core.cache.backends.db.DatabaseCache'
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "lc_notes",
+    }
+}
+
+# Caché de lectura de usuarios (notes_home/repositories/user_cache.py)
+# BACKEND: 'local' (LRU en memoria del proceso) o un alias de CACHES (p. ej. 'default')
+USER_CACHE = {
+    "ENABLED": os.environ.get("USER_CACHE_ENABLED", "false").lower() == "true",
+    "BACKEND": os.environ.get("USER_CACHE_BACKEND", "local"),
+    "MAX_ENTRIES": int(os.environ.get("USER_CACHE_MAX_ENTRIES", "10000")),
+    "TTL": int(os.environ.get("USER_CACHE_TTL", "300")),  # segundos
+}
+
+# Índice de pertenencia en memoria para exists_by_username / exists_by_email
+# (notes_home/repositories/membership_index.py). Solo lo consultan las comprobaciones de existencia:
+# el registro con REGISTRATION_UNIQUENESS='constraints' (por defecto) no lo usa
+USER_MEMBERSHIP_INDEX = {
+    "ENABLED": os.environ.get("USER_MEMBERSHIP_INDEX_ENABLED", "false").lower() == "true",
+    "CAPACITY": int(os.environ.get("USER_MEMBERSHIP_INDEX_CAPACITY", "100000")),
+    "ERROR_RATE": 0.01,
+    "REBUILD_INTERVAL": 300,  # segundos
+}
+
+# Sesiones en caché con escritura diferida a la BD (notes_home/session_backend.py)
+# Con varios procesos, CACHES["default"] debe ser compartida (Redis/Memcached)
+SESSION_WRITE_BEHIND = {
+    "ENABLED": os.environ.get("SESSION_WRITE_BEHIND_ENABLED", "false").lower() == "true",
+    "FLUSH_INTERVAL": float(os.environ.get("SESSION_WRITE_BEHIND_INTERVAL", "2")),  # segundos
+    "MAX_PENDING": 5000,
+    "BATCH_SIZE": 500,
+    "CLEANUP_BATCH_SIZE": 5000,  # limpiar_sesiones / clearsessions
+}
+if SESSION_WRITE_BEHIND["ENABLED"]:
+    SESSION_ENGINE = "notes_home.session_backend"
+
+# Caché del usuario autenticado por (id, hash de sesión) (notes_home/auth_cache.py)
+AUTH_USER_CACHE = {
+    "ENABLED": os.environ.get("AUTH_USER_CACHE_ENABLED", "false").lower() == "true",
+    "CACHE_ALIAS": "default",
+    "TTL": int(os.environ.get("AUTH_USER_CACHE_TTL", "30")),  # segundos
+}
+
+# Estadísticas de usuarios mantenidas por señales (notes_home/user_stats.py)
+# Tras activarlo sobre una base existente: python manage.py consultar_usuarios --recalcular-estadisticas
+USER_STATS = {
+    "ENABLED": os.environ.get("USER_STATS_ENABLED", "true").lower() == "true",
+}
+
+# Unicidad en el registro (AuthService.register_user)
+# 'constraints': un solo INSERT; los índices únicos de username y email (sin distinguir
+#                mayúsculas) rechazan duplicados y el IntegrityError se traduce al mensaje de negocio
+# 'queries': comprobación previa con exists_by_username / exists_by_email antes del INSERT
+REGISTRATION_UNIQUENESS = os.environ.get("REGISTRATION_UNIQUENESS", "constraints")
+
+# Hashing de contraseñas fuera del hilo de la petición (notes_home/password_hashing.py)
+# WORKERS: 0 = en el mismo hilo, 'auto' = un proceso por núcleo, o un número fijo
+PASSWORD_HASHING = {
+    "WORKERS": os.environ.get("PASSWORD_HASHING_WORKERS", "0"),
+    "MAX_PENDING": None,  # operaciones en vuelo como máximo (por defecto WORKERS * 4)
+    "TIMEOUT": 30,  # segundos esperando hueco en el pool
+}
+
+# Control de admisión de los POST a registro y login (notes_home/admission_control.py)
+# Limita por proceso las peticiones que hashean contraseñas; con la cola llena responde 503 + Retry-After
+ADMISSION_CONTROL = {
+    "ENABLED": os.environ.get("ADMISSION_CONTROL_ENABLED", "false").lower() == "true",
+    "PATHS": ["/register/", "/login/"],
+    "METHODS": ["POST"],
+    "MAX_CONCURRENT": int(os.environ.get("ADMISSION_MAX_CONCURRENT", "0")) or None,  # None = un hueco por núcleo
+    "MAX_QUEUE": None,  # plazas de espera (por defecto MAX_CONCURRENT * 2)
+    "QUEUE_TIMEOUT": float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "2")),  # segundos
+    "RETRY_AFTER": 2,  # segundos
+}
+
+
+# Límite de intentos de login/registro por IP y por username con token buckets
+# (notes_home/login_throttle.py). ROUTES: nombre de URL -> {'ip' | 'username': regla}
+# BURST: intentos seguidos permitidos; PER_MINUTE: intentos que se recuperan por minuto
+# 'authenticate' se aplica en UserRepository.authenticate. BACKEND: 'local' o un alias de CACHES
+LOGIN_THROTTLE = {
+    "ENABLED": os.environ.get("LOGIN_THROTTLE_ENABLED", "false").lower() == "true",
+    "BACKEND": os.environ.get("LOGIN_THROTTLE_BACKEND", "local"),
+    "MAX_ENTRIES": 100000,
+    "CLIENT_IP_HEADER": os.environ.get("LOGIN_THROTTLE_CLIENT_IP_HEADER") or None,  # p. ej. HTTP_X_REAL_IP
+    "ROUTES": {
+        "login": {
+            "ip": {"BURST": 20, "PER_MINUTE": 10},
+            "username": {"BURST": 5, "PER_MINUTE": 1},
+        },
+        "register": {
+            "ip": {"BURST": 5, "PER_MINUTE": 1},
+        },
+        "authenticate": {
+            "username": {"BURST": 5, "PER_MINUTE": 1},
+        },
+    },
+}
+
+
+# Hashers de contraseñas con coste configurable (notes_home/hashers.py)
+# El primero se usa para los hashes nuevos; los demás solo para verificar hashes antiguos.
+# Calibrar en cada máquina con: python manage.py calibrar_hasher --presupuesto-ms 100
+PASSWORD_HASHERS = [
+    "notes_home.hashers.TunedPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "notes_home.hashers.TunedArgon2PasswordHasher",
+    "notes_home.hashers.TunedBCryptSHA256PasswordHasher",
+    "notes_home.hashers.TunedScryptPasswordHasher",
+]
+# None = valor por defecto de Django. Al cambiarlos, cada hash se actualiza en el siguiente login correcto
+PASSWORD_HASHER_PARAMS = {
+    "PBKDF2_ITERATIONS": int(os.environ.get("PBKDF2_ITERATIONS", "0")) or None,
+    "SCRYPT_WORK_FACTOR": None,
+    "BCRYPT_ROUNDS": None,
+    "ARGON2_TIME_COST": None,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -177,6 +390,48 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 
 # Logging configuration
+# Los archivos de log se escriben con QueuedFileHandler (lc_proyect/log_handlers.py): la petición
+# solo encola y un hilo de fondo escribe en bloques. OVERFLOW: 'drop_new', 'drop_oldest' o 'block'
+# Con uwsgi hace falta --enable-threads: sin él el hilo escritor no corre y la cola nunca se vacía
+LOG_QUEUE_OPTIONS = {
+    'max_queue': int(os.environ.get('LOG_QUEUE_MAX', '10000')),
+    'batch_size': 500,
+    'flush_interval': 1.0,  # segundos
+    'overflow': os.environ.get('LOG_QUEUE_OVERFLOW', 'drop_new'),
+}
+
+# Log de SQL (notes_home/sql_logging.py)
+# MODE 'sampled': siempre las sentencias de más de SLOW_MS y una fracción SAMPLE_RATE del resto,
+#      con duración y ruta de la petición. Apto para producción.
+# MODE 'all': comportamiento anterior, django.db.backends en DEBUG registra todas (solo con DEBUG)
+# MODE 'off': sin log de SQL
+SQL_LOGGING = {
+    'MODE': os.environ.get('SQL_LOG_MODE', 'sampled'),
+    'SLOW_MS': float(os.environ.get('SQL_LOG_SLOW_MS', '200')),
+    'SAMPLE_RATE': float(os.environ.get('SQL_LOG_SAMPLE_RATE', '0.01')),
+}
+
+# Perfilador de consultas por petición (notes_home/query_profiler.py)
+# Cabeceras X-Query-Count / X-DB-Time, línea de resumen por petición y aviso de N+1 probable
+QUERY_PROFILER = {
+    'ENABLED': os.environ.get('QUERY_PROFILER', str(DEBUG)).lower() == 'true',
+    'N_PLUS_ONE_THRESHOLD': int(os.environ.get('QUERY_PROFILER_N_PLUS_ONE', '5')),
+    'HEADERS': True,
+}
+
+# Eventos de auditoría (notes_home/audit.py)
+# SAMPLING: fracción de eventos que se registran, por nombre o prefijo ('user.lookup.*')
+# JSONL: además del log de texto, escribe los eventos como JSON Lines en audit.jsonl
+AUDIT_EVENTS = {
+    'LEVEL': os.environ.get('AUDIT_LEVEL', 'INFO'),
+    'SAMPLING': {
+        'user.lookup.*': float(os.environ.get('AUDIT_SAMPLE_LOOKUPS', '1.0')),
+        'user.exists.*': float(os.environ.get('AUDIT_SAMPLE_LOOKUPS', '1.0')),
+        'user.found': float(os.environ.get('AUDIT_SAMPLE_LOOKUPS', '1.0')),
+    },
+    'JSONL': os.environ.get('AUDIT_JSONL', 'false').lower() == 'true',
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -193,6 +448,14 @@ LOGGING = {
             'format': '{levelname} {asctime} [SQL] {message}',
             'style': '{',
         },
+        'audit_jsonl': {
+            '()': 'notes_home.audit.JsonLinesFormatter',
+        },
+    },
+    'filters': {
+        'audit_events': {
+            '()': 'notes_home.audit.AuditEventFilter',
+        },
     },
     'handlers': {
         'console': {
@@ -200,20 +463,30 @@ LOGGING = {
             'formatter': 'verbose',
         },
         'file': {
-            'class': 'logging.FileHandler',
+            'class': 'lc_proyect.log_handlers.QueuedFileHandler',
             'filename': BASE_DIR / 'debug.log',
+            **LOG_QUEUE_OPTIONS,
             'formatter': 'verbose',
         },
         'database_operations_file': {
-            'class': 'logging.FileHandler',
+            'class': 'lc_proyect.log_handlers.QueuedFileHandler',
             'filename': BASE_DIR / 'database_operations.log',
+            **LOG_QUEUE_OPTIONS,
             'formatter': 'database_operations',
         },
         'sql_file': {
-            'class': 'logging.FileHandler',
+            'class': 'lc_proyect.log_handlers.QueuedFileHandler',
             'filename': BASE_DIR / 'database_queries.log',
+            **LOG_QUEUE_OPTIONS,
             'formatter': 'sql_verbose',
         },
+        'audit_jsonl': {
+            'class': 'lc_proyect.log_handlers.QueuedFileHandler',
+            'filename': BASE_DIR / 'audit.jsonl',
+            **LOG_QUEUE_OPTIONS,
+            'formatter': 'audit_jsonl',
+            'filters': ['audit_events'],
+        },
     },
     'root': {
         'handlers': ['console', 'file'],
@@ -222,7 +495,12 @@ LOGGING = {
     'loggers': {
         'django.db.backends': {
             'handlers': ['sql_file'],
-            'level': 'DEBUG' if DEBUG else 'INFO',
+            'level': 'DEBUG' if DEBUG and SQL_LOGGING['MODE'] == 'all' else 'INFO',
+            'propagate': False,
+        },
+        'notes_home.sql': {
+            'handlers': ['sql_file'],
+            'level': 'INFO',
             'propagate': False,
         },
         'notes_home': {
@@ -236,8 +514,8 @@ LOGGING = {
             'propagate': False,
         },
         'database_operations': {
-            'handlers': ['console', 'database_operations_file'],
-            'level': 'INFO',
+            'handlers': ['console', 'database_operations_file'] + (['audit_jsonl'] if AUDIT_EVENTS['JSONL'] else []),
+            'level': AUDIT_EVENTS['LEVEL'],
             'propagate': False,
         },
     },
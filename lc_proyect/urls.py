@@ -22,12 +22,18 @@ from django.conf import settings
 from django.conf.urls.static import static
 from notes_home import views
 
+# Con ASYNC_AUTH_VIEWS (servidor ASGI) se usan las versiones asíncronas de las vistas de usuario
+if settings.ASYNC_AUTH_VIEWS:
+    register_view, logout_view, home_view = views.aregister, views.alogout_view, views.ahome
+else:
+    register_view, logout_view, home_view = views.register, views.logout_view, views.home
+
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("register/", views.register, name="register"),
+    path("register/", register_view, name="register"),
     path("login/", auth_views.LoginView.as_view(template_name='notes_home/login.html'), name="login"),
-    path("logout/", views.logout_view, name="logout"),
-    path("", views.home, name="home"),
+    path("logout/", logout_view, name="logout"),
+    path("", home_view, name="home"),
 ]
 
 # Servir archivos estáticos en desarrollo
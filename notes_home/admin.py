@@ -1,6 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from notes_home.paginators import EstimatedCountPaginator
+from notes_home.repositories.user_search import search_user_ids
+
+# Máximo de resultados de la búsqueda del admin (los más relevantes)
+ADMIN_SEARCH_LIMIT = 500
 
 
 # Desregistrar el UserAdmin por defecto si ya está registrado
@@ -8,6 +14,16 @@ if admin.site.is_registered(User):
     admin.site.unregister(User)
 
 
+class LeanChangeList(ChangeList):
+    """ChangeList que solo carga la clave primaria y las columnas de list_display"""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        fields = [name for name in self.list_display if isinstance(name, str) and name != 'action_checkbox']
+        columns = [name for name in fields if name in {field.name for field in self.model._meta.concrete_fields}]
+        return queryset.only(self.model._meta.pk.name, *columns)
+
+
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
     """
@@ -17,8 +33,12 @@ class UserAdmin(BaseUserAdmin):
     # Campos a mostrar en la lista - solo username y email
     list_display = ('username', 'email')
     list_filter = ('is_active', 'is_staff', 'is_superuser', 'date_joined')
-    search_fields = ('username', 'email')
+    search_fields = ('username', 'email')  # La búsqueda real la hace get_search_results con el índice
     ordering = ('-date_joined',)
+
+    # Tablas grandes: conteo estimado y sin el segundo COUNT(*) del total sin filtrar
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     # Configuración de campos en el formulario de edición
     fieldsets = (
@@ -37,3 +57,18 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('username', 'email', 'password1', 'password2'),
         }),
     )
+
+    def get_changelist(self, request, **kwargs):
+        return LeanChangeList
+
+    def response_action(self, request, queryset):
+        # Las acciones (p. ej. borrar) reciben los usuarios completos: las señales de
+        # borrado y guardado leen campos que LeanChangeList no carga
+        return super().response_action(request, queryset.defer(None))
+
+    def get_search_results(self, request, queryset, search_term):
+        """Busca por subcadena de username/email con el índice de búsqueda en lugar de icontains"""
+        if not search_term.strip():
+            return queryset, False
+        ids = search_user_ids(search_term, limit=ADMIN_SEARCH_LIMIT)
+        return queryset.filter(id__in=ids), False
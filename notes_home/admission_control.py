@@ -0,0 +1,253 @@
+"""
+Control de admisión para los endpoints que hashean contraseñas (registro y login)
+
+Cada POST a /register/ o /login/ ejecuta un PBKDF2 completo. Sin límite, unos cientos de
+intentos simultáneos ocupan todos los workers y hasta '/' y los estáticos dejan de responder.
+AdmissionControlMiddleware limita esas peticiones por proceso:
+
+- Como mucho MAX_CONCURRENT peticiones de estas rutas en vuelo a la vez.
+- Las siguientes esperan en una cola FIFO de MAX_QUEUE plazas durante QUEUE_TIMEOUT segundos.
+- Con la cola llena (o agotada la espera) se responde al momento 503 con Retry-After, sin
+  leer la sesión ni el formulario.
+
+El resto de rutas no pasa por el limitador. No es un límite por usuario: protege la latencia
+del proceso entero. Los contadores (en vuelo, en cola, admitidas, rechazadas, caducadas) se
+consultan con get_admission_controller().stats() y se registran en el logger
+'notes_home.admission' cuando hay rechazos (como mucho una línea cada LOG_INTERVAL segundos).
+
+Sirve para vistas síncronas (la espera bloquea el hilo) y asíncronas (la espera es un
+future, sin bloquear el event loop); ambas comparten los mismos huecos.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+
+admission_logger = logging.getLogger('notes_home.admission')
+
+DEFAULT_ADMISSION_CONTROL = {
+    'ENABLED': False,
+    'PATHS': ['/register/', '/login/'],
+    'METHODS': ['POST'],
+    'MAX_CONCURRENT': None,  # por defecto un hueco por núcleo
+    'MAX_QUEUE': None,  # por defecto MAX_CONCURRENT * 2
+    'QUEUE_TIMEOUT': 2.0,  # segundos esperando hueco en la cola
+    'RETRY_AFTER': 2,  # segundos (cabecera Retry-After del 503)
+    'LOG_INTERVAL': 5.0,  # segundos entre líneas de log de rechazos
+}
+
+
+def get_admission_control_settings() -> dict:
+    return {**DEFAULT_ADMISSION_CONTROL, **getattr(settings, 'ADMISSION_CONTROL', {})}
+
+
+def is_admission_control_enabled() -> bool:
+    return bool(get_admission_control_settings()['ENABLED'])
+
+
+class _Waiter:
+    """Plaza en la cola; `wake` avisa al hilo o a la corrutina que espera"""
+    __slots__ = ('granted', 'wake')
+
+    def __init__(self, wake):
+        self.granted = False
+        self.wake = wake
+
+
+def _set_result(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class AdmissionController:
+    """
+    Semáforo con cola acotada compartido por hilos y event loops del proceso
+
+    Al liberar un hueco se entrega directamente a la primera plaza de la cola, así una
+    petición nueva no se cuela por delante de las que ya esperan.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _try_enter(self, wake):
+        """
+        Entra si hay hueco; si no, ocupa una plaza de la cola
+        Returns: (admitida, plaza en la cola o None); (False, None) = rechazada
+        """
+        with self._lock:
+            if self.in_flight < self.max_concurrent and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                return True, None
+            if len(self._waiters) >= self.max_queue or self.queue_timeout <= 0:
+                self.rejected += 1
+                return False, None
+            waiter = _Waiter(wake)
+            self._waiters.append(waiter)
+            return False, waiter
+
+    def _leave_queue(self, waiter) -> bool:
+        """Tras la espera: True si el hueco llegó a tiempo; si no, sale de la cola"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            self.timed_out += 1
+            return False
+
+    def acquire(self) -> bool:
+        event = threading.Event()
+        admitted, waiter = self._try_enter(event.set)
+        if waiter is None:
+            return admitted
+        event.wait(self.queue_timeout)
+        return self._leave_queue(waiter)
+
+    async def aacquire(self) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        admitted, waiter = self._try_enter(lambda: loop.call_soon_threadsafe(_set_result, future))
+        if waiter is None:
+            return admitted
+        try:
+            await asyncio.wait({future}, timeout=self.queue_timeout)
+        except BaseException:
+            # Cliente desconectado durante la espera: se devuelve el hueco si ya se había concedido
+            if self._leave_queue(waiter):
+                self.release()
+            raise
+        return self._leave_queue(waiter)
+
+    def release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                # El hueco pasa a la primera plaza de la cola: in_flight no cambia
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self.admitted += 1
+                waiter.wake()
+            else:
+                self.in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'queued': len(self._waiters),
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+
+_admission_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Devuelve el limitador del proceso, creado a partir de settings.ADMISSION_CONTROL"""
+    global _admission_controller
+    if _admission_controller is None:
+        with _controller_lock:
+            if _admission_controller is None:
+                config = get_admission_control_settings()
+                max_concurrent = int(config['MAX_CONCURRENT'] or os.cpu_count() or 1)
+                max_queue = config['MAX_QUEUE']
+                _admission_controller = AdmissionController(
+                    max_concurrent=max_concurrent,
+                    max_queue=int(max_concurrent * 2 if max_queue is None else max_queue),
+                    queue_timeout=float(config['QUEUE_TIMEOUT']),
+                )
+    return _admission_controller
+
+
+class AdmissionControlMiddleware:
+    """
+    Limita las peticiones en vuelo a las rutas de ADMISSION_CONTROL['PATHS']; 503 si la cola está llena
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not is_admission_control_enabled():
+            raise MiddlewareNotUsed
+        config = get_admission_control_settings()
+        self.paths = frozenset(config['PATHS'])
+        self.methods = frozenset(method.upper() for method in config['METHODS'])
+        self.retry_after = config['RETRY_AFTER']
+        self.log_interval = config['LOG_INTERVAL']
+        self.controller = get_admission_controller()
+        self._last_log = 0.0
+        self._logged_rejections = 0
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def applies_to(self, request) -> bool:
+        return request.method in self.methods and request.path_info in self.paths
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.applies_to(request):
+            return self.get_response(request)
+        if not self.controller.acquire():
+            return self.reject(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self.controller.release()
+
+    async def __acall__(self, request):
+        if not self.applies_to(request):
+            return await self.get_response(request)
+        if not await self.controller.aacquire():
+            return self.reject(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            self.controller.release()
+
+    def reject(self, request):
+        self.log_rejections(request)
+        response = HttpResponse(
+            'Servicio ocupado. Inténtalo de nuevo en unos segundos.',
+            status=503,
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(self.retry_after)
+        return response
+
+    def log_rejections(self, request):
+        now = time.monotonic()
+        if now - self._last_log < self.log_interval:
+            return
+        self._last_log = now
+        stats = self.controller.stats()
+        refused = stats['rejected'] + stats['timed_out']
+        admission_logger.warning(
+            '503 por saturación en %s %s: %d rechazadas desde la última línea; '
+            'en vuelo %d/%d, en cola %d/%d, total rechazadas %d (cola llena %d, espera agotada %d)',
+            request.method, request.path_info, refused - self._logged_rejections,
+            stats['in_flight'], stats['max_concurrent'], stats['queued'], stats['max_queue'],
+            refused, stats['rejected'], stats['timed_out'],
+        )
+        self._logged_rejections = refused
@@ -0,0 +1,172 @@
+"""
+Eventos de auditoría estructurados y con formateo diferido
+
+    audit.event("user.insert", id=user.id, username=user.username, email=user.email)
+
+- Si el nivel del evento no está habilitado en el logger, no se hace nada más (ni formateo).
+- Cada evento puede muestrearse con settings.AUDIT_EVENTS['SAMPLING'] ({'user.lookup.*': 0.01}).
+- El mensaje de texto se construye solo cuando un handler lo formatea (con QueuedFileHandler,
+  en el hilo de fondo) y conserva el formato histórico de database_operations.log.
+- Los campos viajan en el registro (record.audit_event / record.audit_fields) y
+  JsonLinesFormatter los escribe como JSON Lines para el sink opcional audit.jsonl.
+"""
+import json
+import logging
+import random
+
+from django.conf import settings
+
+db_operations_logger = logging.getLogger('database_operations')
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+# Catálogo de eventos: nombre -> (nivel por defecto, plantilla del mensaje de texto)
+# La plantilla puede ser una cadena con {campos} o una función que recibe los campos.
+EVENTS = {
+    # INSERT
+    'user.insert.start': (INFO, "INSERT - Creando nuevo usuario: username='{username}', email='{email}'"),
+    'user.insert': (INFO, "INSERT EXITOSO - Usuario creado con ID={id}, username='{username}', email='{email}'"),
+    'user.insert.invalid_password': (ERROR, "INSERT FALLIDO - Error de validación de contraseña para usuario '{username}': {error}"),
+    'user.insert.invalid': (ERROR, "INSERT FALLIDO - Error de validación Django para usuario '{username}': {error}"),
+    'user.insert.duplicate': (WARNING, "INSERT RECHAZADO - Restricción de unicidad para usuario '{username}': {error}"),
+    'user.insert.failed': (ERROR, "INSERT FALLIDO - Error al crear usuario '{username}': {error_type}: {error}"),
+    'user.insert.error': (ERROR, "INSERT FALLIDO - Error inesperado al crear usuario '{username}': {error_type}: {error}"),
+    'user.insert.orm': (INFO, "INSERT - Usuario creado directamente con ORM: ID={id}, username='{username}'"),
+    'user.insert.bulk': (INFO, "INSERT MASIVO - {count} usuarios creados con bulk_create"),
+    # SELECT
+    'user.lookup.username': (INFO, "SELECT - Consultando usuario por username='{username}'"),
+    'user.lookup.id': (INFO, "SELECT - Consultando usuario por ID={id}"),
+    'user.found': (INFO, "SELECT EXITOSO - Usuario encontrado: ID={id}, username='{username}', email='{email}'"),
+    'user.not_found.username': (WARNING, "SELECT - Usuario no encontrado: username='{username}'"),
+    'user.not_found.id': (WARNING, "SELECT - Usuario no encontrado: ID={id}"),
+    'user.batch': (INFO, "SELECT LOTE EXITOSO - {found}/{requested} usuarios encontrados por {field}"),
+    'user.batch.missing': (WARNING, lambda f: (
+        f"SELECT LOTE - {f['found']}/{f['requested']} usuarios encontrados por {f['field']}; "
+        f"no encontrados: {f['missing'][:20]}{' ...' if len(f['missing']) > 20 else ''}"
+    )),
+    'user.search': (INFO, "SELECT BÚSQUEDA - {found} usuarios para '{text}' en {fields}"),
+    'user.exists.username': (INFO, "SELECT - Verificando existencia de usuario por username='{username}'"),
+    'user.exists.username.result': (INFO, lambda f: (
+        f"SELECT RESULTADO - Usuario '{f['username']}' {'existe' if f['exists'] else 'no existe'}"
+    )),
+    'user.exists.username.index': (INFO, "INDICE - Usuario '{username}' no existe (sin consulta a la BD)"),
+    'user.exists.email': (INFO, "SELECT - Verificando existencia de usuario por email='{email}'"),
+    'user.exists.email.result': (INFO, lambda f: (
+        f"SELECT RESULTADO - Usuario con email '{f['email']}' {'existe' if f['exists'] else 'no existe'}"
+    )),
+    'user.exists.email.index': (INFO, "INDICE - Usuario con email '{email}' no existe (sin consulta a la BD)"),
+    'user.index.built': (INFO, "INDICE - Índice de pertenencia construido: {count} usuarios, {bytes} bytes por filtro"),
+    'user.index.build_error': (ERROR, "INDICE - Error al reconstruir el índice de pertenencia ({error_type}): {error}"),
+    # Autenticación
+    'user.auth.start': (INFO, "SELECT - Autenticando usuario: username='{username}'"),
+    'user.auth.success': (INFO, "SELECT EXITOSO - Autenticación exitosa para usuario: ID={id}, username='{username}'"),
+    'user.auth.failed': (WARNING, "SELECT - Autenticación fallida para usuario: username='{username}'"),
+    'user.auth.throttled': (WARNING, lambda f: (
+        f"SELECT RECHAZADO - Demasiados intentos de autenticación para usuario: username='{f['username']}' "
+        f"(reintentar en {f['retry_after']:.1f}s)"
+    )),
+    'user.auth.rehash': (INFO, "UPDATE - Hash de contraseña actualizado a {algorithm} para usuario: ID={id}, username='{username}'"),
+    'auth.register': (DEBUG, "REGISTRO - Intento de registro: username='{username}', email='{email}'"),
+    # UPDATE / DELETE
+    'user.update.start': (INFO, lambda f: (
+        f"UPDATE - Actualizando usuario ID={f['id']}: " + ', '.join(
+            f"{field}: {old} -> {new}" if field == 'is_active' else f"{field}: '{old}' -> '{new}'"
+            for field, (old, new) in f['changes'].items()
+        )
+    )),
+    'user.update': (INFO, "UPDATE EXITOSO - Usuario actualizado: ID={id}, username='{username}'"),
+    'user.delete.start': (WARNING, "DELETE - Eliminando usuario: ID={id}, username='{username}', email='{email}'"),
+    'user.delete': (WARNING, "DELETE EXITOSO - Usuario eliminado: ID={id}, username='{username}'"),
+}
+
+
+class AuditMessage:
+    """
+    Mensaje diferido: solo se construye el texto cuando un handler llama a str()
+    """
+    __slots__ = ('name', 'fields')
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def __str__(self):
+        template = EVENTS.get(self.name, (None, None))[1]
+        if template is None:
+            return self.name + ''.join(f" {key}={value!r}" for key, value in self.fields.items())
+        if callable(template):
+            return template(self.fields)
+        return template.format(**self.fields)
+
+
+_sampling_rates = None
+
+
+def _sampling_rate(name):
+    global _sampling_rates
+    if _sampling_rates is None:
+        _sampling_rates = {}
+    rate = _sampling_rates.get(name)
+    if rate is None:
+        configured = getattr(settings, 'AUDIT_EVENTS', {}).get('SAMPLING', {})
+        rate = configured.get(name)
+        if rate is None:
+            # Patrones por prefijo: 'user.lookup.*'; gana el más largo
+            prefixes = [pattern for pattern in configured if pattern.endswith('*') and name.startswith(pattern[:-1])]
+            rate = configured[max(prefixes, key=len)] if prefixes else 1.0
+        _sampling_rates[name] = rate
+    return rate
+
+
+def event(name, level=None, logger=None, **fields):
+    """
+    Emite un evento de auditoría. Coste casi nulo si el nivel no está habilitado o no sale en el muestreo.
+    """
+    if level is None:
+        level = EVENTS.get(name, (INFO, None))[0]
+    logger = logger or db_operations_logger
+    if not logger.isEnabledFor(level):
+        return
+    rate = _sampling_rate(name)
+    if rate < 1.0 and random.random() >= rate:
+        return
+    logger.log(
+        level, AuditMessage(name, fields),
+        extra={'audit_event': name, 'audit_fields': fields},
+        stacklevel=2,
+    )
+
+
+def reset_sampling_cache():
+    """Vuelve a leer settings.AUDIT_EVENTS en el próximo evento (útil en pruebas)"""
+    global _sampling_rates
+    _sampling_rates = None
+
+
+class AuditEventFilter(logging.Filter):
+    """Deja pasar solo registros emitidos con audit.event()"""
+
+    def filter(self, record):
+        return hasattr(record, 'audit_event')
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Una línea JSON por registro: ts, level, event y los campos del evento
+    """
+
+    def format(self, record):
+        data = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'event': getattr(record, 'audit_event', None),
+        }
+        fields = getattr(record, 'audit_fields', None)
+        if fields is not None:
+            data.update(fields)
+        else:
+            data['message'] = record.getMessage()
+        return json.dumps(data, ensure_ascii=False, default=str)
@@ -0,0 +1,126 @@
+"""
+Caché de corta duración del usuario autenticado por petición
+
+AuthenticationMiddleware carga la fila completa de auth_user en cada petición autenticada.
+CachedAuthenticationMiddleware guarda ese usuario en la caché (settings.AUTH_USER_CACHE)
+con la clave (id de usuario, hash de autenticación de la sesión):
+
+- Un acierto devuelve el usuario sin consultar la base de datos. El hash de la sesión forma
+  parte de la clave, así que un acierto implica que la sesión ya se verificó contra ese usuario.
+- Un fallo usa django.contrib.auth.get_user() (carga y verificación normales) y guarda el resultado.
+- Las señales de User borran las entradas del usuario al guardarlo o eliminarlo, con el hash
+  anterior y el nuevo si cambió la contraseña. En otros procesos la entrada caduca a los TTL segundos.
+
+Con SESSION_ENGINE = 'notes_home.session_backend' una página autenticada típica no hace
+ninguna consulta: la sesión y el usuario salen de la caché.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import User as DjangoUser
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject
+
+DEFAULT_AUTH_USER_CACHE = {
+    'ENABLED': False,
+    'CACHE_ALIAS': 'default',
+    'TTL': 30,
+    'KEY_PREFIX': 'notes_home:auth_user',
+}
+
+
+def get_auth_user_cache_settings() -> dict:
+    return {**DEFAULT_AUTH_USER_CACHE, **getattr(settings, 'AUTH_USER_CACHE', {})}
+
+
+def is_auth_user_cache_enabled() -> bool:
+    return bool(get_auth_user_cache_settings()['ENABLED'])
+
+
+def _cache_key(config, user_id, session_hash):
+    return f"{config['KEY_PREFIX']}:{user_id}:{session_hash}"
+
+
+def _session_cache_key(request, config):
+    """Clave de caché de la sesión actual, o None si la sesión no tiene usuario"""
+    user_id = request.session.get(SESSION_KEY)
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    if user_id is None or not session_hash:
+        return None
+    return _cache_key(config, user_id, session_hash)
+
+
+def get_cached_user(request):
+    config = get_auth_user_cache_settings()
+    cache = caches[config['CACHE_ALIAS']]
+    key = _session_cache_key(request, config)
+    if key is not None:
+        user = cache.get(key)
+        if user is not None:
+            return user
+    user = auth.get_user(request)
+    # get_user() puede haber vaciado la sesión si el hash no coincidía: se vuelve a leer la clave
+    key = _session_cache_key(request, config)
+    if user.is_authenticated and key is not None:
+        cache.set(key, user, config['TTL'])
+    return user
+
+
+async def aget_cached_user(request):
+    config = get_auth_user_cache_settings()
+    cache = caches[config['CACHE_ALIAS']]
+    key = await _asession_cache_key(request, config)
+    if key is not None:
+        user = await cache.aget(key)
+        if user is not None:
+            return user
+    user = await auth.aget_user(request)
+    key = await _asession_cache_key(request, config)
+    if user.is_authenticated and key is not None:
+        await cache.aset(key, user, config['TTL'])
+    return user
+
+
+async def _asession_cache_key(request, config):
+    user_id = await request.session.aget(SESSION_KEY)
+    session_hash = await request.session.aget(HASH_SESSION_KEY)
+    if user_id is None or not session_hash:
+        return None
+    return _cache_key(config, user_id, session_hash)
+
+
+def invalidate_auth_user(user, old_password=None):
+    """Borra las entradas del usuario (con el hash de la contraseña actual y, si cambió, la anterior)"""
+    config = get_auth_user_cache_settings()
+    keys = [_cache_key(config, user.pk, user.get_session_auth_hash())]
+    if old_password and old_password != user.password:
+        keys.append(_cache_key(config, user.pk, DjangoUser(password=old_password).get_session_auth_hash()))
+    caches[config['CACHE_ALIAS']].delete_many(keys)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware que carga request.user desde la caché cuando AUTH_USER_CACHE está activado
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        if not is_auth_user_cache_enabled():
+            return
+        request.user = SimpleLazyObject(lambda: _request_user(request))
+        request.auser = partial(_arequest_user, request)
+
+
+def _request_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_cached_user(request)
+    return request._cached_user
+
+
+async def _arequest_user(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await aget_cached_user(request)
+    return request._acached_user
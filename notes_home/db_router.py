@@ -0,0 +1,138 @@
+"""
+Router de base de datos primaria / réplica con lectura de las propias escrituras
+
+- Escrituras: siempre a 'default' (la primaria).
+- Lecturas de los modelos de DATABASE_ROUTING['REPLICA_MODELS'] (usuarios y estadísticas):
+  a 'replica', salvo que el contexto actual esté "fijado" a la primaria.
+- Tras cualquier escritura el contexto se fija a la primaria, así una lectura posterior en la
+  misma petición (registro seguido de autenticación) ve lo que se acaba de escribir.
+- ReplicaStickinessMiddleware lleva esa fijación a las peticiones siguientes del mismo
+  navegador durante STICKY_SECONDS con una cookie, para cubrir el retraso de replicación
+  (p. ej. el redirect a home justo después de registrarse).
+
+La fijación vive en una ContextVar: es por petición en vistas síncronas y asíncronas, y por
+proceso en comandos de gestión y en el shell.
+"""
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+PRIMARY_ALIAS = 'default'
+REPLICA_ALIAS = 'replica'
+
+DEFAULT_DATABASE_ROUTING = {
+    'STICKY_SECONDS': 5,
+    'COOKIE_NAME': 'db_primary_until',
+    'REPLICA_MODELS': ['auth.user', 'notes_home.userstats', 'notes_home.usersignupdaily'],
+}
+
+# Instante (time.time()) hasta el que las lecturas van a la primaria; 0 = sin fijar
+_pinned_until = ContextVar('db_pinned_until', default=0.0)
+
+
+def get_database_routing_settings() -> dict:
+    return {**DEFAULT_DATABASE_ROUTING, **getattr(settings, 'DATABASE_ROUTING', {})}
+
+
+def has_replica() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def pin_to_primary(seconds=None) -> None:
+    """Envía las lecturas del contexto actual a la primaria durante `seconds` segundos"""
+    if seconds is None:
+        seconds = get_database_routing_settings()['STICKY_SECONDS']
+    until = time.time() + seconds
+    if until > _pinned_until.get():
+        _pinned_until.set(until)
+
+
+def is_pinned_to_primary() -> bool:
+    return _pinned_until.get() > time.time()
+
+
+class PrimaryReplicaRouter:
+    """
+    Lecturas de usuarios a la réplica y escrituras a la primaria, con lectura de las propias escrituras
+    """
+
+    def __init__(self):
+        self.replica_models = set(get_database_routing_settings()['REPLICA_MODELS'])
+
+    def db_for_read(self, model, **hints):
+        if not has_replica() or model._meta.label_lower not in self.replica_models:
+            return PRIMARY_ALIAS
+        # Una instancia ya cargada (relaciones, refresh_from_db) se lee de donde vino
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return PRIMARY_ALIAS if is_pinned_to_primary() else REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplica tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación, no por migrate
+        return db == PRIMARY_ALIAS
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Fija las lecturas a la primaria en las peticiones que siguen a una escritura
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not has_replica():
+            raise MiddlewareNotUsed
+        config = get_database_routing_settings()
+        self.cookie_name = config['COOKIE_NAME']
+        self.sticky_seconds = config['STICKY_SECONDS']
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+            return self.finish(request, response)
+        finally:
+            _pinned_until.reset(token)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+            return self.finish(request, response)
+        finally:
+            _pinned_until.reset(token)
+
+    def start(self, request):
+        try:
+            until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            until = 0.0
+        # La cookie solo decide a qué base van las lecturas; un valor manipulado no da acceso a nada
+        request._db_pinned_on_arrival = until
+        return _pinned_until.set(until if until > time.time() else 0.0)
+
+    def finish(self, request, response):
+        until = _pinned_until.get()
+        if until > request._db_pinned_on_arrival and until > time.time():
+            response.set_cookie(
+                self.cookie_name, f'{until:.3f}',
+                max_age=self.sticky_seconds, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,87 @@
+"""
+Hashers de contraseñas con coste configurable
+
+Las subclases usan el mismo algoritmo (y formato de hash) que las de Django, pero leen su
+coste de settings.PASSWORD_HASHER_PARAMS en lugar de los valores fijos de cada versión de Django:
+
+    PASSWORD_HASHERS = ["notes_home.hashers.TunedPBKDF2PasswordHasher", ...]
+    PASSWORD_HASHER_PARAMS = {"PBKDF2_ITERATIONS": 600000}
+
+Un parámetro a None deja el valor por defecto de Django. El comando calibrar_hasher mide cada
+hasher en la máquina actual y recomienda estos valores según un presupuesto de latencia.
+
+Al cambiar el coste, los hashes guardados se actualizan en el siguiente login correcto:
+ModelBackend (LoginView) lo hace por sí mismo y UserRepository.authenticate usa needs_rehash().
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+    get_hasher,
+    identify_hasher,
+)
+
+DEFAULT_PASSWORD_HASHER_PARAMS = {
+    'PBKDF2_ITERATIONS': None,
+    'SCRYPT_WORK_FACTOR': None,
+    'BCRYPT_ROUNDS': None,
+    'ARGON2_TIME_COST': None,
+}
+
+
+def get_password_hasher_params() -> dict:
+    return {**DEFAULT_PASSWORD_HASHER_PARAMS, **getattr(settings, 'PASSWORD_HASHER_PARAMS', {})}
+
+
+def _param(name, default):
+    value = get_password_hasher_params()[name]
+    return int(value) if value else default
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _param('PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _param('SCRYPT_WORK_FACTOR', ScryptPasswordHasher.work_factor)
+
+    @property
+    def maxmem(self):
+        # OpenSSL limita scrypt a 32 MiB por defecto; con work_factor >= 2**15 no alcanza
+        return scrypt_maxmem(self.work_factor, self.block_size, self.parallelism)
+
+
+def scrypt_maxmem(work_factor, block_size, parallelism) -> int:
+    """Memoria máxima para scrypt: el doble de la que necesita (128 * n * r * p bytes)"""
+    return 256 * work_factor * block_size * parallelism
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return _param('BCRYPT_ROUNDS', BCryptSHA256PasswordHasher.rounds)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return _param('ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+
+def needs_rehash(encoded: str) -> bool:
+    """
+    True si el hash no usa el hasher preferido o sus parámetros actuales
+    No hashea nada: solo compara el algoritmo y los parámetros guardados en el hash.
+    """
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
@@ -0,0 +1,269 @@
+"""
+Limitación de intentos de login y registro por cliente con token buckets
+
+Cada regla es un cubo de BURST fichas que se rellena a PER_MINUTE fichas por minuto; cada
+intento gasta una ficha y sin fichas se rechaza antes de hashear la contraseña. Las reglas se
+configuran por ruta en settings.LOGIN_THROTTLE['ROUTES'] (nombre de la URL) y por clave:
+
+- 'ip': la IP del cliente (REMOTE_ADDR, o CLIENT_IP_HEADER detrás de un proxy de confianza)
+- 'username': el nombre de usuario del formulario, en minúsculas
+
+LoginThrottleMiddleware aplica las reglas a los POST de las rutas configuradas ('login' es el
+LoginView de lc_proyect/urls.py) y responde 429 con Retry-After. UserRepository.authenticate
+aplica la ruta 'authenticate' (por username) y lanza LoginThrottledError.
+
+Dos backends de almacenamiento, como UserCache:
+- 'local': diccionario LRU en memoria del proceso; cada cubo es una tupla (fichas, instante)
+- cualquier alias de settings.CACHES: compartido entre procesos. La lectura y la escritura no
+  son atómicas, así que con mucha concurrencia sobre la misma clave se puede colar algún intento.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+throttle_logger = logging.getLogger('notes_home.throttle')
+
+DEFAULT_LOGIN_THROTTLE = {
+    'ENABLED': False,
+    'BACKEND': 'local',
+    'MAX_ENTRIES': 100000,
+    'KEY_PREFIX': 'notes_home:throttle',
+    # Cabecera META con la IP real del cliente (p. ej. 'HTTP_X_REAL_IP'); None = REMOTE_ADDR
+    'CLIENT_IP_HEADER': None,
+    'ROUTES': {
+        'login': {
+            'ip': {'BURST': 20, 'PER_MINUTE': 10},
+            'username': {'BURST': 5, 'PER_MINUTE': 1},
+        },
+        'register': {
+            'ip': {'BURST': 5, 'PER_MINUTE': 1},
+        },
+        'authenticate': {
+            'username': {'BURST': 5, 'PER_MINUTE': 1},
+        },
+    },
+    'LOG_INTERVAL': 5.0,  # segundos entre líneas de log de rechazos
+}
+
+
+class LoginThrottledError(RuntimeError):
+    """Demasiados intentos para este cliente; retry_after = segundos hasta la siguiente ficha"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Demasiados intentos. Inténtalo de nuevo en {int(retry_after) + 1} segundos")
+        self.retry_after = retry_after
+
+
+def get_login_throttle_settings() -> dict:
+    return {**DEFAULT_LOGIN_THROTTLE, **getattr(settings, 'LOGIN_THROTTLE', {})}
+
+
+def is_login_throttle_enabled() -> bool:
+    return bool(get_login_throttle_settings()['ENABLED'])
+
+
+def take_token(bucket, now: float, burst: float, per_second: float):
+    """
+    Rellena el cubo hasta `now` e intenta gastar una ficha
+    Returns: (nuevo cubo, segundos de espera); 0 = permitido
+    """
+    tokens, stamp = bucket if bucket is not None else (burst, now)
+    tokens = min(burst, tokens + max(now - stamp, 0.0) * per_second)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / per_second
+
+
+class TokenBucketStore:
+    """
+    Cubos de fichas por clave con contadores de intentos permitidos y rechazados
+    """
+
+    def __init__(self, backend: str = 'local', max_entries: int = 100000, key_prefix: str = 'notes_home:throttle'):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.key_prefix = key_prefix
+        self.allowed = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # clave -> (fichas, instante), solo para backend 'local'
+        self._django_cache = None if backend == 'local' else caches[backend]
+
+    def _key(self, route: str, kind: str, value: str) -> str:
+        return f"{self.key_prefix}:{route}:{kind}:{value}"
+
+    def _count(self, wait: float) -> float:
+        with self._lock:
+            if wait:
+                self.throttled += 1
+            else:
+                self.allowed += 1
+        return wait
+
+    def consume(self, route: str, kind: str, value: str, burst: float, per_minute: float) -> float:
+        """Gasta una ficha del cubo; devuelve 0 si se permite o los segundos de espera"""
+        key = self._key(route, kind, value)
+        per_second = per_minute / 60
+        now = time.time()
+        if self._django_cache is not None:
+            bucket, wait = take_token(self._django_cache.get(key), now, burst, per_second)
+            # Pasado el tiempo de rellenado completo el cubo equivale a uno nuevo
+            self._django_cache.set(key, bucket, int(burst / per_second) + 1)
+            return self._count(wait)
+        with self._lock:
+            bucket, wait = take_token(self._buckets.get(key), now, burst, per_second)
+            self._buckets[key] = bucket
+            self._buckets.move_to_end(key)
+            # Olvidar un cubo equivale a dejarlo lleno: solo se expulsan los más antiguos
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return self._count(wait)
+
+    async def aconsume(self, route: str, kind: str, value: str, burst: float, per_minute: float) -> float:
+        if self._django_cache is None:
+            return self.consume(route, kind, value, burst, per_minute)
+        key = self._key(route, kind, value)
+        per_second = per_minute / 60
+        bucket, wait = take_token(await self._django_cache.aget(key), time.time(), burst, per_second)
+        await self._django_cache.aset(key, bucket, int(burst / per_second) + 1)
+        return self._count(wait)
+
+    def clear(self) -> None:
+        """Vacía los cubos locales y reinicia los contadores (no toca los backends compartidos)"""
+        with self._lock:
+            self._buckets.clear()
+            self.allowed = 0
+            self.throttled = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'allowed': self.allowed,
+                'throttled': self.throttled,
+                'size': len(self._buckets) if self._django_cache is None else None,
+            }
+
+
+_throttle_store = None
+_store_lock = threading.Lock()
+
+
+def get_throttle_store() -> TokenBucketStore:
+    """Devuelve el almacén del proceso, creado a partir de settings.LOGIN_THROTTLE"""
+    global _throttle_store
+    if _throttle_store is None:
+        with _store_lock:
+            if _throttle_store is None:
+                config = get_login_throttle_settings()
+                _throttle_store = TokenBucketStore(
+                    backend=config['BACKEND'],
+                    max_entries=config['MAX_ENTRIES'],
+                    key_prefix=config['KEY_PREFIX'],
+                )
+    return _throttle_store
+
+
+def _route_keys(route: str, **values):
+    """Pares (clave, valor, regla) de la ruta que tienen valor en esta petición"""
+    rules = get_login_throttle_settings()['ROUTES'].get(route, {})
+    for kind, rule in rules.items():
+        value = values.get(kind)
+        if value:
+            yield kind, value, rule
+
+
+def check_throttle(route: str, **values) -> float:
+    """
+    Gasta una ficha de cada regla de la ruta (p. ej. ip=..., username=...)
+    Returns: 0 si se permite el intento; si no, segundos hasta poder reintentar
+    """
+    if not is_login_throttle_enabled():
+        return 0.0
+    store = get_throttle_store()
+    for kind, value, rule in _route_keys(route, **values):
+        wait = store.consume(route, kind, value, rule['BURST'], rule['PER_MINUTE'])
+        if wait:
+            return wait
+    return 0.0
+
+
+async def acheck_throttle(route: str, **values) -> float:
+    if not is_login_throttle_enabled():
+        return 0.0
+    store = get_throttle_store()
+    for kind, value, rule in _route_keys(route, **values):
+        wait = await store.aconsume(route, kind, value, rule['BURST'], rule['PER_MINUTE'])
+        if wait:
+            return wait
+    return 0.0
+
+
+def normalize_username(username) -> str:
+    return (username or '').strip().lower()
+
+
+def get_client_ip(request, header=None) -> str:
+    if header:
+        forwarded = request.META.get(header, '')
+        if forwarded:
+            # X-Forwarded-For: cliente, proxy1, proxy2
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class LoginThrottleMiddleware(MiddlewareMixin):
+    """
+    Rechaza con 429 los POST a las rutas de LOGIN_THROTTLE['ROUTES'] que superan sus límites
+    """
+
+    def __init__(self, get_response):
+        if not is_login_throttle_enabled():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        config = get_login_throttle_settings()
+        self.client_ip_header = config['CLIENT_IP_HEADER']
+        self.log_interval = config['LOG_INTERVAL']
+        self._last_log = 0.0
+        self._logged_rejections = 0
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method != 'POST' or request.resolver_match is None:
+            return None
+        wait = check_throttle(
+            request.resolver_match.url_name,
+            ip=get_client_ip(request, self.client_ip_header),
+            username=normalize_username(request.POST.get('username')),
+        )
+        if not wait:
+            return None
+        self.log_rejections(request)
+        response = HttpResponse(
+            'Demasiados intentos. Inténtalo de nuevo más tarde.',
+            status=429,
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(int(wait) + 1)
+        return response
+
+    def log_rejections(self, request):
+        now = time.monotonic()
+        if now - self._last_log < self.log_interval:
+            return
+        self._last_log = now
+        stats = get_throttle_store().stats()
+        throttled = stats['throttled']
+        throttle_logger.warning(
+            '429 por límite de intentos en %s %s: %d rechazados desde la última línea; '
+            'total permitidos %d, rechazados %d',
+            request.method, request.path_info, throttled - self._logged_rejections,
+            stats['allowed'], throttled,
+        )
+        self._logged_rejections = throttled
@@ -0,0 +1,225 @@
+"""
+Management command para analizar el log de consultas SQL
+Uso: python manage.py analizar_sql [archivos ...] [opciones]
+
+Lee database_queries.log y sus archivos rotados (database_queries.log.1, .2.gz, ...) en
+streaming, agrupa las sentencias por huella (sin literales) y muestra por huella: número de
+ejecuciones, tiempo total, p50/p95 (aproximados con un histograma), máximo y primera aparición.
+La memoria depende del número de huellas distintas, no del tamaño del log.
+"""
+import bisect
+import glob
+import gzip
+import json
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from notes_home.sql_fingerprint import fingerprint
+
+# Cabecera de una entrada: "DEBUG 2025-11-05 18:50:57,737 [SQL] " (las sentencias pueden ocupar varias líneas)
+ENTRY_START = re.compile(r'^(DEBUG|INFO|WARNING|ERROR|CRITICAL) (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) \[SQL\] ')
+ENTRY_BODY = re.compile(r'^\((\d+(?:\.\d+)?)\) (.*?); args=.*?; alias=(\S+?)(?:; path=(\S*))?\s*$', re.DOTALL)
+
+# Límites superiores de los cubos del histograma en segundos: de 0.1 ms a ~1 h, factor 1.5
+BUCKET_BOUNDS = [0.0]
+_bound = 0.0001
+while _bound < 3600:
+    BUCKET_BOUNDS.append(_bound)
+    _bound *= 1.5
+
+
+class FingerprintStats:
+    """
+    Agregado de una huella con memoria constante
+    """
+    __slots__ = ('count', 'total', 'max', 'buckets', 'first_seen', 'example', 'paths')
+
+    def __init__(self, first_seen, example):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = {}
+        self.first_seen = first_seen
+        self.example = example
+        self.paths = set()
+
+    def add(self, duration, path):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        index = bisect.bisect_left(BUCKET_BOUNDS, duration)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        # Solo unas pocas rutas de ejemplo por huella
+        if path and len(self.paths) < 5:
+            self.paths.add(path)
+
+    def percentile(self, fraction):
+        """Límite superior del cubo donde cae el percentil (sin pasar del máximo observado)"""
+        target = fraction * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self, fingerprint_text):
+        return {
+            'fingerprint': fingerprint_text,
+            'count': self.count,
+            'total': round(self.total, 6),
+            'mean': round(self.total / self.count, 6),
+            'p50': round(self.percentile(0.50), 6),
+            'p95': round(self.percentile(0.95), 6),
+            'max': round(self.max, 6),
+            'first_seen': self.first_seen,
+            'example': self.example,
+            'paths': sorted(self.paths),
+        }
+
+
+class Command(BaseCommand):
+    help = 'Agrupa las consultas de database_queries.log por huella y muestra dónde se va el tiempo de BD.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'archivos',
+            nargs='*',
+            help='Logs a analizar (por defecto database_queries.log y sus rotados, incluidos .gz)',
+        )
+        parser.add_argument(
+            '--formato',
+            choices=['tabla', 'json'],
+            default='tabla',
+            help='Formato de salida (por defecto tabla)',
+        )
+        parser.add_argument(
+            '--orden',
+            choices=['total', 'count', 'p95', 'max'],
+            default='total',
+            help='Criterio de ordenación (por defecto tiempo total)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Número de huellas a mostrar (por defecto 20, 0 = todas)',
+        )
+        parser.add_argument(
+            '--min-count',
+            type=int,
+            default=1,
+            help='Ignora las huellas con menos ejecuciones',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['archivos'] or self.default_paths()
+        missing = [path for path in paths if not Path(path).exists()]
+        if missing:
+            raise CommandError(f'No existe: {", ".join(missing)}')
+        if not paths:
+            raise CommandError('No se encontró database_queries.log ni archivos rotados')
+
+        stats = {}
+        entries = 0
+        unparsed = 0
+        # Los rotados se leen del más antiguo al más reciente para que "primera aparición" sea correcta
+        for path in paths:
+            for timestamp, body in self.read_entries(path):
+                match = ENTRY_BODY.match(body)
+                if not match:
+                    unparsed += 1
+                    continue
+                entries += 1
+                duration = float(match.group(1))
+                sql = match.group(2).strip()
+                key = fingerprint(sql)
+                item = stats.get(key)
+                if item is None:
+                    item = stats[key] = FingerprintStats(f'{timestamp} ({Path(path).name})', sql[:500])
+                item.add(duration, match.group(4))
+
+        sort_key = {
+            'total': lambda pair: pair[1].total,
+            'count': lambda pair: pair[1].count,
+            'p95': lambda pair: pair[1].percentile(0.95),
+            'max': lambda pair: pair[1].max,
+        }[options['orden']]
+        rows = sorted(
+            ((key, item) for key, item in stats.items() if item.count >= options['min_count']),
+            key=sort_key, reverse=True,
+        )
+        if options['top']:
+            rows = rows[:options['top']]
+        grand_total = sum(item.total for item in stats.values())
+
+        if options['formato'] == 'json':
+            self.stdout.write(json.dumps({
+                'files': [str(path) for path in paths],
+                'entries': entries,
+                'unparsed': unparsed,
+                'fingerprints': len(stats),
+                'total': round(grand_total, 6),
+                'queries': [item.as_dict(key) for key, item in rows],
+            }, ensure_ascii=False, indent=2))
+            return
+        self.print_table(paths, entries, unparsed, stats, rows, grand_total)
+
+    def default_paths(self):
+        base = Path(settings.BASE_DIR) / 'database_queries.log'
+        rotated = [Path(path) for path in glob.glob(f'{base}.*')]
+
+        def rotation_number(path):
+            suffix = path.name[len(base.name) + 1:].split('.')[0]
+            return int(suffix) if suffix.isdigit() else 0
+
+        # database_queries.log.3.gz es más antiguo que .log.1, y ambos más que el actual
+        paths = sorted(rotated, key=rotation_number, reverse=True)
+        if base.exists():
+            paths.append(base)
+        return [str(path) for path in paths]
+
+    def read_entries(self, path):
+        """Genera (timestamp, cuerpo) uniendo las líneas de continuación de cada entrada"""
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8', errors='replace') as source:
+            timestamp = None
+            lines = []
+            for line in source:
+                match = ENTRY_START.match(line)
+                if match:
+                    if timestamp is not None:
+                        yield timestamp, ''.join(lines)
+                    timestamp = match.group(2)
+                    lines = [line[match.end():]]
+                elif timestamp is not None:
+                    lines.append(line)
+            if timestamp is not None:
+                yield timestamp, ''.join(lines)
+
+    def print_table(self, paths, entries, unparsed, stats, rows, grand_total):
+        self.stdout.write(self.style.SUCCESS('\n=== ANÁLISIS DE CONSULTAS SQL ==='))
+        self.stdout.write(f'Archivos: {", ".join(Path(path).name for path in paths)}')
+        self.stdout.write(
+            f'{entries} sentencias, {len(stats)} huellas distintas, {grand_total:.3f}s en total'
+            + (f' ({unparsed} entradas sin reconocer)' if unparsed else '')
+        )
+        if not rows:
+            return
+        self.stdout.write('')
+        self.stdout.write(f'{"#":>3} {"Ejec.":>8} {"Total(s)":>10} {"%":>6} {"p50(ms)":>9} {"p95(ms)":>9} {"Máx(ms)":>9}  Primera vez')
+        self.stdout.write('-' * 100)
+        for position, (key, item) in enumerate(rows, start=1):
+            share = item.total / grand_total * 100 if grand_total else 0
+            self.stdout.write(
+                f'{position:>3} {item.count:>8} {item.total:>10.3f} {share:>5.1f}% '
+                f'{item.percentile(0.50) * 1000:>9.1f} {item.percentile(0.95) * 1000:>9.1f} '
+                f'{item.max * 1000:>9.1f}  {item.first_seen}'
+            )
+            self.stdout.write(f'    {key[:300]}{" ..." if len(key) > 300 else ""}')
+            if item.paths:
+                self.stdout.write(f'    rutas: {", ".join(sorted(item.paths))}')
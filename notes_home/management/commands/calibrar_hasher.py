@@ -0,0 +1,178 @@
+"""
+Management command para medir el coste de los hashers de contraseñas en esta máquina
+Uso: python manage.py calibrar_hasher [--presupuesto-ms 100] [--repeticiones 5]
+
+Mide la latencia de hashear (make_password) y de verificar (check_password) con cada hasher
+disponible (pbkdf2_sha256, scrypt y, si están instaladas sus librerías, bcrypt_sha256 y argon2)
+y varios costes. Recomienda, para cada uno, el mayor coste que cabe en el presupuesto de
+latencia y muestra los settings correspondientes (PASSWORD_HASHER_PARAMS, notes_home/hashers.py).
+
+Conviene ejecutarlo en las máquinas de producción y con la carga habitual.
+"""
+import statistics
+import time
+
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+    get_hasher,
+)
+from django.core.management.base import BaseCommand, CommandError
+from notes_home.hashers import scrypt_maxmem
+
+# algoritmo -> (hasher de Django, atributo de coste, clave de PASSWORD_HASHER_PARAMS, hasher configurable, costes)
+HASHERS = {
+    'pbkdf2_sha256': (
+        PBKDF2PasswordHasher, 'iterations', 'PBKDF2_ITERATIONS', 'notes_home.hashers.TunedPBKDF2PasswordHasher',
+        (100_000, 200_000, 400_000, 600_000, 870_000, 1_000_000, 1_500_000, 2_000_000),
+    ),
+    'scrypt': (
+        ScryptPasswordHasher, 'work_factor', 'SCRYPT_WORK_FACTOR', 'notes_home.hashers.TunedScryptPasswordHasher',
+        (2 ** 13, 2 ** 14, 2 ** 15, 2 ** 16, 2 ** 17),
+    ),
+    'bcrypt_sha256': (
+        BCryptSHA256PasswordHasher, 'rounds', 'BCRYPT_ROUNDS', 'notes_home.hashers.TunedBCryptSHA256PasswordHasher',
+        (10, 11, 12, 13, 14),
+    ),
+    'argon2': (
+        Argon2PasswordHasher, 'time_cost', 'ARGON2_TIME_COST', 'notes_home.hashers.TunedArgon2PasswordHasher',
+        (1, 2, 3, 4, 6),
+    ),
+}
+
+# Se dejan de medir costes mayores cuando la latencia supera este múltiplo del presupuesto
+STOP_FACTOR = 4
+SAMPLE_PASSWORD = 'Calibracion.123'
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia de los hashers de contraseñas y recomienda costes para un presupuesto.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--presupuesto-ms',
+            type=float,
+            default=100.0,
+            help='Latencia máxima aceptable de un hash o una verificación, en ms (por defecto 100)',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=5,
+            help='Mediciones por hasher y coste; se usa la mediana (por defecto 5)',
+        )
+        parser.add_argument(
+            '--hasher',
+            action='append',
+            choices=list(HASHERS),
+            help='Hasher a medir (se puede repetir; por defecto todos los disponibles)',
+        )
+        parser.add_argument(
+            '--costes',
+            help='Lista de costes separados por comas (solo con un --hasher), p. ej. 300000,600000',
+        )
+
+    def handle(self, *args, **options):
+        budget = options['presupuesto_ms']
+        if budget <= 0 or options['repeticiones'] < 1:
+            raise CommandError('--presupuesto-ms y --repeticiones deben ser mayores que 0')
+        algorithms = options['hasher'] or list(HASHERS)
+        custom_costs = None
+        if options['costes']:
+            if len(algorithms) != 1:
+                raise CommandError('--costes requiere indicar un único --hasher')
+            try:
+                custom_costs = tuple(int(cost) for cost in options['costes'].split(','))
+            except ValueError:
+                raise CommandError('--costes debe ser una lista de enteros separados por comas')
+
+        current = get_hasher('default')
+        self.stdout.write(self.style.SUCCESS('\n=== CALIBRACIÓN DE HASHERS DE CONTRASEÑAS ==='))
+        self.stdout.write(
+            f'Presupuesto: {budget:g} ms por operación, mediana de {options["repeticiones"]} mediciones'
+        )
+        self.stdout.write(f'Hasher actual: {current.algorithm} ({self.describe_cost(current)})\n')
+        self.stdout.write(
+            f'{"Hasher":<15} {"Coste":>10} {"Hash ms":>10} {"Verificar ms":>13} {"Logins/s/núcleo":>16}'
+        )
+        self.stdout.write('-' * 68)
+
+        recommendations = {}
+        for algorithm in algorithms:
+            hasher_class, attribute, param, tuned_path, costs = HASHERS[algorithm]
+            if not self.is_available(hasher_class):
+                self.stdout.write(f'{algorithm:<15} {"(librería no instalada)":>10}')
+                continue
+            costs = custom_costs or costs
+            if algorithm == current.algorithm and custom_costs is None:
+                costs = sorted(set(costs) | {getattr(current, attribute)})
+            best = None
+            for cost in costs:
+                hash_ms, verify_ms = self.measure(hasher_class, attribute, cost, options['repeticiones'])
+                fits = max(hash_ms, verify_ms) <= budget
+                if fits:
+                    best = cost
+                marker = '  ✓' if fits else ''
+                self.stdout.write(
+                    f'{algorithm:<15} {cost:>10} {hash_ms:>10.1f} {verify_ms:>13.1f} {1000 / verify_ms:>16.1f}{marker}'
+                )
+                if verify_ms > budget * STOP_FACTOR:
+                    break
+            if best is None:
+                self.stdout.write(self.style.WARNING(f'  Ningún coste de {algorithm} cabe en {budget:g} ms'))
+            else:
+                recommendations[algorithm] = (param, tuned_path, best)
+
+        if not recommendations:
+            return
+        self.stdout.write(self.style.SUCCESS('\nRecomendación (mayor coste dentro del presupuesto):'))
+        self.stdout.write('PASSWORD_HASHER_PARAMS = {')
+        for param, _, cost in recommendations.values():
+            self.stdout.write(f'    "{param}": {cost},')
+        self.stdout.write('}')
+        preferred = current.algorithm if current.algorithm in recommendations else next(iter(recommendations))
+        self.stdout.write(
+            f'PASSWORD_HASHERS: "{recommendations[preferred][1]}" en primer lugar '
+            f'(el primero es el que se usa para los hashes nuevos)'
+        )
+        self.stdout.write(
+            '\nLos hashes existentes se actualizan a los nuevos parámetros en el siguiente login correcto.'
+        )
+
+    @staticmethod
+    def is_available(hasher_class) -> bool:
+        if hasher_class.library is None:
+            # pbkdf2 y scrypt no necesitan librerías externas
+            return True
+        try:
+            hasher_class()._load_library()
+        except ValueError:
+            return False
+        return True
+
+    @staticmethod
+    def describe_cost(hasher) -> str:
+        for hasher_class, attribute, param, _, _ in HASHERS.values():
+            if isinstance(hasher, hasher_class):
+                return f'{attribute}={getattr(hasher, attribute)}'
+        return 'coste no configurable'
+
+    @staticmethod
+    def measure(hasher_class, attribute, cost, repetitions):
+        """Medianas en ms de encode() y verify() con el coste indicado (tras una ejecución de calentamiento)"""
+        hasher = hasher_class()
+        setattr(hasher, attribute, cost)
+        if hasher_class is ScryptPasswordHasher:
+            hasher.maxmem = scrypt_maxmem(cost, hasher.block_size, hasher.parallelism)
+        hasher.verify(SAMPLE_PASSWORD, hasher.encode(SAMPLE_PASSWORD, hasher.salt()))
+        hash_times, verify_times = [], []
+        for _ in range(repetitions):
+            started = time.perf_counter()
+            encoded = hasher.encode(SAMPLE_PASSWORD, hasher.salt())
+            hash_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            hasher.verify(SAMPLE_PASSWORD, encoded)
+            verify_times.append(time.perf_counter() - started)
+        return statistics.median(hash_times) * 1000, statistics.median(verify_times) * 1000
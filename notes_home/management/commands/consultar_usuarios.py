@@ -1,11 +1,27 @@
 """
 Management command para consultar usuarios desde la consola
 Uso: python manage.py consultar_usuarios [opciones]
+
+Los listados (--listar, --activos, --inactivos) se ordenan por ID y se pueden exportar:
+    python manage.py consultar_usuarios --listar --formato csv > usuarios.csv
+    python manage.py consultar_usuarios --listar --limite 100 --despues-de-id 500
 """
+import csv
+import io
+import json
+
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User as DjangoUser
-from notes_home.repositories.user_repository import UserRepository
+from notes_home.repositories import get_user_repository
+from notes_home.repositories.user_search import DEFAULT_SEARCH_LIMIT, rebuild_search_index
 from notes_home.services.auth_service import AuthService
+from notes_home.user_stats import get_signups_per_day, get_user_stats, recalculate_user_stats
+
+# Columnas de los listados, en orden de salida
+LIST_COLUMNS = ('id', 'username', 'email', 'is_active', 'date_joined')
+# Filas por viaje a la base de datos y filas por escritura en la salida
+ITERATOR_CHUNK_SIZE = 2000
+WRITE_BLOCK_SIZE = 1000
 
 
 class Command(BaseCommand):
@@ -28,6 +44,22 @@ class Command(BaseCommand):
             action='store_true',
             help='Lista solo usuarios inactivos',
         )
+        parser.add_argument(
+            '--formato',
+            choices=['texto', 'json', 'jsonl', 'csv'],
+            default='texto',
+            help='Formato de salida de los listados (por defecto texto)',
+        )
+        parser.add_argument(
+            '--limite',
+            type=int,
+            help='Número máximo de usuarios a listar',
+        )
+        parser.add_argument(
+            '--despues-de-id',
+            type=int,
+            help='Lista solo usuarios con ID mayor que este (paginación por ID)',
+        )
         
         # Opciones para buscar usuarios
         parser.add_argument(
@@ -45,6 +77,11 @@ class Command(BaseCommand):
             type=str,
             help='Busca usuarios por email (puede ser parcial)',
         )
+        parser.add_argument(
+            '--buscar',
+            type=str,
+            help='Busca usuarios cuyo username o email contiene el texto (usa --limite, por defecto 20)',
+        )
         
         # Opciones para verificar existencia
         parser.add_argument(
@@ -64,6 +101,16 @@ class Command(BaseCommand):
             action='store_true',
             help='Muestra estadísticas de usuarios',
         )
+        parser.add_argument(
+            '--recalcular-estadisticas',
+            action='store_true',
+            help='Reconstruye el resumen de estadísticas desde la tabla de usuarios',
+        )
+        parser.add_argument(
+            '--reindexar-busqueda',
+            action='store_true',
+            help='Reconstruye el índice de búsqueda por username/email (SQLite FTS5)',
+        )
         
         # Opciones para crear usuario
         parser.add_argument(
@@ -88,15 +135,18 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        user_repo = UserRepository()
+        user_repo = get_user_repository()
         
+        if options['limite'] is not None and options['limite'] < 1:
+            raise CommandError('--limite debe ser mayor que 0')
+
         # Listar usuarios
         if options['listar']:
-            self.listar_usuarios()
+            self.listar(None, options)
         elif options['activos']:
-            self.listar_usuarios_activos()
+            self.listar(True, options)
         elif options['inactivos']:
-            self.listar_usuarios_inactivos()
+            self.listar(False, options)
         
         # Buscar usuarios
         elif options['buscar_username']:
@@ -104,7 +154,9 @@ class Command(BaseCommand):
         elif options['buscar_id']:
             self.buscar_por_id(user_repo, options['buscar_id'])
         elif options['buscar_email']:
-            self.buscar_por_email(options['buscar_email'])
+            self.buscar_por_email(user_repo, options['buscar_email'], options['limite'] or DEFAULT_SEARCH_LIMIT)
+        elif options['buscar']:
+            self.buscar(user_repo, options['buscar'], options['limite'] or DEFAULT_SEARCH_LIMIT)
         
         # Verificar existencia
         elif options['existe_username']:
@@ -115,6 +167,11 @@ class Command(BaseCommand):
         # Estadísticas
         elif options['estadisticas']:
             self.mostrar_estadisticas()
+        elif options['recalcular_estadisticas']:
+            self.recalcular_estadisticas()
+        elif options['reindexar_busqueda']:
+            total = rebuild_search_index()
+            self.stdout.write(self.style.SUCCESS(f'\n✓ Índice de búsqueda reconstruido: {total} usuarios'))
         
         # Crear usuario
         elif options['crear']:
@@ -128,37 +185,107 @@ class Command(BaseCommand):
             self.stdout.write('')
             self.stdout.write('Ejemplos de uso:')
             self.stdout.write('  python manage.py consultar_usuarios --listar')
+            self.stdout.write('  python manage.py consultar_usuarios --listar --formato jsonl --limite 1000')
             self.stdout.write('  python manage.py consultar_usuarios --buscar-username juan')
             self.stdout.write('  python manage.py consultar_usuarios --estadisticas')
             self.stdout.write('  python manage.py consultar_usuarios --existe-email juan@example.com')
 
-    def listar_usuarios(self):
-        """Lista todos los usuarios"""
-        users = DjangoUser.objects.all().order_by('username')
-        self.stdout.write(self.style.SUCCESS(f'\nTotal de usuarios: {users.count()}\n'))
-        
-        for user in users:
-            estado = 'ACTIVO' if user.is_active else 'INACTIVO'
-            self.stdout.write(f'  [{user.id}] {user.username} - {user.email} ({estado}) ')
-            self.stdout.write(f'      Registrado: {user.date_joined}')
+    def listar(self, is_active, options):
+        """
+        Lista usuarios en streaming: proyección de las columnas mostradas, iterator() por bloques,
+        paginación por id (keyset) y escritura en bloques; la memoria no depende del número de filas
+        """
+        users = DjangoUser.objects.all()
+        if is_active is not None:
+            users = users.filter(is_active=is_active)
+        if options['despues_de_id'] is not None:
+            users = users.filter(id__gt=options['despues_de_id'])
+        users = users.order_by('id').values_list(*LIST_COLUMNS)
+        if options['limite']:
+            users = users[:options['limite']]
+        rows = users.iterator(chunk_size=ITERATOR_CHUNK_SIZE)
 
-    def listar_usuarios_activos(self):
-        """Lista solo usuarios activos"""
-        users = DjangoUser.objects.filter(is_active=True).order_by('username')
-        self.stdout.write(self.style.SUCCESS(f'\nUsuarios activos: {users.count()}\n'))
-        
-        for user in users:
-            self.stdout.write(f'  [{user.id}] {user.username} - {user.email}')
-            self.stdout.write(f'      Registrado: {user.date_joined}')
+        writer = getattr(self, f'escribir_{options["formato"]}')
+        count, last_id = writer(rows, is_active)
 
-    def listar_usuarios_inactivos(self):
-        """Lista solo usuarios inactivos"""
-        users = DjangoUser.objects.filter(is_active=False).order_by('username')
-        self.stdout.write(self.style.SUCCESS(f'\nUsuarios inactivos: {users.count()}\n'))
-        
-        for user in users:
-            self.stdout.write(f'  [{user.id}] {user.username} - {user.email}')
-            self.stdout.write(f'      Registrado: {user.date_joined}')
+        if options['formato'] == 'texto':
+            titulo = {None: 'Total de usuarios', True: 'Usuarios activos', False: 'Usuarios inactivos'}[is_active]
+            self.stdout.write(self.style.SUCCESS(f'\n{titulo}: {count}'))
+            if options['limite'] and count == options['limite']:
+                self.stdout.write(f'  Siguiente página: --despues-de-id {last_id}')
+
+    def write_blocks(self, lines):
+        """Escribe las líneas agrupadas en bloques de WRITE_BLOCK_SIZE; devuelve (filas, último id)"""
+        count = 0
+        last_id = None
+        block = []
+        for row_id, line in lines:
+            block.append(line)
+            count += 1
+            last_id = row_id
+            if len(block) >= WRITE_BLOCK_SIZE:
+                self.stdout.write(''.join(block), ending='')
+                block.clear()
+        if block:
+            self.stdout.write(''.join(block), ending='')
+        return count, last_id
+
+    def escribir_texto(self, rows, is_active):
+        self.stdout.write('')
+
+        def lines():
+            for user_id, username, email, activo, date_joined in rows:
+                estado = f' ({"ACTIVO" if activo else "INACTIVO"}) ' if is_active is None else ''
+                yield user_id, (
+                    f'  [{user_id}] {username} - {email}{estado}\n'
+                    f'      Registrado: {date_joined}\n'
+                )
+        return self.write_blocks(lines())
+
+    def escribir_jsonl(self, rows, is_active):
+        def lines():
+            for row in rows:
+                yield row[0], json.dumps(self.row_dict(row), ensure_ascii=False) + '\n'
+        return self.write_blocks(lines())
+
+    def escribir_json(self, rows, is_active):
+        # Un array JSON escrito elemento a elemento, sin construir la lista en memoria
+        def lines():
+            separator = '[\n'
+            for row in rows:
+                yield row[0], separator + '  ' + json.dumps(self.row_dict(row), ensure_ascii=False)
+                separator = ',\n'
+        count, last_id = self.write_blocks(lines())
+        self.stdout.write('[]' if not count else '\n]')
+        return count, last_id
+
+    def escribir_csv(self, rows, is_active):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(LIST_COLUMNS)
+
+        def lines():
+            for row in rows:
+                writer.writerow(row[:4] + (row[4].isoformat(),))
+                line = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                yield row[0], line
+        self.stdout.write(buffer.getvalue(), ending='')
+        buffer.seek(0)
+        buffer.truncate()
+        return self.write_blocks(lines())
+
+    @staticmethod
+    def row_dict(row):
+        user_id, username, email, is_active, date_joined = row
+        return {
+            'id': user_id,
+            'username': username,
+            'email': email,
+            'is_active': is_active,
+            'date_joined': date_joined.isoformat(),
+        }
 
     def buscar_por_username(self, user_repo, username):
         """Busca un usuario por username"""
@@ -188,17 +315,28 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.ERROR(f'\nUsuario con ID {user_id} no encontrado'))
 
-    def buscar_por_email(self, email):
-        """Busca usuarios por email (puede ser parcial)"""
-        users = DjangoUser.objects.filter(email__icontains=email)
+    def buscar_por_email(self, user_repo, email, limite):
+        """Busca usuarios por email (puede ser parcial) con el índice de búsqueda"""
+        users = user_repo.search(email, fields=('email',), limit=limite)
         
-        if users.exists():
-            self.stdout.write(self.style.SUCCESS(f'\nUsuarios encontrados ({users.count()}):\n'))
+        if users:
+            self.stdout.write(self.style.SUCCESS(f'\nUsuarios encontrados ({len(users)}):\n'))
             for user in users:
                 self.stdout.write(f'  [{user.id}] {user.username} - {user.email}')
         else:
             self.stdout.write(self.style.ERROR(f'\nNo se encontraron usuarios con email que contenga "{email}"'))
 
+    def buscar(self, user_repo, texto, limite):
+        """Busca usuarios cuyo username o email contiene el texto, ordenados por relevancia"""
+        users = user_repo.search(texto, limit=limite)
+        
+        if users:
+            self.stdout.write(self.style.SUCCESS(f'\nUsuarios encontrados ({len(users)}):\n'))
+            for user in users:
+                self.stdout.write(f'  [{user.id}] {user.username} - {user.email}')
+        else:
+            self.stdout.write(self.style.ERROR(f'\nNo se encontraron usuarios que contengan "{texto}"'))
+
     def verificar_username(self, user_repo, username):
         """Verifica si existe un username"""
         existe = user_repo.exists_by_username(username)
@@ -218,20 +356,33 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f'\n✓ El email "{email}" está disponible'))
 
     def mostrar_estadisticas(self):
-        """Muestra estadísticas de usuarios"""
-        total = DjangoUser.objects.count()
-        activos = DjangoUser.objects.filter(is_active=True).count()
-        inactivos = DjangoUser.objects.filter(is_active=False).count()
+        """Muestra estadísticas de usuarios (fila resumen o un solo aggregate)"""
+        stats = get_user_stats()
+        total = stats['total']
+        activos = stats['activos']
         
         self.stdout.write(self.style.SUCCESS('\n=== ESTADÍSTICAS DE USUARIOS ===\n'))
         self.stdout.write(f'  Total de usuarios: {total}')
         self.stdout.write(f'  Usuarios activos: {activos}')
-        self.stdout.write(f'  Usuarios inactivos: {inactivos}')
+        self.stdout.write(f'  Usuarios inactivos: {stats["inactivos"]}')
         
         if total > 0:
             porcentaje_activos = (activos / total) * 100
             self.stdout.write(f'  Porcentaje activos: {porcentaje_activos:.1f}%')
 
+        altas = get_signups_per_day()
+        if altas:
+            self.stdout.write('\n  Altas por día:')
+            for day, count in altas:
+                self.stdout.write(f'    {day}: {count}')
+
+    def recalcular_estadisticas(self):
+        """Reconstruye el resumen de estadísticas desde auth_user"""
+        row = recalculate_user_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Estadísticas recalculadas: {row.total} usuarios, {row.active} activos'
+        ))
+
     def crear_usuario(self, user_repo, username, email, password):
         """Crea un nuevo usuario"""
         from notes_home.domain.entities import User as DomainUser
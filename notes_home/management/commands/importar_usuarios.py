@@ -0,0 +1,221 @@
+"""
+Management command para importar usuarios de forma masiva
+Uso: python manage.py importar_usuarios usuarios.csv [opciones]
+
+Formato de entrada (CSV con cabecera o JSON Lines): username, email, password y opcionalmente is_active.
+El archivo se lee en streaming por lotes, las contraseñas se hashean en un pool de procesos
+y cada lote se inserta con bulk_create dentro de una transacción. La memoria usada es
+constante: solo se mantiene en memoria el lote actual.
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User as DjangoUser
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from notes_home.domain.entities import User as DomainUser
+from notes_home.password_hashing import init_hashing_worker, validate_and_make_password
+from notes_home.signals import users_bulk_created
+
+REJECT_FIELDS = ['linea', 'username', 'email', 'error']
+
+
+class Command(BaseCommand):
+    help = 'Importa usuarios de forma masiva desde un archivo CSV o JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'archivo',
+            type=str,
+            help='Ruta del archivo a importar',
+        )
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'jsonl'],
+            help='Formato del archivo (por defecto se deduce de la extensión)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Número de filas por lote de bulk_create (por defecto 1000)',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Número de procesos para hashear contraseñas (por defecto todos los núcleos)',
+        )
+        parser.add_argument(
+            '--rechazados',
+            type=str,
+            help='Archivo CSV donde escribir las filas rechazadas (por defecto <archivo>.rechazados.csv)',
+        )
+        parser.add_argument(
+            '--sin-validar-password',
+            action='store_true',
+            help='No aplica los validadores de contraseña de Django (más rápido)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['archivo']
+        if not os.path.exists(path):
+            raise CommandError(f'El archivo "{path}" no existe')
+        if options['lote'] < 1 or options['procesos'] < 1:
+            raise CommandError('--lote y --procesos deben ser mayores que 0')
+
+        formato = options['formato'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        reject_path = options['rechazados'] or f'{path}.rechazados.csv'
+        validate = not options['sin_validar_password']
+
+        self.created = 0
+        self.rejected = 0
+        started = time.monotonic()
+
+        with open(path, newline='', encoding='utf-8') as source, \
+                open(reject_path, 'w', newline='', encoding='utf-8') as reject_file, \
+                ProcessPoolExecutor(max_workers=options['procesos'], mp_context=get_context('spawn'),
+                                    initializer=init_hashing_worker) as pool:
+            self.rejects = csv.DictWriter(reject_file, fieldnames=REJECT_FIELDS)
+            self.rejects.writeheader()
+            rows = self.read_rows(source, formato)
+            while True:
+                batch = list(islice(rows, options['lote']))
+                if not batch:
+                    break
+                self.import_batch(batch, pool, validate, options['procesos'])
+                elapsed = time.monotonic() - started
+                processed = self.created + self.rejected
+                self.stdout.write(
+                    f'  {processed} filas procesadas ({self.created} creadas, {self.rejected} rechazadas) '
+                    f'- {processed / elapsed:.0f} filas/s'
+                )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Importación terminada en {elapsed:.1f}s: {self.created} usuarios creados, '
+            f'{self.rejected} rechazados ({(self.created + self.rejected) / elapsed if elapsed else 0:.0f} filas/s)'
+        ))
+        if self.rejected:
+            self.stdout.write(self.style.WARNING(f'  Filas rechazadas en: {reject_path}'))
+
+    def read_rows(self, source, formato):
+        """Genera (número de línea, dict) sin cargar el archivo completo"""
+        if formato == 'csv':
+            for line_number, row in enumerate(csv.DictReader(source), start=2):
+                yield line_number, row
+            return
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {'_error': f'JSON inválido: {e}'}
+
+    def reject(self, line_number, row, error):
+        self.rejected += 1
+        self.rejects.writerow({
+            'linea': line_number,
+            'username': row.get('username', ''),
+            'email': row.get('email', ''),
+            'error': error,
+        })
+
+    def import_batch(self, batch, pool, validate, processes):
+        """Valida, hashea e inserta un lote"""
+        candidates = []
+        seen_usernames = set()
+        seen_emails = set()
+        for line_number, row in batch:
+            if '_error' in row:
+                self.reject(line_number, row, row['_error'])
+                continue
+            username = DjangoUser.normalize_username((row.get('username') or '').strip())
+            email = DjangoUser.objects.normalize_email((row.get('email') or '').strip())
+            password = (row.get('password') or '').strip()
+            is_active = str(row.get('is_active', True)).strip().lower() not in ('0', 'false', 'no')
+            try:
+                DomainUser(username=username, email=email, password=password)
+            except ValueError as e:
+                self.reject(line_number, row, str(e))
+                continue
+            if username in seen_usernames:
+                self.reject(line_number, row, 'El nombre de usuario está repetido en el archivo')
+                continue
+            if email.lower() in seen_emails:
+                self.reject(line_number, row, 'El email está repetido en el archivo')
+                continue
+            seen_usernames.add(username)
+            seen_emails.add(email.lower())
+            candidates.append((line_number, row, username, email, password, is_active))
+
+        if not candidates:
+            return
+
+        # Duplicados contra la base de datos: una consulta por campo para todo el lote
+        taken_usernames = set(
+            DjangoUser.objects.filter(username__in=seen_usernames).values_list('username', flat=True)
+        )
+        # La condición literal email <> '' es la del índice parcial LOWER(email) de la migración
+        # 0001_user_email_ci_unique: sin ella (o con exclude(email=''), que va con parámetro)
+        # el motor no puede usar el índice y recorre auth_user entera en cada lote
+        taken_emails = set(
+            DjangoUser.objects.annotate(email_lower=Lower('email'))
+            .filter(RawSQL("email <> ''", [], output_field=BooleanField()), email_lower__in=seen_emails)
+            .values_list('email_lower', flat=True)
+        )
+        pending = []
+        for candidate in candidates:
+            line_number, row, username, email, _, _ = candidate
+            if username in taken_usernames:
+                self.reject(line_number, row, 'El nombre de usuario ya está en uso')
+            elif email.lower() in taken_emails:
+                self.reject(line_number, row, 'El email ya está registrado')
+            else:
+                pending.append(candidate)
+
+        if not pending:
+            return
+
+        jobs = [(password, username, email, validate) for _, _, username, email, password, _ in pending]
+        chunksize = max(1, len(jobs) // (processes * 4))
+        users = []
+        for candidate, (encoded, error) in zip(pending, pool.map(validate_and_make_password, jobs, chunksize=chunksize)):
+            line_number, row, username, email, _, is_active = candidate
+            if error:
+                self.reject(line_number, row, error)
+                continue
+            users.append((line_number, row, DjangoUser(
+                username=username, email=email, password=encoded, is_active=is_active
+            )))
+
+        self.insert_users(users)
+
+    def insert_users(self, users):
+        """bulk_create en una transacción; si otro proceso insertó un duplicado entretanto, fila a fila"""
+        if not users:
+            return
+        try:
+            with transaction.atomic():
+                created = DjangoUser.objects.bulk_create([user for _, _, user in users])
+        except IntegrityError:
+            # save() dispara post_save para cada fila, así que aquí no se envía users_bulk_created
+            for line_number, row, user in users:
+                try:
+                    with transaction.atomic():
+                        user.save(force_insert=True)
+                    self.created += 1
+                except IntegrityError as e:
+                    self.reject(line_number, row, f'Duplicado en la base de datos: {e}')
+            return
+        self.created += len(created)
+        users_bulk_created.send(sender=DjangoUser, users=created)
@@ -0,0 +1,43 @@
+"""
+Management command para borrar las sesiones caducadas por bloques
+Uso: python manage.py limpiar_sesiones [--lote 5000] [--pausa 0.1]
+
+A diferencia de un único DELETE sobre toda la tabla, cada bloque es una transacción corta,
+así la limpieza no bloquea los logins mientras se ejecuta. Pensado para cron.
+"""
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from notes_home.session_backend import SessionStore, get_session_write_behind_settings
+
+
+class Command(BaseCommand):
+    help = 'Borra las sesiones caducadas de django_session en bloques.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=get_session_write_behind_settings()['CLEANUP_BATCH_SIZE'],
+            help='Sesiones borradas por transacción (por defecto SESSION_WRITE_BEHIND["CLEANUP_BATCH_SIZE"])',
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.0,
+            help='Segundos de espera entre bloques',
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['pausa'] < 0:
+            raise CommandError('--lote debe ser mayor que 0 y --pausa no puede ser negativa')
+        started = time.monotonic()
+        deleted = SessionStore.clear_expired(batch_size=options['lote'], pause=options['pausa'])
+        remaining = Session.objects.filter(expire_date__lt=timezone.now()).exists()
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ {deleted} sesiones caducadas borradas en {time.monotonic() - started:.1f}s'
+        ))
+        if remaining:
+            self.stdout.write(self.style.WARNING('  Quedan sesiones caducadas (caducaron durante la limpieza)'))
@@ -0,0 +1,166 @@
+"""
+Management command para medir el rendimiento de SQLite con y sin el perfil de ajustes
+Uso: python manage.py medir_sqlite [opciones]
+
+Crea una base de datos temporal (no toca la del proyecto) con una tabla de usuarios de prueba
+y lanza lectores y escritores concurrentes durante unos segundos, primero con los PRAGMAs por
+defecto y después con settings.SQLITE_TUNING. Muestra lecturas/s, escrituras/s y los errores
+"database is locked" de cada configuración.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from notes_home.sqlite_tuning import apply_pragmas, get_sqlite_tuning_settings, pragma_statements
+
+SCHEMA = '''
+CREATE TABLE usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL,
+    last_login TEXT
+)
+'''
+
+
+class Command(BaseCommand):
+    help = 'Compara lecturas/escrituras concurrentes en SQLite con y sin el perfil SQLITE_TUNING.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            default=20000,
+            help='Filas iniciales de la tabla de prueba (por defecto 20000)',
+        )
+        parser.add_argument(
+            '--lectores',
+            type=int,
+            default=4,
+            help='Hilos lectores (por defecto 4)',
+        )
+        parser.add_argument(
+            '--escritores',
+            type=int,
+            default=2,
+            help='Hilos escritores (por defecto 2)',
+        )
+        parser.add_argument(
+            '--segundos',
+            type=float,
+            default=5.0,
+            help='Duración de cada medición (por defecto 5)',
+        )
+
+    def handle(self, *args, **options):
+        if options['filas'] < 1 or options['segundos'] <= 0:
+            raise CommandError('--filas y --segundos deben ser mayores que 0')
+
+        tuning = get_sqlite_tuning_settings()
+        results = []
+        for label, config in (('sin ajustes', None), ('SQLITE_TUNING', tuning)):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'medir.sqlite3')
+                self.prepare(path, options['filas'], config)
+                results.append((label, self.run(path, config, options)))
+
+        self.stdout.write(self.style.SUCCESS('\n=== SQLITE: LECTURAS Y ESCRITURAS CONCURRENTES ==='))
+        self.stdout.write(
+            f'{options["lectores"]} lectores, {options["escritores"]} escritores, '
+            f'{options["segundos"]:g}s por medición, {options["filas"]} filas\n'
+        )
+        self.stdout.write(f'{"Configuración":<16} {"Lecturas/s":>12} {"Escrituras/s":>14} {"Bloqueos":>10}')
+        self.stdout.write('-' * 56)
+        for label, (reads, writes, locked) in results:
+            seconds = options['segundos']
+            self.stdout.write(f'{label:<16} {reads / seconds:>12.0f} {writes / seconds:>14.0f} {locked:>10}')
+        self.stdout.write('\nPRAGMAs aplicados: ' + '; '.join(
+            statement.replace('PRAGMA ', '') for statement in pragma_statements(tuning)
+        ))
+
+    @staticmethod
+    def is_lock_error(error):
+        return 'locked' in str(error) or 'busy' in str(error)
+
+    def connect(self, path, config):
+        # timeout=5 es el valor por defecto de sqlite3 (y el que usa Django si no se configura)
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        if config is not None:
+            apply_pragmas(connection, config)
+        return connection
+
+    def prepare(self, path, rows, config):
+        connection = self.connect(path, config)
+        connection.execute(SCHEMA)
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO usuarios (username, email) VALUES (?, ?)',
+            ((f'usuario{i}', f'usuario{i}@example.com') for i in range(rows)),
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run(self, path, config, options):
+        rows = options['filas']
+        deadline = time.monotonic() + options['segundos']
+        counters = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def reader():
+            connection = self.connect(path, config)
+            done = locked = 0
+            while time.monotonic() < deadline:
+                try:
+                    connection.execute(
+                        'SELECT id, email FROM usuarios WHERE username = ?', (f'usuario{random.randrange(rows)}',)
+                    ).fetchone()
+                    done += 1
+                except sqlite3.OperationalError as e:
+                    if not self.is_lock_error(e):
+                        raise
+                    locked += 1
+            connection.close()
+            with lock:
+                counters['reads'] += done
+                counters['locked'] += locked
+
+        def writer(number):
+            connection = self.connect(path, config)
+            done = locked = 0
+            sequence = 0
+            while time.monotonic() < deadline:
+                try:
+                    # Un alta y una actualización por transacción, como registro + login
+                    connection.execute('BEGIN IMMEDIATE')
+                    connection.execute(
+                        'INSERT INTO usuarios (username, email) VALUES (?, ?)',
+                        (f'nuevo{number}_{sequence}', f'nuevo{number}_{sequence}@example.com'),
+                    )
+                    connection.execute(
+                        "UPDATE usuarios SET last_login = datetime('now') WHERE id = ?", (random.randrange(1, rows),)
+                    )
+                    connection.execute('COMMIT')
+                    done += 1
+                    sequence += 1
+                except sqlite3.OperationalError as e:
+                    if not self.is_lock_error(e):
+                        raise
+                    locked += 1
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+            connection.close()
+            with lock:
+                counters['writes'] += done
+                counters['locked'] += locked
+
+        threads = [threading.Thread(target=reader) for _ in range(options['lectores'])]
+        threads += [threading.Thread(target=writer, args=(n,)) for n in range(options['escritores'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counters['reads'], counters['writes'], counters['locked']
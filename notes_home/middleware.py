@@ -1,54 +1,148 @@
 """
 Middleware para registrar operaciones de base de datos (UPDATE y DELETE)
 """
-import logging
+from django.db import transaction
+from django.db.backends.signals import connection_created
 from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
+from notes_home import audit
+from notes_home.auth_cache import invalidate_auth_user, is_auth_user_cache_enabled
+from notes_home.repositories.membership_index import get_membership_index, is_membership_index_enabled
+from notes_home.repositories.user_cache import get_user_cache, is_user_cache_enabled
+from notes_home.repositories.user_search import index_users, unindex_user
+from notes_home.query_profiler import install_query_profiler, is_query_profiler_enabled
+from notes_home.signals import users_bulk_created
+from notes_home.sql_logging import install_sql_logging, is_sql_logging_enabled
+from notes_home.sqlite_tuning import apply_sqlite_tuning, is_sqlite_tuning_enabled
+from notes_home.tracking import get_changes, track_changes
+from notes_home.user_stats import is_user_stats_enabled, record_active_changed, record_created, record_deleted
 
-# Logger para operaciones de base de datos
-db_operations_logger = logging.getLogger('database_operations')
+# Campos cuyo cambio se registra en los UPDATE de usuario
+# (password solo se sigue para invalidar la caché de autenticación; nunca se registra)
+track_changes(User, ['username', 'email', 'is_active', 'password'])
+
+# PRAGMAs de rendimiento (WAL, mmap, caché, busy_timeout) en cada conexión SQLite nueva
+if is_sqlite_tuning_enabled():
+    connection_created.connect(apply_sqlite_tuning, dispatch_uid='notes_home.sqlite_tuning')
+
+# Log de SQL por umbral y muestreo en cada conexión nueva
+if is_sql_logging_enabled():
+    connection_created.connect(install_sql_logging, dispatch_uid='notes_home.sql_logging')
+
+# Conteo de consultas por petición (QueryProfilerMiddleware)
+if is_query_profiler_enabled():
+    connection_created.connect(install_query_profiler, dispatch_uid='notes_home.query_profiler')
+
+
+# Las cachés se invalidan al confirmar la transacción: antes, una lectura concurrente aún vería
+# la fila anterior y la volvería a guardar en caché hasta que caducara.
+# Los valores se copian ahora porque la instancia puede cambiar antes del commit.
+def _invalidate_user_cache_on_commit(instance, old_identity, using):
+    user_id, username, email = instance.pk, instance.username, instance.email
+
+    def invalidate():
+        cache = get_user_cache()
+        cache.invalidate_user(user_id, username, email)
+        if old_identity:
+            cache.invalidate_user(None, *old_identity)
+    transaction.on_commit(invalidate, using=using)
+
+
+def _invalidate_auth_user_on_commit(instance, old_password, using):
+    user = User(pk=instance.pk, password=instance.password)
+    transaction.on_commit(lambda: invalidate_auth_user(user, old_password), using=using)
 
 
 @receiver(pre_save, sender=User)
 def log_user_pre_save(sender, instance, **kwargs):
     """Registra cuando se va a guardar un usuario (UPDATE)"""
     if instance.pk:  # Si tiene pk, es una actualización
-        try:
-            old_instance = User.objects.get(pk=instance.pk)
-            # Verificar si hay cambios
-            changes = []
-            if old_instance.username != instance.username:
-                changes.append(f"username: '{old_instance.username}' -> '{instance.username}'")
-            if old_instance.email != instance.email:
-                changes.append(f"email: '{old_instance.email}' -> '{instance.email}'")
-            if old_instance.is_active != instance.is_active:
-                changes.append(f"is_active: {old_instance.is_active} -> {instance.is_active}")
-            
-            if changes:
-                db_operations_logger.info(f"UPDATE - Actualizando usuario ID={instance.pk}: {', '.join(changes)}")
-        except User.DoesNotExist:
-            pass
+        # El diff se calcula en memoria con los valores guardados al cargar la instancia
+        changes = get_changes(instance)
+        logged_changes = {field: change for field, change in changes.items() if field != 'password'}
+        if logged_changes:
+            audit.event('user.update.start', id=instance.pk, changes=logged_changes)
+        if 'password' in changes:
+            instance._auth_old_password = changes['password'][0]
+        # El cambio de is_active se aplica a las estadísticas en post_save, cuando ya se guardó
+        if 'is_active' in changes:
+            instance._stats_active_change = changes['is_active']
+        # Solo se reindexa para la búsqueda si cambió algún campo indexado
+        instance._search_changed = 'username' in changes or 'email' in changes
+        if instance._search_changed:
+            # La caché de usuarios también tiene entradas por el username y el email anteriores
+            instance._cache_old_identity = (
+                changes.get('username', (instance.username,))[0],
+                changes.get('email', (instance.email,))[0],
+            )
 
 
 @receiver(post_save, sender=User)
 def log_user_post_save(sender, instance, created, **kwargs):
-    """Registra cuando se guarda un usuario"""
+    """
+    Registra cuando se guarda un usuario, invalida su caché y lo mantiene al día en el índice
+    de pertenencia, las estadísticas y el índice de búsqueda
+    """
+    search_changed = instance.__dict__.pop('_search_changed', False)
+    old_identity = instance.__dict__.pop('_cache_old_identity', None)
+    using = kwargs.get('using', 'default')
+    if is_user_cache_enabled():
+        _invalidate_user_cache_on_commit(instance, old_identity, using)
+    # Solo las altas y los cambios de username/email añaden valores al índice (no el last_login de cada login)
+    if is_membership_index_enabled() and (created or search_changed):
+        get_membership_index().add(instance.username, instance.email)
+    old_password = instance.__dict__.pop('_auth_old_password', None)
+    if is_auth_user_cache_enabled() and not created:
+        _invalidate_auth_user_on_commit(instance, old_password, using)
+    active_change = instance.__dict__.pop('_stats_active_change', None)
+    if is_user_stats_enabled():
+        if created:
+            record_created([instance])
+        elif active_change:
+            record_active_changed(*active_change)
+    if created or search_changed:
+        index_users([instance], using=using)
     if created:
         # Esto ya se registra en el repositorio, pero lo registramos aquí también por si se crea directamente
-        db_operations_logger.info(f"INSERT - Usuario creado directamente con ORM: ID={instance.pk}, username='{instance.username}'")
+        audit.event('user.insert.orm', id=instance.pk, username=instance.username)
     else:
-        db_operations_logger.info(f"UPDATE EXITOSO - Usuario actualizado: ID={instance.pk}, username='{instance.username}'")
+        audit.event('user.update', id=instance.pk, username=instance.username)
 
 
 @receiver(pre_delete, sender=User)
 def log_user_pre_delete(sender, instance, **kwargs):
     """Registra cuando se va a eliminar un usuario"""
-    db_operations_logger.warning(f"DELETE - Eliminando usuario: ID={instance.pk}, username='{instance.username}', email='{instance.email}'")
+    audit.event('user.delete.start', id=instance.pk, username=instance.username, email=instance.email)
 
 
 @receiver(post_delete, sender=User)
 def log_user_post_delete(sender, instance, **kwargs):
-    """Registra cuando se eliminó un usuario"""
-    db_operations_logger.warning(f"DELETE EXITOSO - Usuario eliminado: ID={instance.pk}, username='{instance.username}'")
+    """Registra cuando se eliminó un usuario, invalida su caché y lo quita de estadísticas e índice de búsqueda"""
+    using = kwargs.get('using', 'default')
+    if is_user_cache_enabled():
+        _invalidate_user_cache_on_commit(instance, None, using)
+    if is_auth_user_cache_enabled():
+        _invalidate_auth_user_on_commit(instance, None, using)
+    if is_user_stats_enabled():
+        record_deleted(instance)
+    unindex_user(instance.pk, using=using)
+    audit.event('user.delete', id=instance.pk, username=instance.username)
+
 
+@receiver(users_bulk_created)
+def log_users_bulk_created(sender, users, **kwargs):
+    """Registra una importación masiva y mantiene caché, índices y estadísticas al día"""
+    audit.event('user.insert.bulk', count=len(users))
+    if is_user_stats_enabled():
+        record_created(users)
+    index_users(users)
+    cache = get_user_cache() if is_user_cache_enabled() else None
+    index = get_membership_index() if is_membership_index_enabled() else None
+    if cache is None and index is None:
+        return
+    for user in users:
+        if cache is not None:
+            cache.invalidate_user(user.pk, user.username, user.email)
+        if index is not None:
+            index.add(user.username, user.email)
@@ -0,0 +1,39 @@
+"""
+Índice único de email sin distinguir mayúsculas en auth_user
+Permite que el registro confíe en la base de datos para la unicidad en un solo INSERT.
+Los emails vacíos (p. ej. superusuarios creados sin email) quedan fuera del índice.
+"""
+from django.db import migrations
+
+EMAIL_UNIQUE_INDEX = 'notes_home_user_email_ci_uniq'
+
+
+def create_email_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    table = schema_editor.quote_name(User._meta.db_table)
+    index = schema_editor.quote_name(EMAIL_UNIQUE_INDEX)
+    if schema_editor.connection.vendor == 'mysql':
+        # MySQL no tiene índices parciales: NULLIF deja los vacíos como NULL, que no chocan entre sí
+        schema_editor.execute(f"CREATE UNIQUE INDEX {index} ON {table} ((NULLIF(LOWER(email), '')))")
+    else:
+        schema_editor.execute(f"CREATE UNIQUE INDEX {index} ON {table} (LOWER(email)) WHERE email <> ''")
+
+
+def drop_email_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    index = schema_editor.quote_name(EMAIL_UNIQUE_INDEX)
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(f"DROP INDEX {index} ON {schema_editor.quote_name(User._meta.db_table)}")
+    else:
+        schema_editor.execute(f"DROP INDEX {index}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:11
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+
+def populate_user_stats(apps, schema_editor):
+    """Rellena el resumen con los usuarios existentes (lo mismo que recalculate_user_stats)"""
+    User = apps.get_model('auth', 'User')
+    UserStats = apps.get_model('notes_home', 'UserStats')
+    UserSignupDaily = apps.get_model('notes_home', 'UserSignupDaily')
+    stats = User.objects.aggregate(total=Count('id'), active=Count('id', filter=Q(is_active=True)))
+    UserStats.objects.create(pk=1, total=stats['total'], active=stats['active'])
+    daily = User.objects.annotate(day=TruncDate('date_joined')).values('day').annotate(count=Count('id'))
+    UserSignupDaily.objects.bulk_create(
+        [UserSignupDaily(day=row['day'], count=row['count']) for row in daily.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('notes_home', '0001_user_email_ci_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSignupDaily',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'altas por día',
+                'verbose_name_plural': 'altas por día',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.BigIntegerField(default=0)),
+                ('active', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'estadísticas de usuarios',
+                'verbose_name_plural': 'estadísticas de usuarios',
+            },
+        ),
+        migrations.RunPython(populate_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+"""
+Índice de búsqueda por subcadena para username y email (notes_home/repositories/user_search.py)
+- SQLite: tabla virtual FTS5 con tokenizer trigram (requiere SQLite >= 3.34 con FTS5)
+- PostgreSQL: extensión pg_trgm e índices GIN sobre auth_user.username y auth_user.email
+- Otros motores: nada; la búsqueda usa icontains
+"""
+from django.db import migrations
+
+SEARCH_TABLE = 'notes_home_user_search'
+TRIGRAM_INDEXES = {
+    'username': 'notes_home_user_username_trgm',
+    'email': 'notes_home_user_email_trgm',
+}
+
+
+def sqlite_supports_trigram(connection):
+    import sqlite3
+    if sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_search_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    connection = schema_editor.connection
+    table = schema_editor.quote_name(User._meta.db_table)
+    if connection.vendor == 'sqlite':
+        if not sqlite_supports_trigram(connection):
+            return
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(username, email, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, username, email) SELECT id, username, email FROM {table}'
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field, index in TRIGRAM_INDEXES.items():
+            schema_editor.execute(
+                f'CREATE INDEX {schema_editor.quote_name(index)} ON {table} USING gin ({field} gin_trgm_ops)'
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+    elif connection.vendor == 'postgresql':
+        for index in TRIGRAM_INDEXES.values():
+            schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('notes_home', '0002_user_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
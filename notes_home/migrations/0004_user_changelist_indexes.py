@@ -0,0 +1,53 @@
+"""
+Índices en auth_user para el changelist de UserAdmin
+Ordena por -date_joined y filtra por is_active, is_staff, is_superuser y date_joined.
+
+- date_joined: el orden del listado y el filtro por fecha; con el caso común (usuarios
+  activos, no staff) basta recorrer este índice en orden hasta llenar la página.
+- Índices parciales sobre date_joined para los valores raros (inactivos, staff, superusuarios),
+  que si no obligarían a recorrer casi todo el índice para llenar una página.
+  Donde no hay índices parciales (MySQL) se crean compuestos (flag, date_joined).
+"""
+from django.db import migrations, models
+from django.db.models import Q
+
+JOINED_INDEX = models.Index(fields=['date_joined'], name='notes_home_user_joined_idx')
+FLAG_INDEXES = [
+    ('is_active', Q(is_active=False), 'notes_home_user_inactive_idx'),
+    ('is_staff', Q(is_staff=True), 'notes_home_user_staff_idx'),
+    ('is_superuser', Q(is_superuser=True), 'notes_home_user_super_idx'),
+]
+
+
+def changelist_indexes(connection):
+    indexes = [JOINED_INDEX]
+    for field, condition, name in FLAG_INDEXES:
+        if connection.features.supports_partial_indexes:
+            indexes.append(models.Index(fields=['date_joined'], condition=condition, name=name))
+        else:
+            indexes.append(models.Index(fields=[field, 'date_joined'], name=name))
+    return indexes
+
+
+def create_indexes(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in changelist_indexes(schema_editor.connection):
+        schema_editor.add_index(User, index)
+
+
+def drop_indexes(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in changelist_indexes(schema_editor.connection):
+        schema_editor.remove_index(User, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('notes_home', '0003_user_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -1,3 +1,32 @@
 from django.db import models
 
-# Create your models here.
+
+class UserStats(models.Model):
+    """
+    Resumen de usuarios en una sola fila (pk=1), mantenido por las señales de User
+    Permite leer las estadísticas sin recorrer auth_user (ver notes_home/user_stats.py)
+    """
+    total = models.BigIntegerField(default=0)
+    active = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'estadísticas de usuarios'
+        verbose_name_plural = 'estadísticas de usuarios'
+
+    @property
+    def inactive(self):
+        return self.total - self.active
+
+
+class UserSignupDaily(models.Model):
+    """
+    Altas por día (de los usuarios que siguen existiendo), mantenido por las señales de User
+    """
+    day = models.DateField(primary_key=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day']
+        verbose_name = 'altas por día'
+        verbose_name_plural = 'altas por día'
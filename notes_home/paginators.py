@@ -0,0 +1,85 @@
+"""
+Paginador con conteo estimado para tablas grandes
+
+El Paginator de Django ejecuta un COUNT(*) exacto en cada página, que en tablas de millones
+de filas recorre la tabla entera. EstimatedCountPaginator:
+
+- Sin filtros: usa una estimación barata del número de filas de la tabla
+    * auth_user con USER_STATS activado: la fila resumen de notes_home/user_stats.py (exacto)
+    * PostgreSQL: pg_class.reltuples (actualizado por VACUUM/ANALYZE)
+    * MySQL: information_schema.TABLES.TABLE_ROWS
+    * SQLite: sqlite_stat1 (tras ANALYZE) o, si no hay, MAX(rowid)
+  Si la estimación es menor que EXACT_COUNT_THRESHOLD se cuenta de forma exacta.
+- Con filtros: cuenta de forma exacta, pero como mucho hasta MAX_FILTERED_COUNT filas
+  (COUNT sobre una subconsulta con LIMIT), así el coste queda acotado.
+"""
+from django.contrib.auth.models import User as DjangoUser
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Por debajo de este número de filas el COUNT(*) exacto es barato
+EXACT_COUNT_THRESHOLD = 10000
+# Tope del conteo de un queryset filtrado
+MAX_FILTERED_COUNT = 100000
+
+
+def estimate_table_rows(model, using='default'):
+    """Número aproximado de filas de la tabla del modelo, o None si no se puede estimar"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [table])
+            row = cursor.fetchone()
+            # -1 (o 0) si la tabla nunca se analizó
+            return row[0] if row and row[0] and row[0] > 0 else None
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row and row[0] else None
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                # Cada fila de la tabla (una por índice; idx NULL solo si no tiene índices)
+                # empieza por el número de filas de la tabla
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+            # Sin estadísticas: el mayor rowid (una búsqueda en el árbol, no un recorrido)
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+            row = cursor.fetchone()
+            return row[0] if row and row[0] else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator que evita el COUNT(*) exacto sobre tablas grandes
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None:
+            return super().count
+        if not query.where and not query.distinct and not query.low_mark and query.high_mark is None:
+            estimate = self.estimate(queryset)
+            if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+                return estimate
+            return queryset.count()
+        return queryset.order_by()[:MAX_FILTERED_COUNT].count()
+
+    @staticmethod
+    def estimate(queryset):
+        model = queryset.model
+        if model is DjangoUser:
+            from notes_home.user_stats import get_user_stats, is_user_stats_enabled
+            if is_user_stats_enabled():
+                return get_user_stats()['total']
+        return estimate_table_rows(model, using=queryset.db)
@@ -0,0 +1,173 @@
+"""
+Servicio de hashing de contraseñas - Saca PBKDF2 del hilo de la petición
+Ejecuta make_password / check_password en un pool de procesos acotado, con entradas
+síncronas y asíncronas. Así un pico de logins no deja los hilos del servidor ocupados
+quemando CPU y el hashing se reparte entre todos los núcleos.
+
+Con WORKERS = 0 el hashing se hace en el mismo hilo (comportamiento clásico de Django).
+
+Este módulo no importa modelos a nivel de módulo: los procesos del pool se arrancan con
+'spawn' y lo importan antes de que Django esté inicializado.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+
+DEFAULT_PASSWORD_HASHING = {
+    'WORKERS': 0,
+    'MAX_PENDING': None,  # por defecto WORKERS * 4
+    'TIMEOUT': 30,  # segundos esperando hueco en el pool
+}
+
+
+class PasswordHashingBusyError(RuntimeError):
+    """No hay hueco en el pool de hashing dentro del tiempo de espera"""
+
+
+def init_hashing_worker():
+    """Inicializa Django en los procesos del pool (se arrancan con 'spawn')"""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _make_password(raw_password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(raw_password)
+
+
+def _check_password(raw_password, encoded):
+    from django.contrib.auth.hashers import check_password
+    return check_password(raw_password, encoded)
+
+
+def validate_and_make_password(args):
+    """
+    Valida (opcionalmente) y hashea una contraseña; usado por la importación masiva
+    Returns: (hash o None, mensaje de error o None)
+    """
+    raw_password, username, email, validate = args
+    if validate:
+        from django.contrib.auth.models import User as DjangoUser
+        from django.contrib.auth.password_validation import validate_password
+        from django.core.exceptions import ValidationError
+        try:
+            validate_password(raw_password, user=DjangoUser(username=username, email=email))
+        except ValidationError as e:
+            return None, "; ".join(str(message) for message in e.messages)
+    return _make_password(raw_password), None
+
+
+class PasswordHashingPool:
+    """
+    Pool acotado de procesos para hashear y verificar contraseñas
+    Como mucho MAX_PENDING operaciones en vuelo; el resto espera hueco hasta TIMEOUT.
+    """
+
+    def __init__(self, workers: int = 0, max_pending: int = None, timeout: float = 30):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending or max(workers, 1) * 4)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # 'spawn' evita hacer fork de un proceso con varios hilos (servidor web)
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=get_context('spawn'),
+                        initializer=init_hashing_worker,
+                    )
+        return self._executor
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHashingBusyError("El pool de hashing de contraseñas está saturado")
+
+    def _submit(self, func, *args):
+        """Envía la tarea al pool; el hueco se libera al terminar"""
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        self._acquire()
+        return self._submit(func, *args).result()
+
+    async def _arun(self, func, *args):
+        if not self.workers:
+            return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+        if not self._slots.acquire(blocking=False):
+            # Pool lleno: esperar hueco sin bloquear el event loop
+            acquiring = asyncio.get_running_loop().run_in_executor(None, self._acquire)
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # El hilo del executor sigue esperando y puede conseguir el hueco más tarde:
+                # se devuelve en cuanto lo consiga para no perder capacidad
+                acquiring.add_done_callback(self._release_acquired)
+                raise
+        return await asyncio.wrap_future(self._submit(func, *args))
+
+    def _release_acquired(self, acquiring) -> None:
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self._slots.release()
+
+    def make_password(self, raw_password: str) -> str:
+        return self._run(_make_password, raw_password)
+
+    def check_password(self, raw_password: str, encoded: str) -> bool:
+        return self._run(_check_password, raw_password, encoded)
+
+    async def amake_password(self, raw_password: str) -> str:
+        return await self._arun(_make_password, raw_password)
+
+    async def acheck_password(self, raw_password: str, encoded: str) -> bool:
+        return await self._arun(_check_password, raw_password, encoded)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_password_hashing_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_password_hashing_settings() -> dict:
+    config = dict(DEFAULT_PASSWORD_HASHING)
+    config.update(getattr(settings, 'PASSWORD_HASHING', {}))
+    return config
+
+
+def get_password_hashing_pool() -> PasswordHashingPool:
+    """Devuelve el pool del proceso, creado a partir de settings.PASSWORD_HASHING"""
+    global _password_hashing_pool
+    if _password_hashing_pool is None:
+        with _pool_lock:
+            if _password_hashing_pool is None:
+                config = get_password_hashing_settings()
+                workers = config['WORKERS']
+                if workers == 'auto':
+                    workers = os.cpu_count() or 1
+                _password_hashing_pool = PasswordHashingPool(
+                    workers=int(workers),
+                    max_pending=config['MAX_PENDING'],
+                    timeout=config['TIMEOUT'],
+                )
+    return _password_hashing_pool
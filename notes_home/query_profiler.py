@@ -0,0 +1,148 @@
+"""
+Perfilador de consultas por petición
+
+QueryProfilerMiddleware cuenta las consultas SQL de cada petición y el tiempo que pasan en la
+base de datos (un execute_wrapper instalado en todas las conexiones), y:
+
+- añade las cabeceras X-Query-Count y X-DB-Time (milisegundos) a la respuesta,
+- marca como N+1 probable las huellas de consulta que se repiten N_PLUS_ONE_THRESHOLD veces o más,
+- escribe una línea de resumen por petición en el logger 'notes_home.profiler':
+
+    GET /home/ 200 - 4 consultas, 1.8 ms en BD, 12.4 ms total
+    WARNING N+1 probable en POST /register/: 50x SELECT ... WHERE "auth_user"."id" = ? LIMIT ?
+
+Los datos de la petición viajan en una ContextVar, así que sirve para vistas síncronas y
+asíncronas (el ORM async copia el contexto al hilo donde ejecuta la consulta).
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from notes_home.sql_fingerprint import fingerprint
+
+profiler_logger = logging.getLogger('notes_home.profiler')
+
+DEFAULT_QUERY_PROFILER = {
+    'ENABLED': False,
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'HEADERS': True,
+}
+
+_current_profile = ContextVar('query_profile', default=None)
+
+
+def get_query_profiler_settings() -> dict:
+    return {**DEFAULT_QUERY_PROFILER, **getattr(settings, 'QUERY_PROFILER', {})}
+
+
+def is_query_profiler_enabled() -> bool:
+    return bool(get_query_profiler_settings()['ENABLED'])
+
+
+class RequestProfile:
+    """
+    Consultas de una petición: número, tiempo acumulado y repeticiones por huella
+    """
+    __slots__ = ('count', 'duration', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[sql] += 1
+
+    def repeated(self, threshold):
+        """Huellas que se repiten `threshold` veces o más, de más a menos repetida"""
+        # Se agrupa primero por texto exacto (barato) y solo se normaliza cada texto distinto una vez
+        by_fingerprint = Counter()
+        for sql, times in self.shapes.items():
+            by_fingerprint[fingerprint(sql)] += times
+        return [(shape, times) for shape, times in by_fingerprint.most_common() if times >= threshold]
+
+
+def profile_queries(execute, sql, params, many, context):
+    """
+    execute_wrapper: mide la consulta si hay una petición perfilándose en el contexto actual
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record(sql, time.perf_counter() - start)
+
+
+def install_query_profiler(sender, connection, **kwargs):
+    """
+    Receptor de connection_created: añade el wrapper a la conexión (una sola vez por conexión)
+    """
+    if profile_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(profile_queries)
+
+
+class QueryProfilerMiddleware:
+    """
+    Mide las consultas de cada petición y las resume en cabeceras y en el log
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = get_query_profiler_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = config['N_PLUS_ONE_THRESHOLD']
+        self.headers = config['HEADERS']
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        self.report(request, response, profile, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        self.report(request, response, profile, time.perf_counter() - start)
+        return response
+
+    def report(self, request, response, profile, elapsed):
+        if self.headers:
+            response['X-Query-Count'] = str(profile.count)
+            response['X-DB-Time'] = f'{profile.duration * 1000:.1f}'
+        profiler_logger.info(
+            '%s %s %s - %d consultas, %.1f ms en BD, %.1f ms total',
+            request.method, request.path, response.status_code,
+            profile.count, profile.duration * 1000, elapsed * 1000,
+        )
+        if profile.count >= self.threshold:
+            for shape, times in profile.repeated(self.threshold):
+                profiler_logger.warning(
+                    'N+1 probable en %s %s: %dx %s', request.method, request.path, times, shape
+                )
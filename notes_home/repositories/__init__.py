@@ -2,6 +2,18 @@
 Módulo de repositorios - Abstracción de acceso a datos
 """
 from .user_repository import UserRepository
+from .cached_user_repository import CachedUserRepository
+from .async_user_repository import AsyncUserRepository
+from .user_cache import UserCache, get_user_cache, is_user_cache_enabled
 
-__all__ = ['UserRepository']
 
+def get_user_repository() -> UserRepository:
+    """
+    Devuelve el repositorio de usuarios configurado (con caché si settings.USER_CACHE lo activa)
+    """
+    if is_user_cache_enabled():
+        return CachedUserRepository()
+    return UserRepository()
+
+
+__all__ = ['UserRepository', 'CachedUserRepository', 'AsyncUserRepository', 'UserCache', 'get_user_cache', 'get_user_repository']
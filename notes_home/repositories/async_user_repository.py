@@ -0,0 +1,147 @@
+"""
+Repositorio asíncrono de usuarios - Contraparte de UserRepository para vistas async (ASGI)
+Usa la API asíncrona del ORM (aget, aexists, asave) y el pool de hashing en su variante
+async, así un worker ASGI puede tener muchas peticiones de autenticación en vuelo.
+"""
+from typing import Optional
+from django.contrib.auth.models import User as DjangoUser
+from django.contrib.auth.signals import user_login_failed
+from django.db import IntegrityError
+from notes_home import audit
+from notes_home.domain.entities import User as DomainUser
+from notes_home.hashers import needs_rehash
+from notes_home.login_throttle import LoginThrottledError, acheck_throttle, normalize_username
+from notes_home.password_hashing import PasswordHashingBusyError, get_password_hashing_pool
+from notes_home.repositories.user_repository import AUTH_BACKEND, UserRepository
+
+
+class AsyncUserRepository:
+    """
+    Repositorio asíncrono para gestionar usuarios
+    Mismas reglas, mensajes y logs que UserRepository
+    """
+
+    @staticmethod
+    async def acreate(user: DomainUser) -> DomainUser:
+        """
+        Crea un nuevo usuario en la base de datos
+        El hash se calcula en el pool de hashing; un único INSERT no necesita transacción explícita
+        """
+        return UserRepository._to_domain(await AsyncUserRepository._ainsert(user))
+
+    @staticmethod
+    async def acreate_authenticated(user: DomainUser) -> DjangoUser:
+        """
+        Crea un nuevo usuario y lo devuelve listo para django.contrib.auth.alogin (con backend)
+        """
+        django_user = await AsyncUserRepository._ainsert(user)
+        django_user.backend = AUTH_BACKEND
+        return django_user
+
+    @staticmethod
+    async def _ainsert(user: DomainUser) -> DjangoUser:
+        audit.event('user.insert.start', username=user.username, email=user.email)
+        UserRepository._validate_password(user)
+
+        django_user = DjangoUser(
+            username=DjangoUser.normalize_username(user.username),
+            email=DjangoUser.objects.normalize_email(user.email),
+            is_active=user.is_active
+        )
+        try:
+            django_user.password = await get_password_hashing_pool().amake_password(user.password)
+            await django_user.asave(force_insert=True)
+        except IntegrityError as e:
+            error_text = UserRepository._integrity_error_message(e)
+            audit.event('user.insert.duplicate', username=user.username, error=error_text)
+            raise ValueError(error_text)
+        except PasswordHashingBusyError:
+            raise
+        except Exception as e:
+            audit.event('user.insert.error', username=user.username, error_type=type(e).__name__, error=str(e))
+            raise ValueError(f"Error al crear el usuario: {e}")
+
+        audit.event('user.insert', id=django_user.id, username=user.username, email=user.email)
+        return django_user
+
+    @staticmethod
+    async def aget_by_username(username: str) -> Optional[DomainUser]:
+        """
+        Obtiene un usuario por su nombre de usuario
+        """
+        audit.event('user.lookup.username', username=username)
+        try:
+            django_user = await DjangoUser.objects.aget(username=username)
+        except DjangoUser.DoesNotExist:
+            audit.event('user.not_found.username', username=username)
+            return None
+        audit.event('user.found', id=django_user.id, username=username, email=django_user.email)
+        return UserRepository._to_domain(django_user)
+
+    @staticmethod
+    async def aget_by_id(user_id: int) -> Optional[DomainUser]:
+        """
+        Obtiene un usuario por su ID
+        """
+        audit.event('user.lookup.id', id=user_id)
+        try:
+            django_user = await DjangoUser.objects.aget(id=user_id)
+        except DjangoUser.DoesNotExist:
+            audit.event('user.not_found.id', id=user_id)
+            return None
+        audit.event('user.found', id=user_id, username=django_user.username, email=django_user.email)
+        return UserRepository._to_domain(django_user)
+
+    @staticmethod
+    async def aexists_by_username(username: str) -> bool:
+        """
+        Verifica si un usuario existe por nombre de usuario
+        """
+        audit.event('user.exists.username', username=username)
+        exists = await DjangoUser.objects.filter(username=username).aexists()
+        audit.event('user.exists.username.result', username=username, exists=exists)
+        return exists
+
+    @staticmethod
+    async def aexists_by_email(email: str) -> bool:
+        """
+        Verifica si un usuario existe por email
+        """
+        audit.event('user.exists.email', email=email)
+        exists = await DjangoUser.objects.filter(email=email).aexists()
+        audit.event('user.exists.email.result', email=email, exists=exists)
+        return exists
+
+    @staticmethod
+    async def aauthenticate(username: str, password: str) -> Optional[DomainUser]:
+        """
+        Autentica un usuario con username y password
+        Lanza LoginThrottledError si el usuario supera el límite de intentos (settings.LOGIN_THROTTLE)
+        """
+        audit.event('user.auth.start', username=username)
+        retry_after = await acheck_throttle('authenticate', username=normalize_username(username))
+        if retry_after:
+            audit.event('user.auth.throttled', username=username, retry_after=retry_after)
+            raise LoginThrottledError(retry_after)
+        hashing_pool = get_password_hashing_pool()
+        try:
+            django_user = await DjangoUser._default_manager.aget(**{DjangoUser.USERNAME_FIELD: username})
+        except DjangoUser.DoesNotExist:
+            # Se hashea igualmente para que el tiempo de respuesta no revele si el usuario existe
+            await hashing_pool.amake_password(password)
+            django_user = None
+        else:
+            if not await hashing_pool.acheck_password(password, django_user.password) or not django_user.is_active:
+                django_user = None
+
+        if django_user is None:
+            await user_login_failed.asend(sender=__name__, credentials={'username': username, 'password': '********'})
+            audit.event('user.auth.failed', username=username)
+            return None
+        audit.event('user.auth.success', id=django_user.id, username=username)
+        if needs_rehash(django_user.password):
+            django_user.password = await hashing_pool.amake_password(password)
+            await django_user.asave(update_fields=['password'])
+            audit.event('user.auth.rehash', id=django_user.id, username=username,
+                        algorithm=django_user.password.split('$', 1)[0])
+        return UserRepository._to_domain(django_user)
@@ -0,0 +1,60 @@
+"""
+Repositorio de usuarios con caché de lectura
+Mismo contrato que UserRepository; las lecturas pasan primero por UserCache.
+"""
+from typing import Optional
+from notes_home.domain.entities import User as DomainUser
+from notes_home.repositories.user_cache import UserCache, get_user_cache
+from notes_home.repositories.user_repository import UserRepository
+
+
+class CachedUserRepository(UserRepository):
+    """
+    Repositorio de lectura cacheada (read-through)
+    Las escrituras no tocan la caché directamente: las señales post_save / post_delete la invalidan.
+    """
+
+    def __init__(self, cache: UserCache = None):
+        self.cache = cache or get_user_cache()
+
+    def get_by_id(self, user_id: int) -> Optional[DomainUser]:
+        found, user = self.cache.get('id', user_id)
+        if found:
+            return user
+        user = UserRepository.get_by_id(user_id)
+        self.cache.set('id', user_id, user)
+        if user is not None:
+            self.cache.set('username', user.username, user.id)
+        return user
+
+    def get_by_username(self, username: str) -> Optional[DomainUser]:
+        # La clave por username solo guarda el ID; el usuario vive en la entrada por ID.
+        # Así un cambio de username nunca deja una entrada por username apuntando a datos viejos.
+        found, user_id = self.cache.get('username', username)
+        if found and user_id is not None:
+            found, user = self.cache.get('id', user_id)
+            if found and user is not None and user.username == username:
+                return user
+        elif found:
+            return None
+        user = UserRepository.get_by_username(username)
+        self.cache.set('username', username, user.id if user is not None else None)
+        if user is not None:
+            self.cache.set('id', user.id, user)
+        return user
+
+    def exists_by_username(self, username: str) -> bool:
+        found, exists = self.cache.get('exists_username', username)
+        if found:
+            return exists
+        exists = UserRepository.exists_by_username(username)
+        self.cache.set('exists_username', username, exists)
+        return exists
+
+    def exists_by_email(self, email: str) -> bool:
+        found, exists = self.cache.get('exists_email', email)
+        if found:
+            return exists
+        exists = UserRepository.exists_by_email(email)
+        self.cache.set('exists_email', email, exists)
+        return exists
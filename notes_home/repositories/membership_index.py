@@ -0,0 +1,191 @@
+"""
+Índice de pertenencia en memoria para usernames y emails ocupados
+Filtro de Bloom por proceso delante de exists_by_username / exists_by_email:
+- "no está" es una respuesta definitiva y evita el SELECT
+- "puede estar" se confirma siempre contra la base de datos
+
+Se construye con una única consulta en streaming la primera vez que se usa (consultar la
+base de datos en AppConfig.ready() no es seguro antes de migrar) y se mantiene al día con
+las señales post_save de notes_home/middleware.py. Los borrados no se pueden quitar de un
+filtro de Bloom: solo generan falsos positivos, que acaban en la base de datos como antes.
+
+Cada proceso tiene su propio índice, así que las altas hechas por otros procesos solo se ven
+al reconstruirlo (REBUILD_INTERVAL). La reconstrucción periódica se hace en un hilo en segundo
+plano: mientras recorre la tabla se siguen usando los filtros anteriores y al terminar se
+sustituyen de una vez. La unicidad final la garantiza la base de datos.
+
+Dónde ayuda: solo en UserRepository.exists_by_username / exists_by_email (síncronos), es decir,
+el registro con REGISTRATION_UNIQUENESS='queries', consultar_usuarios y cualquier otra
+comprobación de existencia. Con el modo por defecto ('constraints') el registro es un único
+INSERT y no consulta el índice, así que activarlo no abarata el registro.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from notes_home import audit
+
+DEFAULT_MEMBERSHIP_INDEX = {
+    'ENABLED': False,
+    'CAPACITY': 100000,
+    'ERROR_RATE': 0.01,
+    'REBUILD_INTERVAL': 300,  # segundos; 0 = no reconstruir periódicamente
+}
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre un bytearray con doble hashing (blake2b)
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class UserMembershipIndex:
+    """
+    Índice de usernames y emails ocupados
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.01, rebuild_interval: int = 300):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._filters = None  # (usernames, emails): se sustituyen juntos con una sola asignación
+        self._built_at = 0.0
+        self._pending = None  # altas recibidas mientras se construye el índice
+        self._rebuilding = False
+
+    def _needs_rebuild(self) -> bool:
+        if self._filters[0].count > self.capacity:
+            # Se superó la capacidad prevista: la tasa de falsos positivos ya no es la configurada
+            return True
+        return bool(self.rebuild_interval) and time.monotonic() - self._built_at > self.rebuild_interval
+
+    def build(self) -> None:
+        """Reconstruye el índice con una sola consulta en streaming"""
+        from django.contrib.auth.models import User as DjangoUser
+
+        capacity = self.capacity
+        if self._filters is not None and self._filters[0].count > capacity:
+            capacity *= 2
+        usernames = BloomFilter(capacity, self.error_rate)
+        emails = BloomFilter(capacity, self.error_rate)
+        with self._lock:
+            self._pending = []
+        rows = DjangoUser.objects.values_list('username', 'email').iterator(chunk_size=2000)
+        for username, email in rows:
+            usernames.add(username)
+            if email:
+                emails.add(email)
+        with self._lock:
+            for username, email in self._pending:
+                usernames.add(username)
+                if email:
+                    emails.add(email)
+            self._pending = None
+            self.capacity = capacity
+            self._filters = (usernames, emails)
+            self._built_at = time.monotonic()
+        audit.event('user.index.built', count=usernames.count, bytes=usernames.num_bits // 8)
+
+    def _get_filters(self):
+        """Filtros actuales; la primera vez se construyen en este hilo (no hay otros que servir)"""
+        if self._filters is None:
+            with _build_lock:
+                if self._filters is None:
+                    self.build()
+        elif self._needs_rebuild():
+            self._start_rebuild()
+        return self._filters
+
+    def _start_rebuild(self) -> None:
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name='membership-index-rebuild', daemon=True).start()
+
+    def _rebuild(self) -> None:
+        try:
+            with _build_lock:
+                self.build()
+        except Exception as e:
+            # Se siguen usando los filtros anteriores; se reintenta en la siguiente consulta
+            audit.event('user.index.build_error', error_type=type(e).__name__, error=str(e))
+        finally:
+            self._rebuilding = False
+            # Conexión a la base de datos abierta por este hilo
+            connections.close_all()
+
+    def might_have_username(self, username: str) -> bool:
+        return username in self._get_filters()[0]
+
+    def might_have_email(self, email: str) -> bool:
+        return email in self._get_filters()[1]
+
+    def add(self, username: str, email: str) -> None:
+        """Registra un usuario guardado (llamado desde las señales)"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((username, email))
+            if self._filters is None:
+                return  # Aún no construido: se incluirá al construirlo
+            usernames, emails = self._filters
+            usernames.add(username)
+            if email:
+                emails.add(email)
+
+
+_build_lock = threading.Lock()
+_membership_index = None
+
+
+def get_membership_index_settings() -> dict:
+    config = dict(DEFAULT_MEMBERSHIP_INDEX)
+    config.update(getattr(settings, 'USER_MEMBERSHIP_INDEX', {}))
+    return config
+
+
+def is_membership_index_enabled() -> bool:
+    return bool(get_membership_index_settings()['ENABLED'])
+
+
+def get_membership_index() -> UserMembershipIndex:
+    """Devuelve el índice del proceso, creado a partir de settings.USER_MEMBERSHIP_INDEX"""
+    global _membership_index
+    if _membership_index is None:
+        with _build_lock:
+            if _membership_index is None:
+                config = get_membership_index_settings()
+                _membership_index = UserMembershipIndex(
+                    capacity=config['CAPACITY'],
+                    error_rate=config['ERROR_RATE'],
+                    rebuild_interval=config['REBUILD_INTERVAL'],
+                )
+    return _membership_index
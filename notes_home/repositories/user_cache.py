@@ -0,0 +1,165 @@
+"""
+Caché de lectura para usuarios - Capa opcional delante de UserRepository
+Evita ir a la base de datos en cada get_by_* / exists_by_* para los usuarios más consultados.
+
+Dos backends de almacenamiento:
+- 'local': diccionario LRU en memoria del proceso con expiración por TTL
+- cualquier alias de settings.CACHES (locmem, file, db...): la expulsión LRU la hace el propio
+  backend de Django y el TTL se pasa como timeout
+
+La invalidación se hace desde las señales post_save / post_delete de notes_home/middleware.py.
+Con varios procesos (gunicorn/uwsgi) conviene un backend compartido (file o db) para que la
+invalidación de un proceso sea visible para los demás.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_USER_CACHE = {
+    'ENABLED': False,
+    'BACKEND': 'local',
+    'MAX_ENTRIES': 10000,
+    'TTL': 300,
+    'KEY_PREFIX': 'notes_home:user',
+}
+
+# Marca para distinguir "no hay entrada" de un valor cacheado None (usuario no encontrado)
+_MISSING = object()
+
+
+class UserCache:
+    """
+    Caché LRU + TTL con contadores de aciertos y fallos
+    """
+
+    def __init__(self, backend: str = 'local', max_entries: int = 10000, ttl: int = 300,
+                 key_prefix: str = 'notes_home:user'):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clave -> (expira_en, valor), solo para backend 'local'
+        self._django_cache = None if backend == 'local' else caches[backend]
+
+    def _key(self, kind: str, value: Any) -> str:
+        return f"{self.key_prefix}:{kind}:{value}"
+
+    def get(self, kind: str, value: Any) -> Tuple[bool, Any]:
+        """
+        Devuelve (encontrado, valor). El valor puede ser None si se cacheó un resultado negativo.
+        """
+        found, result = self._read(self._key(kind, value))
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found, result
+
+    def _read(self, key: str) -> Tuple[bool, Any]:
+        if self._django_cache is not None:
+            wrapped = self._django_cache.get(key, _MISSING)
+            if wrapped is _MISSING:
+                return False, None
+            return True, wrapped[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def set(self, kind: str, value: Any, result: Any) -> None:
+        key = self._key(kind, value)
+        if self._django_cache is not None:
+            # Se envuelve en una tupla para poder cachear None
+            self._django_cache.set(key, (result,), self.ttl)
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, kind: str, value: Any) -> None:
+        key = self._key(kind, value)
+        if self._django_cache is not None:
+            self._django_cache.delete(key)
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id: Optional[int], username: str, email: str) -> None:
+        """
+        Elimina todas las entradas relacionadas con un usuario.
+        Si la entrada por ID sigue cacheada, también se invalidan su username y email anteriores.
+        """
+        if user_id is not None:
+            found, cached_user = self._read(self._key('id', user_id))
+            if found and cached_user is not None:
+                self.delete('username', cached_user.username)
+                self.delete('exists_username', cached_user.username)
+                self.delete('exists_email', cached_user.email)
+            self.delete('id', user_id)
+        self.delete('username', username)
+        self.delete('exists_username', username)
+        self.delete('exists_email', email)
+
+    def clear(self) -> None:
+        """Vacía las entradas locales y reinicia los contadores (no toca los backends compartidos)"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Contadores de aciertos/fallos y tamaño actual (solo conocido para el backend local)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': self.backend,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+                'size': len(self._entries) if self._django_cache is None else None,
+            }
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache_settings() -> dict:
+    config = dict(DEFAULT_USER_CACHE)
+    config.update(getattr(settings, 'USER_CACHE', {}))
+    return config
+
+
+def is_user_cache_enabled() -> bool:
+    return bool(get_user_cache_settings()['ENABLED'])
+
+
+def get_user_cache() -> UserCache:
+    """Devuelve la instancia de caché del proceso, creada a partir de settings.USER_CACHE"""
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                config = get_user_cache_settings()
+                _user_cache = UserCache(
+                    backend=config['BACKEND'],
+                    max_entries=config['MAX_ENTRIES'],
+                    ttl=config['TTL'],
+                    key_prefix=config['KEY_PREFIX'],
+                )
+    return _user_cache
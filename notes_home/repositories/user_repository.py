@@ -2,15 +2,30 @@
 Repositorio de usuarios - Abstrae el acceso a la base de datos
 Permite cambiar de base de datos sin modificar la lógica de negocio
 """
-from typing import Optional
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
 from django.contrib.auth.models import User as DjangoUser
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from notes_home import audit
 from notes_home.domain.entities import User as DomainUser
-import logging
+from notes_home.repositories.membership_index import get_membership_index, is_membership_index_enabled
+from notes_home.repositories.user_search import DEFAULT_SEARCH_LIMIT, SEARCH_FIELDS, search_user_ids
 
-# Logger específico para operaciones de base de datos
-db_operations_logger = logging.getLogger('database_operations')
-repository_logger = logging.getLogger('notes_home.repositories')
+# Los logs de operaciones de base de datos se emiten con audit.event() (logger 'database_operations')
+
+# Tamaño máximo de cada bloque IN (...) en las consultas por lotes.
+# SQLite limita el número de parámetros por sentencia, por eso se trocean las listas largas.
+BATCH_CHUNK_SIZE = 500
+
+# Índice único de email sin distinguir mayúsculas (migración 0001_user_email_ci_unique)
+EMAIL_UNIQUE_INDEX = 'notes_home_user_email_ci_uniq'
+
+# Restricción única de username según el motor: auth_user_username_key (PostgreSQL),
+# auth_user.username (SQLite, MySQL 8) o username (MySQL anterior)
+USERNAME_UNIQUE_PATTERN = re.compile(r"auth_user_username_key|\busername\b")
+
+# Backend que se asigna a los usuarios ya autenticados para django.contrib.auth.login
+AUTH_BACKEND = 'django.contrib.auth.backends.ModelBackend'
 
 
 class UserRepository:
@@ -24,48 +39,53 @@ class UserRepository:
         """
         Crea un nuevo usuario en la base de datos
         """
+        return UserRepository._to_domain(UserRepository._insert(user))
+
+    @staticmethod
+    def create_authenticated(user: DomainUser) -> DjangoUser:
+        """
+        Crea un nuevo usuario y lo devuelve listo para django.contrib.auth.login (con backend)
+        La contraseña se acaba de hashear a partir del texto plano: no hace falta verificarla otra vez.
+        """
+        django_user = UserRepository._insert(user)
+        django_user.backend = AUTH_BACKEND
+        return django_user
+
+    @staticmethod
+    def _insert(user: DomainUser) -> DjangoUser:
+        """
+        Valida la contraseña, la hashea en el pool e inserta el usuario
+        Returns: el usuario de Django guardado
+        """
         from django.core.exceptions import ValidationError as DjangoValidationError
-        from django.contrib.auth.password_validation import validate_password
         
         # Log de operación INSERT
-        db_operations_logger.info(f"INSERT - Creando nuevo usuario: username='{user.username}', email='{user.email}'")
+        audit.event('user.insert.start', username=user.username, email=user.email)
         
-        # Validar la contraseña usando los validadores de Django
-        # Esto asegura que la contraseña cumpla con todos los requisitos
-        try:
-            validate_password(user.password, user=DjangoUser(username=user.username, email=user.email))
-        except DjangoValidationError as e:
-            error_messages = []
-            for error in e.messages:
-                error_messages.append(str(error))
-            error_text = "; ".join(error_messages) if error_messages else "La contraseña no cumple con los requisitos de seguridad"
-            db_operations_logger.error(f"INSERT FALLIDO - Error de validación de contraseña para usuario '{user.username}': {error_text}")
-            raise ValueError(error_text)
+        UserRepository._validate_password(user)
+        
+        from notes_home.password_hashing import PasswordHashingBusyError, get_password_hashing_pool
         
         try:
+            # El hash se calcula en el pool de hashing y fuera de la transacción,
+            # así la transacción solo dura lo que tarda el INSERT
+            django_user = DjangoUser(
+                username=DjangoUser.normalize_username(user.username),
+                email=DjangoUser.objects.normalize_email(user.email),
+                is_active=user.is_active
+            )
+            django_user.password = get_password_hashing_pool().make_password(user.password)
             with transaction.atomic():
                 try:
-                    django_user = DjangoUser.objects.create_user(
-                        username=user.username,
-                        email=user.email,
-                        password=user.password,
-                        is_active=user.is_active
-                    )
+                    django_user.save(force_insert=True)
                     # Log de éxito
-                    db_operations_logger.info(f"INSERT EXITOSO - Usuario creado con ID={django_user.id}, username='{user.username}', email='{user.email}'")
+                    audit.event('user.insert', id=django_user.id, username=user.username, email=user.email)
+                except IntegrityError:
+                    raise  # Duplicado: se traduce al mensaje de negocio más abajo
                 except Exception as inner_e:
-                    db_operations_logger.error(f"INSERT FALLIDO - Error al crear usuario '{user.username}': {type(inner_e).__name__}: {str(inner_e)}")
+                    audit.event('user.insert.failed', username=user.username, error_type=type(inner_e).__name__, error=str(inner_e))
                     raise
-                
-                # Crear DomainUser de retorno - usar password vacío ya que no retornamos contraseñas
-                return DomainUser(
-                    id=django_user.id,
-                    username=django_user.username,
-                    email=django_user.email,
-                    password="",  # No retornamos la contraseña
-                    date_joined=django_user.date_joined,
-                    is_active=django_user.is_active
-                )
+            return django_user
         except DjangoValidationError as e:
             error_messages = []
             if hasattr(e, 'error_dict'):
@@ -79,24 +99,76 @@ class UserRepository:
                 error_messages.extend([str(msg) for msg in e.messages])
             else:
                 error_messages.append(str(e))
-            db_operations_logger.error(f"INSERT FALLIDO - Error de validación Django para usuario '{user.username}': {'; '.join(error_messages) if error_messages else str(e)}")
+            audit.event('user.insert.invalid', username=user.username, error='; '.join(error_messages) if error_messages else str(e))
             raise ValueError("; ".join(error_messages) if error_messages else str(e))
-        except ValueError as e:
+        except IntegrityError as e:
+            error_text = UserRepository._integrity_error_message(e)
+            audit.event('user.insert.duplicate', username=user.username, error=error_text)
+            raise ValueError(error_text)
+        except (ValueError, PasswordHashingBusyError):
+            # Pool de hashing saturado: el servicio lo traduce a "inténtalo de nuevo"
             raise
         except Exception as e:
             error_msg = str(e)
-            db_operations_logger.error(f"INSERT FALLIDO - Error inesperado al crear usuario '{user.username}': {type(e).__name__}: {error_msg}")
+            audit.event('user.insert.error', username=user.username, error_type=type(e).__name__, error=error_msg)
             raise ValueError(f"Error al crear el usuario: {error_msg}")
     
+    @staticmethod
+    def _validate_password(user: DomainUser) -> None:
+        """
+        Valida la contraseña con los validadores de Django; lanza ValueError si no los cumple
+        """
+        from django.core.exceptions import ValidationError as DjangoValidationError
+        from django.contrib.auth.password_validation import validate_password
+        
+        # Esto asegura que la contraseña cumpla con todos los requisitos
+        try:
+            validate_password(user.password, user=DjangoUser(username=user.username, email=user.email))
+        except DjangoValidationError as e:
+            error_messages = []
+            for error in e.messages:
+                error_messages.append(str(error))
+            error_text = "; ".join(error_messages) if error_messages else "La contraseña no cumple con los requisitos de seguridad"
+            audit.event('user.insert.invalid_password', username=user.username, error=error_text)
+            raise ValueError(error_text)
+
+    @staticmethod
+    def _integrity_error_message(error: IntegrityError) -> str:
+        """
+        Traduce la violación de unicidad del motor (SQLite, MySQL, PostgreSQL) al mensaje de negocio
+        """
+        constraint = UserRepository._violated_constraint(error)
+        if EMAIL_UNIQUE_INDEX in constraint:
+            return "El email ya está registrado"
+        if USERNAME_UNIQUE_PATTERN.search(constraint):
+            return "El nombre de usuario ya está en uso"
+        return f"Error al crear el usuario: {error}"
+
+    @staticmethod
+    def _violated_constraint(error: IntegrityError) -> str:
+        """
+        Nombre de la restricción o índice violado, sin los valores del registro
+        (el texto libre del error incluye el username/email enviado)
+        """
+        diag = getattr(error.__cause__, 'diag', None)
+        if diag is not None and diag.constraint_name:
+            # psycopg: nombre exacto de la restricción
+            return diag.constraint_name.lower()
+        lines = str(error).lower().splitlines()
+        # PostgreSQL añade el valor en la línea DETAIL
+        detail = lines[0] if lines else ''
+        # MySQL: "Duplicate entry '<valor>' for key '<índice>'"
+        return detail.rpartition(" for key ")[2]
+
     @staticmethod
     def get_by_username(username: str) -> Optional[DomainUser]:
         """
         Obtiene un usuario por su nombre de usuario
         """
-        db_operations_logger.info(f"SELECT - Consultando usuario por username='{username}'")
+        audit.event('user.lookup.username', username=username)
         try:
             django_user = DjangoUser.objects.get(username=username)
-            db_operations_logger.info(f"SELECT EXITOSO - Usuario encontrado: ID={django_user.id}, username='{username}', email='{django_user.email}'")
+            audit.event('user.found', id=django_user.id, username=username, email=django_user.email)
             return DomainUser(
                 id=django_user.id,
                 username=django_user.username,
@@ -106,7 +178,7 @@ class UserRepository:
                 is_active=django_user.is_active
             )
         except DjangoUser.DoesNotExist:
-            db_operations_logger.warning(f"SELECT - Usuario no encontrado: username='{username}'")
+            audit.event('user.not_found.username', username=username)
             return None
     
     @staticmethod
@@ -114,10 +186,10 @@ class UserRepository:
         """
         Obtiene un usuario por su ID
         """
-        db_operations_logger.info(f"SELECT - Consultando usuario por ID={user_id}")
+        audit.event('user.lookup.id', id=user_id)
         try:
             django_user = DjangoUser.objects.get(id=user_id)
-            db_operations_logger.info(f"SELECT EXITOSO - Usuario encontrado: ID={user_id}, username='{django_user.username}', email='{django_user.email}'")
+            audit.event('user.found', id=user_id, username=django_user.username, email=django_user.email)
             return DomainUser(
                 id=django_user.id,
                 username=django_user.username,
@@ -127,17 +199,97 @@ class UserRepository:
                 is_active=django_user.is_active
             )
         except DjangoUser.DoesNotExist:
-            db_operations_logger.warning(f"SELECT - Usuario no encontrado: ID={user_id}")
+            audit.event('user.not_found.id', id=user_id)
             return None
     
+    @staticmethod
+    def get_many_by_ids(user_ids: Iterable[int]) -> Tuple[Dict[int, DomainUser], List[int]]:
+        """
+        Obtiene varios usuarios por ID con una consulta IN (...) por bloque
+
+        Returns:
+            Tuple[Dict[int, DomainUser], List[int]]: (usuarios encontrados por ID, IDs no encontrados)
+        """
+        ids = list(dict.fromkeys(user_ids))
+        found = UserRepository._fetch_many('id', ids)
+        missing = [user_id for user_id in ids if user_id not in found]
+        UserRepository._log_batch('ID', ids, found, missing)
+        return found, missing
+
+    @staticmethod
+    def get_many_by_usernames(usernames: Iterable[str]) -> Tuple[Dict[str, DomainUser], List[str]]:
+        """
+        Obtiene varios usuarios por username con una consulta IN (...) por bloque
+
+        Returns:
+            Tuple[Dict[str, DomainUser], List[str]]: (usuarios encontrados por username, usernames no encontrados)
+        """
+        names = list(dict.fromkeys(usernames))
+        found = UserRepository._fetch_many('username', names)
+        missing = [username for username in names if username not in found]
+        UserRepository._log_batch('username', names, found, missing)
+        return found, missing
+
+    @staticmethod
+    def search(text: str, fields: Tuple[str, ...] = SEARCH_FIELDS, limit: int = DEFAULT_SEARCH_LIMIT) -> List[DomainUser]:
+        """
+        Busca usuarios cuyo username/email contiene `text` usando el índice de búsqueda
+
+        Returns:
+            List[DomainUser]: como mucho `limit` usuarios, del más al menos relevante
+        """
+        ids = search_user_ids(text, fields=fields, limit=limit)
+        found = UserRepository._fetch_many('id', ids)
+        users = [found[user_id] for user_id in ids if user_id in found]
+        audit.event('user.search', text=text, fields=','.join(fields), found=len(users))
+        return users
+
+    @staticmethod
+    def _fetch_many(field: str, values: List) -> Dict:
+        """
+        Ejecuta la consulta por lotes sobre `field` y devuelve un dict {valor: DomainUser}
+        """
+        result = {}
+        for start in range(0, len(values), BATCH_CHUNK_SIZE):
+            chunk = values[start:start + BATCH_CHUNK_SIZE]
+            queryset = DjangoUser.objects.filter(**{f'{field}__in': chunk}).only(
+                'id', 'username', 'email', 'date_joined', 'is_active'
+            )
+            for django_user in queryset:
+                result[getattr(django_user, field)] = UserRepository._to_domain(django_user)
+        return result
+
+    @staticmethod
+    def _log_batch(field: str, requested: List, found: Dict, missing: List) -> None:
+        """Registra una sola línea resumen por lote"""
+        if missing:
+            audit.event('user.batch.missing', field=field, found=len(found), requested=len(requested), missing=missing)
+        else:
+            audit.event('user.batch', field=field, found=len(found), requested=len(requested))
+
+    @staticmethod
+    def _to_domain(django_user: DjangoUser) -> DomainUser:
+        """Convierte un usuario de Django en la entidad de dominio (sin contraseña)"""
+        return DomainUser(
+            id=django_user.id,
+            username=django_user.username,
+            email=django_user.email,
+            password="",
+            date_joined=django_user.date_joined,
+            is_active=django_user.is_active
+        )
+
     @staticmethod
     def exists_by_username(username: str) -> bool:
         """
         Verifica si un usuario existe por nombre de usuario
         """
-        db_operations_logger.info(f"SELECT - Verificando existencia de usuario por username='{username}'")
+        audit.event('user.exists.username', username=username)
+        if is_membership_index_enabled() and not get_membership_index().might_have_username(username):
+            audit.event('user.exists.username.index', username=username)
+            return False
         exists = DjangoUser.objects.filter(username=username).exists()
-        db_operations_logger.info(f"SELECT RESULTADO - Usuario '{username}' {'existe' if exists else 'no existe'}")
+        audit.event('user.exists.username.result', username=username, exists=exists)
         return exists
     
     @staticmethod
@@ -145,22 +297,42 @@ class UserRepository:
         """
         Verifica si un usuario existe por email
         """
-        db_operations_logger.info(f"SELECT - Verificando existencia de usuario por email='{email}'")
+        audit.event('user.exists.email', email=email)
+        if is_membership_index_enabled() and not get_membership_index().might_have_email(email):
+            audit.event('user.exists.email.index', email=email)
+            return False
         exists = DjangoUser.objects.filter(email=email).exists()
-        db_operations_logger.info(f"SELECT RESULTADO - Usuario con email '{email}' {'existe' if exists else 'no existe'}")
+        audit.event('user.exists.email.result', email=email, exists=exists)
         return exists
     
     @staticmethod
     def authenticate(username: str, password: str) -> Optional[DomainUser]:
         """
         Autentica un usuario con username y password
+        Lanza LoginThrottledError si el usuario supera el límite de intentos (settings.LOGIN_THROTTLE)
         """
-        from django.contrib.auth import authenticate as django_authenticate
+        from django.contrib.auth.signals import user_login_failed
+        from notes_home.hashers import needs_rehash
+        from notes_home.login_throttle import LoginThrottledError, check_throttle, normalize_username
+        from notes_home.password_hashing import get_password_hashing_pool
         
-        db_operations_logger.info(f"SELECT - Autenticando usuario: username='{username}'")
-        django_user = django_authenticate(username=username, password=password)
+        audit.event('user.auth.start', username=username)
+        # Por encima del límite de intentos se rechaza antes de hashear nada
+        retry_after = check_throttle('authenticate', username=normalize_username(username))
+        if retry_after:
+            audit.event('user.auth.throttled', username=username, retry_after=retry_after)
+            raise LoginThrottledError(retry_after)
+        django_user = UserRepository._verify_credentials(username, password, get_password_hashing_pool())
+        if django_user is None:
+            user_login_failed.send(sender=__name__, credentials={'username': username, 'password': '********'})
         if django_user:
-            db_operations_logger.info(f"SELECT EXITOSO - Autenticación exitosa para usuario: ID={django_user.id}, username='{username}'")
+            audit.event('user.auth.success', id=django_user.id, username=username)
+            # Hash con otro hasher o parámetros (PASSWORD_HASHER_PARAMS): se actualiza ahora que se conoce la contraseña
+            if needs_rehash(django_user.password):
+                django_user.password = get_password_hashing_pool().make_password(password)
+                django_user.save(update_fields=['password'])
+                audit.event('user.auth.rehash', id=django_user.id, username=username,
+                            algorithm=django_user.password.split('$', 1)[0])
             return DomainUser(
                 id=django_user.id,
                 username=django_user.username,
@@ -169,6 +341,21 @@ class UserRepository:
                 date_joined=django_user.date_joined,
                 is_active=django_user.is_active
             )
-        db_operations_logger.warning(f"SELECT - Autenticación fallida para usuario: username='{username}'")
+        audit.event('user.auth.failed', username=username)
         return None
 
+    @staticmethod
+    def _verify_credentials(username: str, password: str, hashing_pool) -> Optional[DjangoUser]:
+        """
+        Equivalente a ModelBackend.authenticate con la verificación en el pool de hashing
+        """
+        try:
+            django_user = DjangoUser._default_manager.get_by_natural_key(username)
+        except DjangoUser.DoesNotExist:
+            # Se hashea igualmente para que el tiempo de respuesta no revele si el usuario existe
+            hashing_pool.make_password(password)
+            return None
+        if not hashing_pool.check_password(password, django_user.password) or not django_user.is_active:
+            return None
+        django_user.backend = AUTH_BACKEND
+        return django_user
@@ -0,0 +1,114 @@
+"""
+Búsqueda de usuarios por subcadena de username/email con índice
+
+- SQLite: tabla virtual FTS5 con tokenizer trigram (notes_home_user_search, rowid = id del
+  usuario), mantenida por las señales de User (notes_home/middleware.py). Ordenada por bm25.
+- PostgreSQL: índices GIN con pg_trgm sobre auth_user.username y auth_user.email; ILIKE usa
+  el índice y se ordena por similarity(). No necesita sincronización.
+- Otros motores, o textos de menos de 3 caracteres (el mínimo de un trigrama): icontains.
+
+Las tablas e índices se crean en la migración 0003_user_search.
+"""
+from django.contrib.auth.models import User as DjangoUser
+from django.db import connections
+from django.db.models import Q
+
+SEARCH_TABLE = 'notes_home_user_search'
+SEARCH_FIELDS = ('username', 'email')
+DEFAULT_SEARCH_LIMIT = 20
+
+# Un trigrama necesita al menos 3 caracteres
+MIN_TRIGRAM_LENGTH = 3
+
+_fts_available = {}
+
+
+def has_fts_index(using='default') -> bool:
+    """True si la base de datos es SQLite y existe la tabla FTS5 de búsqueda"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    if using not in _fts_available:
+        with connection.cursor() as cursor:
+            _fts_available[using] = SEARCH_TABLE in connection.introspection.table_names(cursor)
+    return _fts_available[using]
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_user_ids(text, fields=SEARCH_FIELDS, limit=DEFAULT_SEARCH_LIMIT, using='default'):
+    """
+    IDs de los usuarios cuyo username/email contiene `text`, del más al menos relevante
+    """
+    text = text.strip()
+    if not text:
+        return []
+    fields = tuple(field for field in fields if field in SEARCH_FIELDS)
+    if not fields:
+        raise ValueError(f"Campos de búsqueda no válidos. Use: {', '.join(SEARCH_FIELDS)}")
+    connection = connections[using]
+
+    if len(text) >= MIN_TRIGRAM_LENGTH and has_fts_index(using):
+        # Frase entre comillas: con el tokenizer trigram equivale a "contiene", sin distinguir mayúsculas
+        phrase = '"' + text.replace('"', '""') + '"'
+        query = phrase if len(fields) == len(SEARCH_FIELDS) else f'{{{" ".join(fields)}}} : {phrase}'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+                [query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    if len(text) >= MIN_TRIGRAM_LENGTH and connection.vendor == 'postgresql':
+        table = connection.ops.quote_name(DjangoUser._meta.db_table)
+        pattern = f'%{_escape_like(text)}%'
+        where = ' OR '.join(f'{field} ILIKE %s' for field in fields)
+        similarity = ', '.join(f'similarity({field}, %s)' for field in fields)
+        ranking = similarity if len(fields) == 1 else f'GREATEST({similarity})'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id FROM {table} WHERE {where} ORDER BY {ranking} DESC, id LIMIT %s',
+                [pattern] * len(fields) + [text] * len(fields) + [limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': text})
+    return list(
+        DjangoUser.objects.using(using).filter(condition).order_by('id').values_list('id', flat=True)[:limit]
+    )
+
+
+def index_users(users, using='default'):
+    """Añade o actualiza usuarios en la tabla FTS (no hace nada si no existe)"""
+    if not users or not has_fts_index(using):
+        return
+    with connections[using].cursor() as cursor:
+        ids = [(user.pk,) for user in users]
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', ids)
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, username, email) VALUES (%s, %s, %s)',
+            [(user.pk, user.username, user.email) for user in users],
+        )
+
+
+def unindex_user(user_id, using='default'):
+    """Quita un usuario de la tabla FTS"""
+    if not has_fts_index(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [user_id])
+
+
+def rebuild_search_index(using='default') -> int:
+    """Reconstruye la tabla FTS desde auth_user; devuelve el número de usuarios indexados"""
+    if not has_fts_index(using):
+        return 0
+    table = connections[using].ops.quote_name(DjangoUser._meta.db_table)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(f'INSERT INTO {SEARCH_TABLE} (rowid, username, email) SELECT id, username, email FROM {table}')
+        return cursor.rowcount
@@ -2,6 +2,6 @@
 Módulo de servicios - Lógica de negocio
 """
 from .auth_service import AuthService
+from .async_auth_service import AsyncAuthService
 
-__all__ = ['AuthService']
-
+__all__ = ['AuthService', 'AsyncAuthService']
@@ -0,0 +1,77 @@
+"""
+Servicio de autenticación asíncrono - Misma lógica de negocio que AuthService para vistas async
+"""
+from typing import Optional, Tuple
+from django.contrib.auth.models import User as DjangoUser
+from notes_home.domain.entities import User
+from notes_home.login_throttle import LoginThrottledError
+from notes_home.password_hashing import PasswordHashingBusyError
+from notes_home.repositories.async_user_repository import AsyncUserRepository
+from notes_home.services.auth_service import HASHING_BUSY_MESSAGE, AuthService
+
+
+class AsyncAuthService(AuthService):
+    """
+    Servicio asíncrono que maneja el registro y la autenticación
+    Reutiliza las validaciones de AuthService; solo cambia el acceso al repositorio
+    """
+    
+    def __init__(self, user_repository: AsyncUserRepository = None, uniqueness_mode: str = None):
+        super().__init__(user_repository=user_repository or AsyncUserRepository(), uniqueness_mode=uniqueness_mode)
+    
+    async def aregister_user(self, username: str, email: str, password: str, password_confirm: str) -> Tuple[Optional[User], list]:
+        """
+        Registra un nuevo usuario
+        
+        Returns:
+            Tuple[Optional[User], list]: (Usuario creado o None, lista de errores)
+        """
+        return await self._aregister(self.user_repository.acreate, username, email, password, password_confirm)
+    
+    async def aregister_user_for_login(self, username: str, email: str, password: str, password_confirm: str) -> Tuple[Optional[DjangoUser], list]:
+        """
+        Registra un nuevo usuario y lo devuelve ya autenticado para pasarlo a django_alogin
+        
+        Returns:
+            Tuple[Optional[DjangoUser], list]: (Usuario de Django con backend asignado o None, lista de errores)
+        """
+        return await self._aregister(self.user_repository.acreate_authenticated, username, email, password, password_confirm)
+    
+    async def _aregister(self, acreate, username: str, email: str, password: str, password_confirm: str) -> Tuple[Optional[object], list]:
+        domain_user, errors = self._prepare_registration(username, email, password, password_confirm)
+        if errors:
+            return None, errors
+        
+        if self.uniqueness_mode == 'queries':
+            if await self.user_repository.aexists_by_username(domain_user.username):
+                return None, ["El nombre de usuario ya está en uso"]
+            
+            if await self.user_repository.aexists_by_email(domain_user.email):
+                return None, ["El email ya está registrado"]
+        
+        try:
+            return await acreate(domain_user), []
+        except PasswordHashingBusyError:
+            return None, [HASHING_BUSY_MESSAGE]
+        except ValueError as e:
+            return None, [str(e)]
+        except Exception as e:
+            return None, [f"Error al crear el usuario: {str(e)}"]
+    
+    async def aauthenticate_user(self, username: str, password: str) -> Tuple[Optional[User], list]:
+        """
+        Autentica un usuario
+        
+        Returns:
+            Tuple[Optional[User], list]: (Usuario autenticado o None, lista de errores)
+        """
+        if not username or not password:
+            return None, ["Usuario y contraseña son requeridos"]
+        
+        try:
+            user = await self.user_repository.aauthenticate(username, password)
+        except LoginThrottledError as e:
+            return None, [str(e)]
+        except PasswordHashingBusyError:
+            return None, [HASHING_BUSY_MESSAGE]
+        return self._check_authenticated(user)
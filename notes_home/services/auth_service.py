@@ -1,18 +1,33 @@
 """
 Servicio de autenticación - Lógica de negocio para usuarios
 """
+import logging
 from typing import Optional, Tuple
+from django.conf import settings
+from django.contrib.auth.models import User as DjangoUser
+from notes_home import audit
 from notes_home.domain.entities import User
+from notes_home.login_throttle import LoginThrottledError
+from notes_home.password_hashing import PasswordHashingBusyError
+from notes_home.repositories import get_user_repository
 from notes_home.repositories.user_repository import UserRepository
 
+service_logger = logging.getLogger(__name__)
+
+# Pool de hashing saturado (PasswordHashingBusyError): error temporal, no del usuario
+HASHING_BUSY_MESSAGE = "El servicio está ocupado en este momento. Inténtalo de nuevo en unos segundos"
+
 
 class AuthService:
     """
     Servicio que maneja la lógica de negocio para autenticación y registro
     """
     
-    def __init__(self, user_repository: UserRepository = None):
-        self.user_repository = user_repository or UserRepository()
+    def __init__(self, user_repository: UserRepository = None, uniqueness_mode: str = None):
+        self.user_repository = user_repository or get_user_repository()
+        # 'constraints': la unicidad la garantizan los índices únicos en un solo INSERT
+        # 'queries': comprobación previa con exists_by_username / exists_by_email
+        self.uniqueness_mode = uniqueness_mode or getattr(settings, 'REGISTRATION_UNIQUENESS', 'constraints')
     
     def register_user(self, username: str, email: str, password: str, password_confirm: str) -> Tuple[Optional[User], list]:
         """
@@ -21,31 +36,73 @@ class AuthService:
         Returns:
             Tuple[Optional[User], list]: (Usuario creado o None, lista de errores)
         """
-        errors = []
+        return self._register(self.user_repository.create, username, email, password, password_confirm)
+    
+    def register_user_for_login(self, username: str, email: str, password: str, password_confirm: str) -> Tuple[Optional[DjangoUser], list]:
+        """
+        Registra un nuevo usuario y lo devuelve ya autenticado para pasarlo a django_login
+        La contraseña solo se hashea una vez (al crearlo); no hace falta llamar a authenticate().
+        
+        Returns:
+            Tuple[Optional[DjangoUser], list]: (Usuario de Django con backend asignado o None, lista de errores)
+        """
+        return self._register(self.user_repository.create_authenticated, username, email, password, password_confirm)
+    
+    def _register(self, create, username: str, email: str, password: str, password_confirm: str) -> Tuple[Optional[object], list]:
+        """
+        Valida, comprueba la unicidad y crea el usuario con `create` (create o create_authenticated del repositorio)
+        """
+        domain_user, errors = self._prepare_registration(username, email, password, password_confirm)
+        if errors:
+            return None, errors
         
-        # Log temporal para depuración
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"LOG SERVICIO INICIO - password type: {type(password)}, password length: {len(password) if password else 0}, password value: {'***' if password else 'EMPTY'}, password is None: {password is None}, password == '': {password == ''}")
+        if self.uniqueness_mode == 'queries':
+            if self.user_repository.exists_by_username(domain_user.username):
+                errors.append("El nombre de usuario ya está en uso")
+                return None, errors
+            
+            if self.user_repository.exists_by_email(domain_user.email):
+                errors.append("El email ya está registrado")
+                return None, errors
+        
+        # Guardar en el repositorio
+        try:
+            created_user = create(domain_user)
+            return created_user, []
+        except PasswordHashingBusyError:
+            return None, [HASHING_BUSY_MESSAGE]
+        except ValueError as e:
+            # Errores de validación del repositorio
+            errors.append(str(e))
+            return None, errors
+        except Exception as e:
+            # Otros errores inesperados
+            errors.append(f"Error al crear el usuario: {str(e)}")
+            return None, errors
+    
+    def _prepare_registration(self, username: str, email: str, password: str, password_confirm: str) -> Tuple[Optional[User], list]:
+        """
+        Limpia y valida los datos de registro (sin acceso a la base de datos)
+        
+        Returns:
+            Tuple[Optional[User], list]: (Entidad de dominio lista para crear o None, lista de errores)
+        """
+        errors = []
+        audit.event('auth.register', logger=service_logger, username=username, email=email)
         
         # Verificar que la contraseña esté presente antes de procesar
         if not password:
-            logger.error("LOG SERVICIO ERROR - Password está vacío antes de strip")
             errors.append("La contraseña no puede estar vacía")
             return None, errors
         
         # Limpiar espacios en blanco primero (antes de cualquier validación)
-        password_before_strip = password
         password = password.strip() if password else ""
         password_confirm = password_confirm.strip() if password_confirm else ""
         username = username.strip() if username else ""
         email = email.strip() if email else ""
         
-        logger.error(f"LOG SERVICIO DESPUÉS STRIP - password length: {len(password)}, password_before_strip length: {len(password_before_strip) if password_before_strip else 0}")
-        
         # Validaciones básicas - verificar que los datos no estén vacíos después de limpiar
         if not password:
-            logger.error("LOG SERVICIO ERROR - Password está vacío después de strip")
             errors.append("La contraseña no puede estar vacía")
             return None, errors
         
@@ -62,44 +119,29 @@ class AuthService:
             errors.append("Las contraseñas no coinciden")
             return None, errors
         
-        if self.user_repository.exists_by_username(username):
-            errors.append("El nombre de usuario ya está en uso")
-            return None, errors
-        
-        if self.user_repository.exists_by_email(email):
-            errors.append("El email ya está registrado")
-            return None, errors
-        
         # Crear entidad de dominio
-        logger.error(f"LOG SERVICIO ANTES ENTIDAD - password length: {len(password)}, password type: {type(password)}")
         try:
             domain_user = User(
                 username=username,
                 email=email,
                 password=password  # El repositorio se encargará de hashearlo
             )
-            logger.error(f"LOG SERVICIO ENTIDAD CREADA - domain_user.password length: {len(domain_user.password) if domain_user.password else 0}")
         except ValueError as e:
-            logger.error(f"LOG SERVICIO ERROR ENTIDAD - {str(e)}")
             errors.append(str(e))
             return None, errors
         
-        # Guardar en el repositorio
-        logger.error(f"LOG SERVICIO ANTES REPOSITORIO - domain_user.password length: {len(domain_user.password) if domain_user.password else 0}")
-        try:
-            created_user = self.user_repository.create(domain_user)
-            logger.error(f"LOG SERVICIO USUARIO CREADO - ID: {created_user.id if created_user else None}")
-            return created_user, []
-        except ValueError as e:
-            # Errores de validación del repositorio
-            logger.error(f"LOG SERVICIO ERROR REPOSITORIO - {str(e)}")
-            errors.append(str(e))
-            return None, errors
-        except Exception as e:
-            # Otros errores inesperados
-            logger.error(f"LOG SERVICIO ERROR EXCEPTION - {str(e)}")
-            errors.append(f"Error al crear el usuario: {str(e)}")
-            return None, errors
+        return domain_user, errors
+    
+    @staticmethod
+    def _check_authenticated(user: Optional[User]) -> Tuple[Optional[User], list]:
+        """Traduce el resultado de la autenticación a (usuario, errores)"""
+        if not user:
+            return None, ["Usuario o contraseña incorrectos"]
+        
+        if not user.is_active:
+            return None, ["El usuario está inactivo"]
+        
+        return user, []
     
     def authenticate_user(self, username: str, password: str) -> Tuple[Optional[User], list]:
         """
@@ -114,15 +156,11 @@ class AuthService:
             errors.append("Usuario y contraseña son requeridos")
             return None, errors
         
-        user = self.user_repository.authenticate(username, password)
-        
-        if not user:
-            errors.append("Usuario o contraseña incorrectos")
-            return None, errors
-        
-        if not user.is_active:
-            errors.append("El usuario está inactivo")
-            return None, errors
-        
-        return user, []
+        try:
+            user = self.user_repository.authenticate(username, password)
+        except LoginThrottledError as e:
+            return None, [str(e)]
+        except PasswordHashingBusyError:
+            return None, [HASHING_BUSY_MESSAGE]
+        return self._check_authenticated(user)
 
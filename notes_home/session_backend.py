@@ -0,0 +1,255 @@
+"""
+Motor de sesiones en caché con escritura diferida (write-behind) a la base de datos
+
+    SESSION_ENGINE = 'notes_home.session_backend'
+
+Como django.contrib.sessions.backends.cached_db, pero save() solo escribe en la caché y deja
+la sesión en una cola del proceso; un hilo de fondo la vuelca a django_session cada
+FLUSH_INTERVAL segundos con un único INSERT ... ON CONFLICT por bloque. Leer una sesión es
+una lectura de caché; la base de datos solo se consulta si la sesión no está en caché.
+
+- Si la cola supera MAX_PENDING sesiones se vuelca en la propia petición (contrapresión).
+- La cola se vuelca también al terminar el proceso (atexit).
+- Con varios procesos, la caché de SESSION_CACHE_ALIAS debe ser compartida (Redis, Memcached):
+  con LocMemCache otro worker solo vería la sesión después del volcado.
+- clear_expired() (usado por clearsessions y limpiar_sesiones) borra por bloques.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.models import Session
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+logger = logging.getLogger('django.contrib.sessions')
+
+DEFAULT_SESSION_WRITE_BEHIND = {
+    'ENABLED': False,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_PENDING': 5000,
+    'BATCH_SIZE': 500,
+    # Filas de sesiones caducadas borradas por transacción en clear_expired()
+    'CLEANUP_BATCH_SIZE': 5000,
+}
+
+
+def get_session_write_behind_settings() -> dict:
+    return {**DEFAULT_SESSION_WRITE_BEHIND, **getattr(settings, 'SESSION_WRITE_BEHIND', {})}
+
+
+class SessionWriteBehind:
+    """
+    Cola de sesiones pendientes de escribir en la base de datos y su hilo de volcado
+    """
+
+    def __init__(self, flush_interval, max_pending, batch_size):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._start()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        # session_key -> (session_data codificada, expire_date)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='session-write-behind', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, session_key, session_data, expire_date):
+        with self._lock:
+            self._pending[session_key] = (session_data, expire_date)
+            overflow = len(self._pending) >= self.max_pending
+            self._ensure_thread()
+        if overflow:
+            self.flush()
+
+    def get(self, session_key):
+        """Datos codificados de una sesión aún no volcada, o None"""
+        with self._lock:
+            item = self._pending.get(session_key)
+        return item[0] if item else None
+
+    def discard(self, session_key):
+        with self._lock:
+            self._pending.pop(session_key, None)
+
+    @contextmanager
+    def deleting(self, session_key):
+        """
+        Quita la sesión de la cola y no deja volcar mientras se borra de la base de datos
+        Un volcado en curso (o su reintento tras un fallo) ya no puede volver a insertarla.
+        """
+        with self._flush_lock:
+            self.discard(session_key)
+            yield
+
+    def __contains__(self, session_key):
+        with self._lock:
+            return session_key in self._pending
+
+    def flush(self):
+        """Escribe todas las sesiones pendientes; si falla, las vuelve a dejar en la cola"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            items = list(pending.items())
+            try:
+                for start in range(0, len(items), self.batch_size):
+                    Session.objects.bulk_create(
+                        [
+                            Session(session_key=key, session_data=data, expire_date=expire_date)
+                            for key, (data, expire_date) in items[start:start + self.batch_size]
+                        ],
+                        update_conflicts=True,
+                        unique_fields=['session_key'],
+                        update_fields=['session_data', 'expire_date'],
+                    )
+            except Exception:
+                logger.exception('No se pudieron volcar %d sesiones a la base de datos', len(items))
+                with self._lock:
+                    # Lo encolado entretanto es más reciente y tiene prioridad
+                    self._pending = {**pending, **self._pending}
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            finally:
+                # El hilo no debe quedarse con una conexión abierta entre volcados
+                connections.close_all()
+
+
+_write_behind = None
+_write_behind_lock = threading.Lock()
+
+
+def get_session_write_behind() -> SessionWriteBehind:
+    global _write_behind
+    if _write_behind is None:
+        with _write_behind_lock:
+            if _write_behind is None:
+                config = get_session_write_behind_settings()
+                _write_behind = SessionWriteBehind(
+                    config['FLUSH_INTERVAL'], config['MAX_PENDING'], config['BATCH_SIZE']
+                )
+                atexit.register(_write_behind.flush)
+    return _write_behind
+
+
+class SessionStore(CachedDBStore):
+    """
+    Sesiones en caché con escritura diferida a django_session
+    """
+    cache_key_prefix = 'notes_home.session_backend'
+
+    def load(self):
+        try:
+            data = self._cache.get(self.cache_key)
+        except Exception:
+            data = None
+        if data is not None:
+            return data
+        # Sesión aún en la cola de este proceso (p. ej. expulsada de la caché antes del volcado)
+        pending = get_session_write_behind().get(self._get_or_create_session_key())
+        if pending is not None:
+            return self.decode(pending)
+        return super().load()
+
+    async def aload(self):
+        try:
+            data = await self._cache.aget(await self.acache_key())
+        except Exception:
+            data = None
+        if data is not None:
+            return data
+        pending = get_session_write_behind().get(await self._aget_or_create_session_key())
+        if pending is not None:
+            return self.decode(pending)
+        return await super().aload()
+
+    def exists(self, session_key):
+        if session_key and session_key in get_session_write_behind():
+            return True
+        return super().exists(session_key)
+
+    async def aexists(self, session_key):
+        if session_key and session_key in get_session_write_behind():
+            return True
+        return await super().aexists(session_key)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        age = self.get_expiry_age()
+        if must_create:
+            # add() falla si la clave ya existe: equivale a la comprobación del INSERT de la BD
+            if not self._cache.add(self.cache_key, data, age):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, age)
+        get_session_write_behind().enqueue(self.session_key, self.encode(data), self.get_expiry_date())
+
+    async def asave(self, must_create=False):
+        if self.session_key is None:
+            return await self.acreate()
+        data = await self._aget_session(no_load=must_create)
+        age = await self.aget_expiry_age()
+        if must_create:
+            if not await self._cache.aadd(await self.acache_key(), data, age):
+                raise CreateError
+        else:
+            await self._cache.aset(await self.acache_key(), data, age)
+        get_session_write_behind().enqueue(self.session_key, self.encode(data), await self.aget_expiry_date())
+
+    def delete(self, session_key=None):
+        key = session_key if session_key is not None else self.session_key
+        if key is None:
+            return super().delete(session_key)
+        with get_session_write_behind().deleting(key):
+            super().delete(session_key)
+
+    async def adelete(self, session_key=None):
+        # Esperar al volcado en curso bloquea: se hace en un hilo, fuera del event loop
+        await sync_to_async(self.delete)(session_key)
+
+    @classmethod
+    def clear_expired(cls, batch_size=None, pause=0.0):
+        """
+        Borra las sesiones caducadas por bloques de claves (transacciones cortas que no
+        bloquean la tabla); devuelve el número de filas borradas
+        """
+        batch_size = batch_size or get_session_write_behind_settings()['CLEANUP_BATCH_SIZE']
+        using = router.db_for_write(Session)
+        deleted = 0
+        while True:
+            now = timezone.now()
+            keys = list(
+                Session.objects.using(using).filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                return deleted
+            with transaction.atomic(using=using):
+                # Se repite el filtro de caducidad por si alguna sesión se renovó entretanto
+                deleted += Session.objects.using(using).filter(session_key__in=keys, expire_date__lt=now).delete()[0]
+            if pause:
+                time.sleep(pause)
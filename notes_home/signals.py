@@ -0,0 +1,9 @@
+"""
+Señales propias de la aplicación
+Los receptores están en notes_home/middleware.py junto al resto de señales de usuario.
+"""
+from django.dispatch import Signal
+
+# Enviada tras un bulk_create de usuarios (bulk_create no dispara post_save).
+# Argumentos: users -> lista de instancias de User creadas
+users_bulk_created = Signal()
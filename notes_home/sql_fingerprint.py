@@ -0,0 +1,32 @@
+"""
+Huella (fingerprint) de sentencias SQL
+
+Normaliza una sentencia quitando los valores literales para que todas las ejecuciones de la
+misma consulta compartan la misma huella:
+
+    SELECT ... WHERE "auth_user"."id" = 42 LIMIT 21       -> SELECT ... WHERE "auth_user"."id" = ? LIMIT ?
+    SELECT ... WHERE "id" IN (%s, %s, %s)                 -> SELECT ... WHERE "id" IN (...)
+
+La usan el perfilador por petición (detección de N+1) y el comando analizar_sql.
+"""
+import re
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r'%s|%\([^)]+\)s|\?')
+# Números sueltos, no los que forman parte de un identificador ("tabla2", "col_1")
+_NUMBER = re.compile(r'(?<![\w".])-?\d+(?:\.\d+)?(?![\w"])')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_ROWS = re.compile(r'\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Devuelve la sentencia sin literales, con las listas IN y los VALUES múltiples colapsados
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_ROWS.sub(r'VALUES \1, ...', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
@@ -0,0 +1,127 @@
+"""
+Registro de SQL por umbral y muestreo
+
+Sustituye al log de django.db.backends en DEBUG (una línea por sentencia, incluidas las
+consultas de introspección) por un execute_wrapper instalado en cada conexión:
+
+- Las sentencias que tardan más de SLOW_MS se registran siempre (nivel WARNING).
+- El resto se registra con probabilidad SAMPLE_RATE (nivel INFO).
+- Cada entrada lleva la duración y la ruta de la petición en curso:
+
+    (0.153) SELECT ... ; args=(1,); alias=default; path=/login/
+
+La ruta la fija SqlLoggingMiddleware en una ContextVar, así que funciona igual en vistas
+síncronas y asíncronas. Fuera de una petición (comandos, shell) se registra path=-.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+sql_logger = logging.getLogger('notes_home.sql')
+
+DEFAULT_SQL_LOGGING = {
+    # 'sampled': umbral + muestreo; 'all': log de django.db.backends en DEBUG; 'off': nada
+    'MODE': 'sampled',
+    'SLOW_MS': 200,
+    'SAMPLE_RATE': 0.0,
+    # Las sentencias más largas se recortan en el log
+    'MAX_SQL_LENGTH': 2000,
+}
+
+_current_path = ContextVar('sql_logging_path', default='-')
+
+
+def get_sql_logging_settings() -> dict:
+    return {**DEFAULT_SQL_LOGGING, **getattr(settings, 'SQL_LOGGING', {})}
+
+
+def is_sql_logging_enabled() -> bool:
+    return get_sql_logging_settings()['MODE'] == 'sampled'
+
+
+class SqlLoggingWrapper:
+    """
+    execute_wrapper que mide cada sentencia y decide si se registra
+    """
+
+    def __init__(self, slow_ms, sample_rate, max_sql_length):
+        self.slow = slow_ms / 1000
+        self.sample_rate = sample_rate
+        self.max_sql_length = max_sql_length
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.slow:
+                self.log(logging.WARNING, duration, sql, params, many, context)
+            elif self.sample_rate and random.random() < self.sample_rate:
+                self.log(logging.INFO, duration, sql, params, many, context)
+
+    def log(self, level, duration, sql, params, many, context):
+        if not sql_logger.isEnabledFor(level):
+            return
+        if len(sql) > self.max_sql_length:
+            sql = sql[:self.max_sql_length] + ' ...'
+        # En executemany solo se indica el número de filas
+        args = f'<{len(params)} filas>' if many and hasattr(params, '__len__') else params
+        sql_logger.log(
+            level, '(%.3f) %s; args=%s; alias=%s; path=%s',
+            duration, sql, args, context['connection'].alias, _current_path.get(),
+            extra={'duration': duration, 'alias': context['connection'].alias, 'path': _current_path.get()},
+        )
+
+
+_wrapper = None
+
+
+def get_sql_logging_wrapper() -> SqlLoggingWrapper:
+    global _wrapper
+    if _wrapper is None:
+        config = get_sql_logging_settings()
+        _wrapper = SqlLoggingWrapper(config['SLOW_MS'], config['SAMPLE_RATE'], config['MAX_SQL_LENGTH'])
+    return _wrapper
+
+
+def install_sql_logging(sender, connection, **kwargs):
+    """
+    Receptor de connection_created: añade el wrapper a la conexión (una sola vez por conexión)
+    """
+    wrapper = get_sql_logging_wrapper()
+    if wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(wrapper)
+
+
+class SqlLoggingMiddleware:
+    """
+    Guarda la ruta de la petición para las entradas del log de SQL
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current_path.set(request.path)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_path.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_path.set(request.path)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_path.reset(token)
@@ -0,0 +1,70 @@
+"""
+Perfil de rendimiento para SQLite en producción
+
+Se aplica a cada conexión nueva (señal connection_created) con PRAGMAs configurables en
+settings.SQLITE_TUNING:
+
+- journal_mode=WAL: lectores y escritor no se bloquean entre sí (persistente en el archivo)
+- synchronous=NORMAL: con WAL es seguro ante caídas del proceso; solo un corte de luz puede
+  perder las últimas transacciones confirmadas
+- mmap_size: lecturas por memoria mapeada en lugar de read()
+- cache_size: caché de páginas por conexión (negativo = KiB)
+- busy_timeout: espera en milisegundos antes de devolver "database is locked"
+- temp_store=MEMORY: tablas e índices temporales en memoria
+
+El comando medir_sqlite compara el rendimiento con el perfil activado y desactivado.
+"""
+from django.conf import settings
+
+DEFAULT_SQLITE_TUNING = {
+    'ENABLED': False,
+    'JOURNAL_MODE': 'WAL',
+    'SYNCHRONOUS': 'NORMAL',
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    'CACHE_SIZE': -64000,
+    'BUSY_TIMEOUT': 5000,
+    'TEMP_STORE': 'MEMORY',
+}
+
+# Orden de aplicación: busy_timeout primero, para que el cambio a WAL también espere si hay bloqueo
+PRAGMAS = (
+    ('BUSY_TIMEOUT', 'busy_timeout'),
+    ('JOURNAL_MODE', 'journal_mode'),
+    ('SYNCHRONOUS', 'synchronous'),
+    ('MMAP_SIZE', 'mmap_size'),
+    ('CACHE_SIZE', 'cache_size'),
+    ('TEMP_STORE', 'temp_store'),
+)
+
+
+def get_sqlite_tuning_settings() -> dict:
+    return {**DEFAULT_SQLITE_TUNING, **getattr(settings, 'SQLITE_TUNING', {})}
+
+
+def is_sqlite_tuning_enabled() -> bool:
+    return bool(get_sqlite_tuning_settings()['ENABLED'])
+
+
+def pragma_statements(config) -> list:
+    """Sentencias PRAGMA del perfil; las claves a None se omiten"""
+    return [
+        f'PRAGMA {pragma} = {config[key]}'
+        for key, pragma in PRAGMAS
+        if config.get(key) is not None
+    ]
+
+
+def apply_pragmas(cursor, config) -> None:
+    """Aplica el perfil sobre un cursor (de Django o de sqlite3)"""
+    for statement in pragma_statements(config):
+        cursor.execute(statement)
+
+
+def apply_sqlite_tuning(sender, connection, **kwargs):
+    """
+    Receptor de connection_created: aplica el perfil a las conexiones SQLite
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, get_sqlite_tuning_settings())
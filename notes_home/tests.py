@@ -1,3 +1,406 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from notes_home import admission_control, login_throttle
+from notes_home.models import UserSignupDaily, UserStats
+from notes_home.paginators import estimate_table_rows
+from notes_home.password_hashing import PasswordHashingBusyError, PasswordHashingPool
+from notes_home.repositories import CachedUserRepository, membership_index, user_cache
+from notes_home.repositories.user_repository import UserRepository
+from notes_home.services.async_auth_service import AsyncAuthService
+from notes_home.services.auth_service import HASHING_BUSY_MESSAGE, AuthService
+from notes_home.session_backend import SessionStore, get_session_write_behind
+from notes_home.user_stats import _signup_day, recalculate_user_stats
+
+
+class AdminUserChangelistTests(TestCase):
+    """Listado de usuarios del admin (LeanChangeList)"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'Secreta.123x')
+        self.client.force_login(self.admin)
+
+    def test_changelist_loads_only_listed_columns(self):
+        response = self.client.get('/admin/auth/user/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('is_active', response.context['cl'].result_list[0].get_deferred_fields())
+
+    def test_bulk_delete_selected(self):
+        users = [User.objects.create_user(f'borrar{i}', f'borrar{i}@example.com', 'Secreta.123x') for i in range(3)]
+        recalculate_user_stats()
+        response = self.client.post('/admin/auth/user/', {
+            'action': 'delete_selected',
+            'post': 'yes',
+            '_selected_action': [user.pk for user in users],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(User.objects.filter(username__startswith='borrar').exists())
+        self.assertEqual(UserStats.objects.get().total, 1)
+
+
+class IntegrityErrorMessageTests(TestCase):
+    """Traducción de las violaciones de unicidad de cada motor"""
+
+    def assert_message(self, detail, expected):
+        self.assertEqual(UserRepository._integrity_error_message(IntegrityError(detail)), expected)
+
+    def test_username_whose_value_mentions_email(self):
+        taken = "El nombre de usuario ya está en uso"
+        self.assert_message("Duplicate entry 'email_fan' for key 'auth_user.username'", taken)
+        self.assert_message(
+            'duplicate key value violates unique constraint "auth_user_username_key"\n'
+            'DETAIL:  Key (username)=(email_fan) already exists.',
+            taken,
+        )
+
+    def test_email_index_per_engine(self):
+        taken = "El email ya está registrado"
+        self.assert_message("UNIQUE constraint failed: index 'notes_home_user_email_ci_uniq'", taken)
+        self.assert_message("Duplicate entry 'username@example.com' for key 'auth_user.notes_home_user_email_ci_uniq'", taken)
+
+    def test_sqlite_username_column(self):
+        User.objects.create_user('email_fan', 'uno@example.com', 'Secreta.123x')
+        with self.assertRaises(IntegrityError) as context:
+            User.objects.create_user('email_fan', 'dos@example.com', 'Secreta.123x')
+        self.assertEqual(
+            UserRepository._integrity_error_message(context.exception), "El nombre de usuario ya está en uso"
+        )
+
+
+class EstimateTableRowsTests(TestCase):
+    """Estimación del número de filas para EstimatedCountPaginator"""
+
+    def test_sqlite_reads_index_statistics(self):
+        User.objects.bulk_create([User(username=f'estimado{i}', email=f'estimado{i}@example.com') for i in range(7)])
+        with connections['default'].cursor() as cursor:
+            cursor.execute('ANALYZE')
+            # auth_user solo tiene filas de índices en sqlite_stat1
+            cursor.execute("SELECT COUNT(*) FROM sqlite_stat1 WHERE tbl = 'auth_user' AND idx IS NULL")
+            self.assertEqual(cursor.fetchone()[0], 0)
+            # Se borra la última fila tras el ANALYZE: la estadística sigue en 7, MAX(rowid) daría 6
+            User.objects.filter(username='estimado6').delete()
+        self.assertEqual(estimate_table_rows(User), 7)
+        self.assertEqual(User.objects.count(), 6)
+
+
+class ImportUsersTests(TestCase):
+    """Importación masiva (importar_usuarios)"""
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN de SQLite')
+    def test_duplicate_email_check_uses_the_email_index(self):
+        User.objects.create_user('existente', 'Existente@Example.com', 'Secreta.123x')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'usuarios.csv')
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write('username,email,password\n')
+            source.write('otro,existente@example.com,Secreta.123x\n')
+            source.write('nuevo,nuevo@example.com,Secreta.123x\n')
+        with CaptureQueriesContext(connection) as queries:
+            call_command('importar_usuarios', path, procesos=1, sin_validar_password=True, stdout=StringIO())
+        self.assertTrue(User.objects.filter(username='nuevo').exists())
+        self.assertFalse(User.objects.filter(username='otro').exists())
+        email_query = next(query['sql'] for query in queries if 'LOWER("auth_user"."email") IN' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {email_query}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('notes_home_user_email_ci_uniq', plan)
+
+
+@override_settings(USER_MEMBERSHIP_INDEX={'ENABLED': True, 'CAPACITY': 100, 'REBUILD_INTERVAL': 0})
+class MembershipIndexSignalTests(TestCase):
+    """Mantenimiento del índice de pertenencia desde post_save"""
+
+    def setUp(self):
+        membership_index._membership_index = None
+        self.addCleanup(setattr, membership_index, '_membership_index', None)
+        self.user = User.objects.create_user('indexado', 'indexado@example.com', 'Secreta.123x')
+        self.index = membership_index.get_membership_index()
+        self.index.build()
+
+    def test_plain_update_does_not_grow_the_index(self):
+        count = self.index._filters[0].count
+        for _ in range(5):
+            self.user.last_login = timezone.now()
+            self.user.save(update_fields=['last_login'])
+        self.assertEqual(self.index._filters[0].count, count)
+
+    def test_username_change_is_added(self):
+        self.user.username = 'renombrado'
+        self.user.save()
+        self.assertTrue(self.index.might_have_username('renombrado'))
+
+
+@override_settings(USER_MEMBERSHIP_INDEX={'ENABLED': True, 'CAPACITY': 100, 'REBUILD_INTERVAL': 60})
+class MembershipIndexRebuildTests(TransactionTestCase):
+    """Reconstrucción periódica del índice de pertenencia en segundo plano"""
+
+    def setUp(self):
+        membership_index._membership_index = None
+        self.addCleanup(setattr, membership_index, '_membership_index', None)
+
+    def test_stale_index_keeps_serving_while_rebuilding(self):
+        index = membership_index.get_membership_index()
+        index.build()
+        # Alta de otro proceso: sin señal en este
+        User.objects.bulk_create([User(username='sin_senal', email='sin_senal@example.com')])
+        index._built_at -= 120
+        started, release = threading.Event(), threading.Event()
+        build = index.build
+
+        def slow_build():
+            started.set()
+            release.wait(5)
+            build()
+
+        with mock.patch.object(index, 'build', slow_build):
+            # Las consultas no esperan al recorrido de la tabla: responden los filtros anteriores
+            self.assertFalse(index.might_have_username('sin_senal'))
+            self.assertTrue(started.wait(5))
+            self.assertFalse(index.might_have_username('sin_senal'))
+            release.set()
+            for _ in range(100):
+                if not index._rebuilding:
+                    break
+                time.sleep(0.05)
+        self.assertTrue(index.might_have_username('sin_senal'))
+        self.assertTrue(index.might_have_email('sin_senal@example.com'))
+
+
+@override_settings(USER_CACHE={'ENABLED': True, 'BACKEND': 'local'})
+class UserCacheInvalidationTests(TestCase):
+    """Invalidación de la caché de usuarios desde las señales"""
+
+    def setUp(self):
+        user_cache._user_cache = None
+        self.addCleanup(setattr, user_cache, '_user_cache', None)
+        self.repository = CachedUserRepository()
+
+    def test_email_change_invalidates_old_email_after_commit(self):
+        user = User.objects.create_user('cacheado', 'viejo@example.com', 'Secreta.123x')
+        self.assertTrue(self.repository.exists_by_email('viejo@example.com'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.email = 'nuevo@example.com'
+            user.save()
+        # Hasta el commit la entrada sigue en caché
+        self.assertEqual(self.repository.cache.get('exists_email', 'viejo@example.com'), (True, True))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.repository.exists_by_email('viejo@example.com'))
+        self.assertTrue(self.repository.exists_by_email('nuevo@example.com'))
+
+
+def busy(*args, **kwargs):
+    raise PasswordHashingBusyError('saturado')
+
+
+@mock.patch.multiple(
+    PasswordHashingPool,
+    make_password=busy, check_password=busy,
+    amake_password=mock.AsyncMock(side_effect=busy), acheck_password=mock.AsyncMock(side_effect=busy),
+)
+class PasswordHashingBusyTests(TestCase):
+    """Pool de hashing saturado: error de "inténtalo de nuevo" en lugar de una excepción"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('existente', 'existente@example.com', 'Secreta.123x')
+
+    def test_register_returns_busy_error(self):
+        user, errors = AuthService().register_user('ocupado', 'ocupado@example.com', 'Secreta.123x', 'Secreta.123x')
+        self.assertIsNone(user)
+        self.assertEqual(errors, [HASHING_BUSY_MESSAGE])
+        self.assertFalse(User.objects.filter(username='ocupado').exists())
+
+    def test_authenticate_returns_busy_error(self):
+        self.assertEqual(AuthService().authenticate_user('existente', 'Secreta.123x'), (None, [HASHING_BUSY_MESSAGE]))
+
+    def test_async_register_and_authenticate_return_busy_error(self):
+        service = AsyncAuthService()
+        self.assertEqual(
+            async_to_sync(service.aregister_user)('ocupado', 'ocupado@example.com', 'Secreta.123x', 'Secreta.123x'),
+            (None, [HASHING_BUSY_MESSAGE]),
+        )
+        self.assertEqual(
+            async_to_sync(service.aauthenticate_user)('existente', 'Secreta.123x'),
+            (None, [HASHING_BUSY_MESSAGE]),
+        )
+
+
+@override_settings(USER_STATS={'ENABLED': True})
+class UserStatsSignalTests(TestCase):
+    """Contadores de UserStats/UserSignupDaily mantenidos desde las señales"""
+
+    def test_delete_never_leaves_negative_signups(self):
+        user = User.objects.create_user('efimero', 'efimero@example.com', 'Secreta.123x')
+        day = _signup_day(user)
+        # Fila del día ausente (opción activada sin recalcular) o ya a cero
+        UserSignupDaily.objects.filter(day=day).delete()
+        user.delete()
+        self.assertFalse(UserSignupDaily.objects.filter(day=day).exists())
+
+    def test_delete_decrements_signup_day(self):
+        users = [User.objects.create_user(f'alta{i}', f'alta{i}@example.com', 'Secreta.123x') for i in range(2)]
+        day = _signup_day(users[0])
+        users[0].delete()
+        self.assertEqual(UserSignupDaily.objects.get(day=day).count, 1)
+        users[1].delete()
+        self.assertFalse(UserSignupDaily.objects.filter(day=day).exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RegisterViewTests(TestCase):
+    """Registro desde la vista con inicio de sesión"""
+
+    def test_register_logs_in_hashing_the_password_once(self):
+        with mock.patch.object(MD5PasswordHasher, 'encode', autospec=True, side_effect=MD5PasswordHasher.encode) as encode, \
+                mock.patch.object(MD5PasswordHasher, 'verify', autospec=True, side_effect=MD5PasswordHasher.verify) as verify:
+            response = self.client.post('/register/', {
+                'username': 'nuevo',
+                'email': 'nuevo@example.com',
+                'password': 'Secreta.123x',
+                'password_confirm': 'Secreta.123x',
+            })
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(encode.call_count, 1)
+        self.assertEqual(verify.call_count, 0)
+        self.assertEqual(self.client.session['_auth_user_id'], str(User.objects.get(username='nuevo').pk))
+
+
+@override_settings(LOGIN_THROTTLE={
+    'ENABLED': True,
+    'BACKEND': 'local',
+    'ROUTES': {'login': {'ip': {'BURST': 2, 'PER_MINUTE': 1}}},
+})
+class LoginThrottleTests(TestCase):
+    """LoginThrottleMiddleware: 429 con Retry-After al superar el límite"""
+
+    def setUp(self):
+        login_throttle._throttle_store = None
+        self.addCleanup(setattr, login_throttle, '_throttle_store', None)
+
+    def test_login_over_the_limit_returns_429(self):
+        credentials = {'username': 'nadie', 'password': 'incorrecta'}
+        for _ in range(2):
+            self.assertEqual(self.client.post('/login/', credentials).status_code, 200)
+        with self.assertLogs('notes_home.throttle', 'WARNING'):
+            response = self.client.post('/login/', credentials)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # El límite solo afecta a los POST
+        self.assertEqual(self.client.get('/login/').status_code, 200)
+
+
+@override_settings(ADMISSION_CONTROL={
+    'ENABLED': True,
+    'MAX_CONCURRENT': 1,
+    'MAX_QUEUE': 0,
+    'QUEUE_TIMEOUT': 0,
+})
+class AdmissionControlTests(TestCase):
+    """AdmissionControlMiddleware: 503 con el hueco ocupado y la cola llena"""
+
+    def setUp(self):
+        admission_control._admission_controller = None
+        self.addCleanup(setattr, admission_control, '_admission_controller', None)
+
+    def test_login_while_saturated_returns_503(self):
+        controller = admission_control.get_admission_controller()
+        # Otra petición de login en vuelo ocupa el único hueco
+        self.assertTrue(controller.acquire())
+        with self.assertLogs('notes_home.admission', 'WARNING'), self.assertLogs('django.request', 'ERROR'):
+            response = self.client.post('/login/', {'username': 'nadie', 'password': 'incorrecta'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+        # Las rutas no limitadas no esperan hueco
+        self.assertEqual(self.client.get('/login/').status_code, 200)
+        controller.release()
+        self.assertEqual(self.client.post('/login/', {'username': 'nadie', 'password': 'incorrecta'}).status_code, 200)
+        self.assertEqual(controller.stats()['in_flight'], 0)
+
+
+class PasswordHashingPoolTests(TestCase):
+    """Huecos del pool de hashing"""
+
+    def test_cancelled_wait_does_not_leak_the_slot(self):
+        pool = PasswordHashingPool(workers=1, max_pending=1, timeout=5)
+        self.assertTrue(pool._slots.acquire(blocking=False))
+
+        async def cancel_while_waiting():
+            task = asyncio.ensure_future(pool.amake_password('Secreta.123x'))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # Se libera el hueco: lo toma el hilo del executor que seguía esperando
+            pool._slots.release()
+            await asyncio.sleep(0.2)
+
+        async_to_sync(cancel_while_waiting)()
+        # ... y lo devuelve, porque la tarea que lo pidió ya no existe
+        self.assertTrue(pool._slots.acquire(blocking=False))
+        pool._slots.release()
+
+
+class SessionWriteBehindTests(TransactionTestCase):
+    """Sesiones con escritura diferida (notes_home/session_backend.py)"""
+
+    def start_deleting(self, session_key):
+        def delete():
+            try:
+                SessionStore(session_key).delete()
+            finally:
+                connections.close_all()
+        thread = threading.Thread(target=delete)
+        thread.start()
+        # Da tiempo a que el borrado llegue a esperar al volcado en curso
+        time.sleep(0.1)
+        return thread
+
+    def assert_deleted_during_flush_stays_deleted(self, flush_fails):
+        store = SessionStore()
+        store['_auth_user_id'] = '1'
+        store.create()
+        key = store.session_key
+        write_behind = get_session_write_behind()
+        bulk_create = Session.objects.bulk_create
+        threads = []
+
+        def bulk_create_while_deleting(*args, **kwargs):
+            threads.append(self.start_deleting(key))
+            if flush_fails:
+                raise DatabaseError('fallo simulado')
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(Session.objects, 'bulk_create', bulk_create_while_deleting):
+            if flush_fails:
+                with self.assertLogs('django.contrib.sessions', 'ERROR'):
+                    write_behind.flush()
+            else:
+                write_behind.flush()
+        threads[0].join()
+        write_behind.flush()
+
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+        self.assertEqual(SessionStore(key).load(), {})
+
+    def test_session_deleted_during_flush_is_not_written_back(self):
+        self.assert_deleted_during_flush_stays_deleted(flush_fails=False)
+
+    def test_session_deleted_during_failed_flush_is_not_requeued(self):
+        self.assert_deleted_during_flush_stays_deleted(flush_fails=True)
@@ -0,0 +1,67 @@
+"""
+Seguimiento de cambios de modelos en memoria
+Guarda los valores originales de los campos indicados al cargar la instancia (post_init) y
+permite calcular el diff antes de guardar sin volver a leer la fila de la base de datos.
+
+Uso:
+    track_changes(User, ['username', 'email', 'is_active'])
+    ...
+    get_changes(instance)  # {'email': ('antes@x.com', 'despues@x.com')}
+
+La foto se renueva en post_save; los receptores que necesiten el diff deben calcularlo en pre_save.
+"""
+from django.db.models.signals import post_init, post_save
+
+# Atributo de la instancia donde se guarda la foto de los valores originales
+SNAPSHOT_ATTR = '_tracked_original_values'
+
+_tracked_fields = {}
+
+
+def _snapshot(instance, fields):
+    deferred = instance.get_deferred_fields()
+    # Los campos diferidos (.only()/.defer()) no se leen para no provocar una consulta
+    setattr(instance, SNAPSHOT_ATTR, {
+        field: getattr(instance, field) for field in fields if field not in deferred
+    })
+
+
+def _on_post_init(sender, instance, **kwargs):
+    _snapshot(instance, _tracked_fields[sender])
+
+
+def _on_post_save(sender, instance, **kwargs):
+    # Tras guardar, los valores actuales pasan a ser los originales
+    _snapshot(instance, _tracked_fields[sender])
+
+
+def track_changes(model, fields):
+    """
+    Activa el seguimiento de `fields` para `model`
+    """
+    _tracked_fields[model] = tuple(fields)
+    uid = f'notes_home.tracking.{model._meta.label_lower}'
+    post_init.connect(_on_post_init, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(_on_post_save, sender=model, weak=False, dispatch_uid=uid)
+
+
+def has_snapshot(instance) -> bool:
+    return hasattr(instance, SNAPSHOT_ATTR)
+
+
+def get_original(instance, field, default=None):
+    """Valor original de un campo (el que tenía al cargarse o tras el último save)"""
+    return getattr(instance, SNAPSHOT_ATTR, {}).get(field, default)
+
+
+def get_changes(instance) -> dict:
+    """
+    Devuelve {campo: (valor_original, valor_actual)} de los campos seguidos que cambiaron
+    """
+    original = getattr(instance, SNAPSHOT_ATTR, {})
+    changes = {}
+    for field, old_value in original.items():
+        new_value = getattr(instance, field)
+        if old_value != new_value:
+            changes[field] = (old_value, new_value)
+    return changes
@@ -0,0 +1,148 @@
+"""
+Estadísticas de usuarios
+
+compute_user_stats() calcula los totales con un solo aggregate con conteos condicionales.
+Con settings.USER_STATS['ENABLED'] además se mantiene una fila resumen (UserStats) y las altas
+por día (UserSignupDaily), actualizadas con F() desde las señales de User:
+
+- alta (post_save created / users_bulk_created): total +1, activos +1 si está activo, altas del día +1
+- cambio de is_active (diff de notes_home.tracking en pre_save): activos ±1
+- borrado (post_delete): total -1, activos -1 si estaba activo, altas del día -1 (sin bajar de cero)
+
+get_user_stats() lee entonces una sola fila en lugar de recorrer auth_user.
+QuerySet.delete() sí envía pre_delete/post_delete por cada objeto (Django los carga para eso),
+así que los borrados masivos también se descuentan. Lo que no envía señales es QuerySet.update(),
+bulk_create() sin users_bulk_created y el SQL directo (o el TRUNCATE): tras operaciones así (o al
+activar la opción sobre una base existente) hay que ejecutar recalculate_user_stats()
+(consultar_usuarios --recalcular-estadisticas).
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User as DjangoUser
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from notes_home.models import UserSignupDaily, UserStats
+
+STATS_PK = 1
+
+DEFAULT_USER_STATS = {
+    'ENABLED': False,
+}
+
+
+def get_user_stats_settings() -> dict:
+    return {**DEFAULT_USER_STATS, **getattr(settings, 'USER_STATS', {})}
+
+
+def is_user_stats_enabled() -> bool:
+    return bool(get_user_stats_settings()['ENABLED'])
+
+
+def compute_user_stats() -> dict:
+    """Totales de usuarios en una sola consulta"""
+    stats = DjangoUser.objects.aggregate(
+        total=Count('id'),
+        activos=Count('id', filter=Q(is_active=True)),
+    )
+    stats['inactivos'] = stats['total'] - stats['activos']
+    return stats
+
+
+def get_user_stats() -> dict:
+    """
+    Totales de usuarios: de la fila resumen si está activada, si no con compute_user_stats()
+    """
+    if not is_user_stats_enabled():
+        return compute_user_stats()
+    row = UserStats.objects.filter(pk=STATS_PK).first()
+    if row is None:
+        row = recalculate_user_stats()
+    return {'total': row.total, 'activos': row.active, 'inactivos': row.inactive}
+
+
+def get_signups_per_day(days=7):
+    """Altas de los últimos `days` días con alta, del más reciente al más antiguo"""
+    if is_user_stats_enabled():
+        return list(UserSignupDaily.objects.values_list('day', 'count')[:days])
+    return list(
+        DjangoUser.objects.annotate(day=TruncDate('date_joined'))
+        .values('day').annotate(count=Count('id')).order_by('-day')
+        .values_list('day', 'count')[:days]
+    )
+
+
+def recalculate_user_stats() -> UserStats:
+    """Reconstruye la fila resumen y las altas por día desde auth_user"""
+    stats = compute_user_stats()
+    daily = (
+        DjangoUser.objects.annotate(day=TruncDate('date_joined'))
+        .values('day').annotate(count=Count('id')).values_list('day', 'count')
+    )
+    with transaction.atomic():
+        row, _ = UserStats.objects.update_or_create(
+            pk=STATS_PK, defaults={'total': stats['total'], 'active': stats['activos']}
+        )
+        UserSignupDaily.objects.all().delete()
+        UserSignupDaily.objects.bulk_create(
+            [UserSignupDaily(day=day, count=count) for day, count in daily.iterator()],
+            batch_size=1000,
+        )
+    return row
+
+
+def _signup_day(user):
+    date_joined = user.date_joined
+    if settings.USE_TZ and timezone.is_aware(date_joined):
+        date_joined = timezone.localtime(date_joined)
+    return date_joined.date()
+
+
+def _apply(total=0, active=0, signups=None):
+    """Suma los deltas con UPDATE ... SET col = col + n; crea las filas que falten"""
+    if total or active:
+        updated = UserStats.objects.filter(pk=STATS_PK).update(
+            total=F('total') + total, active=F('active') + active
+        )
+        if not updated:
+            # Primera vez: se parte del estado real de la tabla, que ya incluye este cambio
+            recalculate_user_stats()
+            return
+    for day, count in (signups or {}).items():
+        if count < 0:
+            # Bajas: nunca por debajo de cero ni creando la fila (el día puede no estar en la
+            # tabla si se activó la opción sin recalcular); los días sin altas no tienen fila
+            days = UserSignupDaily.objects.filter(day=day)
+            if not days.filter(count__gt=-count).update(count=F('count') + count):
+                days.filter(count__lte=-count).delete()
+            continue
+        if UserSignupDaily.objects.filter(day=day).update(count=F('count') + count):
+            continue
+        try:
+            with transaction.atomic():
+                UserSignupDaily.objects.create(day=day, count=count)
+        except IntegrityError:
+            # Otro proceso creó la fila entretanto
+            UserSignupDaily.objects.filter(day=day).update(count=F('count') + count)
+
+
+def record_created(users):
+    """Altas (una o varias) ya guardadas en la base de datos"""
+    signups = Counter(_signup_day(user) for user in users)
+    _apply(
+        total=sum(signups.values()),
+        active=sum(1 for user in users if user.is_active),
+        signups=signups,
+    )
+
+
+def record_active_changed(was_active, is_active):
+    if was_active != is_active:
+        _apply(active=1 if is_active else -1)
+
+
+def record_deleted(user):
+    _apply(total=-1, active=-1 if user.is_active else 0, signups={_signup_day(user): -1})
@@ -1,9 +1,12 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login as django_login, logout as django_logout
+from django.contrib.auth import alogin as django_alogin, alogout as django_alogout
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
 from notes_home.forms import RegisterForm
 from notes_home.services.auth_service import AuthService
+from notes_home.services.async_auth_service import AsyncAuthService
 
 
 @login_required
@@ -38,29 +41,18 @@ def register(request):
             password = form.cleaned_data['password']
             password_confirm = form.cleaned_data['password_confirm']
             
-            # Log temporal para depuración
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"LOG VISTA - username: {username}, email: {email}, password type: {type(password)}, password length: {len(password) if password else 0}, password value: {'***' if password else 'EMPTY'}, password_confirm length: {len(password_confirm) if password_confirm else 0}")
-            
-            user, errors = auth_service.register_user(
+            # El servicio devuelve el usuario ya autenticado: la contraseña solo se hashea una vez
+            django_user, errors = auth_service.register_user_for_login(
                 username=username,
                 email=email,
                 password=password,
                 password_confirm=password_confirm
             )
             
-            if user and not errors:
-                # Autenticar al usuario después del registro
-                from django.contrib.auth import authenticate
-                django_user = authenticate(username=username, password=password)
-                if django_user:
-                    django_login(request, django_user)
-                    messages.success(request, f'¡Bienvenido {username}! Tu cuenta ha sido creada exitosamente.')
-                    return redirect('home')
-                else:
-                    messages.success(request, 'Tu cuenta ha sido creada. Por favor inicia sesión.')
-                    return redirect('login')
+            if django_user and not errors:
+                django_login(request, django_user)
+                messages.success(request, f'¡Bienvenido {username}! Tu cuenta ha sido creada exitosamente.')
+                return redirect('home')
             else:
                 # Mostrar errores del servicio
                 for error in errors:
@@ -73,4 +65,68 @@ def register(request):
     else:
         form = RegisterForm()
     
-    return render(request, 'notes_home/register.html', {'form': form})
\ No newline at end of file
+    return render(request, 'notes_home/register.html', {'form': form})
+
+
+# ============================================================================
+# Vistas asíncronas (ASGI) - se activan con settings.ASYNC_AUTH_VIEWS
+# ============================================================================
+
+async def ahome(request):
+    """
+    Versión asíncrona de home
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    # El usuario ya está cargado: evita que la plantilla lo consulte de forma síncrona
+    request.user = user
+    return render(request, 'notes_home/home.html')
+
+
+async def alogout_view(request):
+    """
+    Versión asíncrona del logout que funciona con GET y POST
+    """
+    user = await request.auser()
+    if user.is_authenticated:
+        await django_alogout(request)
+        messages.success(request, 'Has cerrado sesión correctamente.')
+    return redirect('login')
+
+
+async def aregister(request):
+    """
+    Versión asíncrona del registro usando el servicio de autenticación asíncrono
+    """
+    user = await request.auser()
+    if user.is_authenticated:
+        return redirect('home')
+    request.user = user
+    
+    if request.method == 'POST':
+        form = RegisterForm(request.POST)
+        if form.is_valid():
+            auth_service = AsyncAuthService()
+            username = form.cleaned_data['username']
+            django_user, errors = await auth_service.aregister_user_for_login(
+                username=username,
+                email=form.cleaned_data['email'],
+                password=form.cleaned_data['password'],
+                password_confirm=form.cleaned_data['password_confirm']
+            )
+            
+            if django_user and not errors:
+                await django_alogin(request, django_user)
+                messages.success(request, f'¡Bienvenido {username}! Tu cuenta ha sido creada exitosamente.')
+                return redirect('home')
+            for error in errors:
+                messages.error(request, error)
+        else:
+            for field, error_list in form.errors.items():
+                for error in error_list:
+                    messages.error(request, f'{field}: {error}')
+    else:
+        form = RegisterForm()
+    
+    return render(request, 'notes_home/register.html', {'form': form})
@@ -16,6 +16,7 @@ from django.contrib.auth.models import User as DjangoUser
 from notes_home.repositories.user_repository import UserRepository
 from notes_home.services.auth_service import AuthService
 from notes_home.domain.entities import User as DomainUser
+from notes_home.user_stats import get_user_stats
 from django.db.models import Q
 
 # Crear instancia del repositorio
@@ -75,19 +76,25 @@ def existe_email(email):
 # Estadísticas
 def estadisticas():
     """Muestra estadísticas de usuarios"""
-    total = DjangoUser.objects.count()
-    activos = DjangoUser.objects.filter(is_active=True).count()
-    inactivos = DjangoUser.objects.filter(is_active=False).count()
+    stats = get_user_stats()
     print(f"\n=== ESTADÍSTICAS ===")
-    print(f"Total: {total}")
-    print(f"Activos: {activos}")
-    print(f"Inactivos: {inactivos}")
+    print(f"Total: {stats['total']}")
+    print(f"Activos: {stats['activos']}")
+    print(f"Inactivos: {stats['inactivos']}")
+
+# Buscar por username o email (ordenado por relevancia)
+def buscar(texto, limite=20):
+    """Busca usuarios cuyo username o email contenga el texto"""
+    users = user_repo.search(texto, limit=limite)
+    print(f"\nEncontrados {len(users)} usuarios:")
+    for user in users:
+        print(f"  [{user.id}] {user.username} - {user.email}")
 
 # Buscar por email
 def buscar_email(email):
     """Busca usuarios cuyo email contenga el texto"""
-    users = DjangoUser.objects.filter(email__icontains=email)
-    print(f"\nEncontrados {users.count()} usuarios:")
+    users = user_repo.search(email, fields=('email',))
+    print(f"\nEncontrados {len(users)} usuarios:")
     for user in users:
         print(f"  [{user.id}] {user.username} - {user.email}")
 
@@ -126,4 +133,5 @@ print("  existe_username('nombre')")
 print("  existe_email('email@example.com')")
 print("  estadisticas()")
 print("  buscar_email('gmail')")
+print("  buscar('juan')")
 